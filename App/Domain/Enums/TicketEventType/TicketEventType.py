@@ -0,0 +1,9 @@
+from enum import Enum
+
+class TicketEventType(Enum):
+    CREATED = "created"
+    TAKEN = "taken"
+    SUPPORT_REPLY = "support_reply"
+    USER_MESSAGE = "user_message"
+    CLOSED = "closed"
+    AUTO_CLOSED = "auto_closed"
@@ -1,6 +1,18 @@
-from enum import Enum
+from enum import StrEnum
 
-class TicketStatus(Enum):
-    OPEN = "open"
-    ANSWERED = "answered"
-    CLOSED = "closed"
\ No newline at end of file
+
+class TicketStatus(StrEnum):
+    """Статус тикета; в БД хранится как enum ticket_status"""
+
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    CLOSED = "closed"
+    CANCELLED = "cancelled"
+
+    @property
+    def is_active(self) -> bool:
+        return self in ACTIVE_TICKET_STATUSES
+
+
+# Тикет ждет администратора или в работе; совпадает с предикатом ix_tickets_active_taken_by
+ACTIVE_TICKET_STATUSES = (TicketStatus.PENDING, TicketStatus.IN_PROGRESS)
@@ -22,7 +22,7 @@ class Ticket:
     topic_thread_id: Optional[int] = None
     user_message_id: Optional[int] = None
     
-    status: TicketStatus = TicketStatus.OPEN
+    status: TicketStatus = TicketStatus.PENDING
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     closed_by: Optional[str] = None
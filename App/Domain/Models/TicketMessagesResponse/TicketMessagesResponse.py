@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+
+class TicketMessage(BaseModel):
+    id: int
+    sender_id: int
+    from_support: bool
+    message: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class TicketMessagesResponse(BaseModel):
+    ticket_id: int
+    messages: list[TicketMessage]
+    # Значение для параметра before следующей (более старой) страницы; None - страниц больше нет
+    next_before: Optional[int] = None
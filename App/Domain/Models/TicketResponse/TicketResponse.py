@@ -1,9 +1,11 @@
 from pydantic import BaseModel
 
+from App.Domain.Enums.TicketStatus.TicketStatus import TicketStatus
+
 
 class TicketResponse(BaseModel):
     ticket_id: int
     display_id: int
-    status: str
+    status: TicketStatus
     message: str
 
@@ -1,11 +1,13 @@
 from pydantic import BaseModel
 from typing import Optional
 
+from App.Domain.Enums.TicketStatus.TicketStatus import TicketStatus
+
 
 class TicketStatusResponse(BaseModel):
     ticket_id: int
     display_id: int
-    status: str
+    status: TicketStatus
     created_at: Optional[str] = None
     closed_at: Optional[str] = None
 
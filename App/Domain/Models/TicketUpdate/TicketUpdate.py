@@ -2,11 +2,13 @@ from dataclasses import dataclass
 from typing import Optional
 from datetime import datetime
 
+from App.Domain.Enums.TicketStatus.TicketStatus import TicketStatus
+
 
 @dataclass
 class TicketUpdate:
     ticket_id: int
-    status: str
+    status: TicketStatus
     message: Optional[str] = None
     timestamp: datetime = None
 
@@ -0,0 +1,112 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AdminMenu:
+    active_tickets: int
+    balance: float
+
+
+class AdminMenuService:
+    """Готовые данные админ-меню по каждому администратору.
+
+    Модель меню загружается из БД при первом открытии и дальше обновляется
+    хуками взятия/закрытия тикета и начисления баланса, поэтому повторное
+    открытие меню не делает запросов к БД. Блок "лучший администратор"
+    пересобирается только при смене лидера рейтинга.
+    """
+
+    def __init__(self, statistics_service, balance_service=None):
+        self.statistics_service = statistics_service
+        self.balance_service = balance_service
+        self._menus: dict[int, AdminMenu] = {}
+        self._best_key: Optional[tuple] = None
+        self._best_text = ""
+
+    @staticmethod
+    def _greeting() -> str:
+        hour = datetime.now().hour
+        if 5 <= hour < 12:
+            return "Доброе утро ☀️"
+        elif 12 <= hour < 18:
+            return "Добрый день 🌤"
+        return "Добрый вечер 🌙"
+
+    @staticmethod
+    def keyboard() -> InlineKeyboardMarkup:
+        return InlineKeyboardMarkup(inline_keyboard=[
+            [
+                InlineKeyboardButton(text="📊 Статистика", callback_data="show_stats"),
+                InlineKeyboardButton(text="💰 Подробный баланс", callback_data="show_balance")
+            ],
+            [
+                InlineKeyboardButton(text="📖 Памятка", callback_data="show_help_memo"),
+                InlineKeyboardButton(text="🏆 Топ статистика", callback_data="show_top_stats")
+            ],
+            [
+                InlineKeyboardButton(text="⏱ SLA", callback_data="show_sla")
+            ]
+        ])
+
+    def get_menu(self, admin_id: int) -> AdminMenu:
+        menu = self._menus.get(admin_id)
+        if menu is None:
+            menu = self._load(admin_id)
+            self._menus[admin_id] = menu
+        return menu
+
+    async def render(self, admin_id: int, full_name: str) -> str:
+        """Текст админ-меню"""
+        menu = self.get_menu(admin_id)
+        text = f"{self._greeting()}, {full_name}!\n\n"
+        text += f"🎫 Активных тикетов: <b>{menu.active_tickets}</b>\n"
+        text += f"💰 Баланс: <b>{menu.balance:.2f} ₽</b>"
+        text += await self._get_best_admin_text()
+        return text
+
+    def on_ticket_taken(self, admin_id: Optional[int]):
+        menu = self._menus.get(admin_id)
+        if menu:
+            menu.active_tickets += 1
+
+    def on_ticket_released(self, admin_id: Optional[int]):
+        """Тикет администратора закрыт или отменен"""
+        menu = self._menus.get(admin_id)
+        if menu:
+            menu.active_tickets = max(menu.active_tickets - 1, 0)
+
+    def on_balance_changed(self, admin_id: int, balance: float):
+        menu = self._menus.get(admin_id)
+        if menu:
+            menu.balance = balance
+
+    def invalidate(self, admin_id: int = None):
+        """Сбросить модель меню администратора (или всех), чтобы перечитать ее из БД"""
+        if admin_id is None:
+            self._menus.clear()
+        else:
+            self._menus.pop(admin_id, None)
+
+    def _load(self, admin_id: int) -> AdminMenu:
+        active_tickets = self.statistics_service.get_admin_snapshot(admin_id).active
+        balance = self.balance_service.get_admin_balance(admin_id) if self.balance_service else 0.0
+        logger.debug(f"Модель меню администратора {admin_id} загружена из БД")
+        return AdminMenu(active_tickets=active_tickets, balance=balance)
+
+    async def _get_best_admin_text(self) -> str:
+        leaderboard = self.statistics_service.leaderboard
+        if leaderboard is None:
+            return await self.statistics_service.get_best_admin_text()
+
+        best = leaderboard.best()
+        if best != self._best_key:
+            self._best_text = await self.statistics_service.get_best_admin_text()
+            self._best_key = best
+        return self._best_text
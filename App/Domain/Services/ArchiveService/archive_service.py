@@ -0,0 +1,195 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Union
+
+from sqlalchemy import select, text, union_all
+from sqlalchemy.orm import Session
+
+from App.Domain.Enums.TicketStatus.TicketStatus import TicketStatus
+from App.Infrastructure.Models.database import get_db
+from App.Infrastructure.Models import Ticket, TicketArchive, TicketHistory, TicketRating, TicketRatingArchive
+
+logger = logging.getLogger(__name__)
+
+
+def _columns(model) -> str:
+    return ", ".join(column.name for column in model.__table__.columns)
+
+
+TICKET_COLUMNS = _columns(Ticket)
+HISTORY_COLUMNS = _columns(TicketHistory)
+RATING_COLUMNS = _columns(TicketRating)
+
+# Перенос пачки закрытых тикетов вместе с историей и оценками одним запросом.
+# Строки выбираются FOR UPDATE SKIP LOCKED, поэтому пачка не ждет тикеты,
+# которые сейчас меняются, а ключи ticket_history/ticket_ratings проверяются
+# в конце запроса, когда ссылающиеся строки уже удалены.
+ARCHIVE_BATCH_SQL = text(f"""
+    WITH batch AS (
+        SELECT id FROM tickets
+        WHERE status = :closed AND closed_at < :cutoff
+        ORDER BY closed_at
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ),
+    history AS (
+        DELETE FROM ticket_history WHERE ticket_id IN (SELECT id FROM batch)
+        RETURNING {HISTORY_COLUMNS}
+    ),
+    history_archived AS (
+        INSERT INTO ticket_history_archive ({HISTORY_COLUMNS}) SELECT {HISTORY_COLUMNS} FROM history
+    ),
+    ratings AS (
+        DELETE FROM ticket_ratings WHERE ticket_id IN (SELECT id FROM batch)
+        RETURNING {RATING_COLUMNS}
+    ),
+    ratings_archived AS (
+        INSERT INTO ticket_ratings_archive ({RATING_COLUMNS}) SELECT {RATING_COLUMNS} FROM ratings
+    ),
+    moved AS (
+        DELETE FROM tickets WHERE id IN (SELECT id FROM batch)
+        RETURNING {TICKET_COLUMNS}
+    ),
+    archived AS (
+        INSERT INTO tickets_archive ({TICKET_COLUMNS}) SELECT {TICKET_COLUMNS} FROM moved
+    )
+    SELECT count(*) FROM moved
+""")
+
+PURGE_BATCH_SQL = text("""
+    WITH batch AS (
+        SELECT id FROM tickets_archive
+        WHERE closed_at < :cutoff
+        ORDER BY closed_at
+        LIMIT :batch_size
+    ),
+    history AS (
+        DELETE FROM ticket_history_archive WHERE ticket_id IN (SELECT id FROM batch)
+    ),
+    ratings AS (
+        DELETE FROM ticket_ratings_archive WHERE ticket_id IN (SELECT id FROM batch)
+    ),
+    purged AS (
+        DELETE FROM tickets_archive WHERE id IN (SELECT id FROM batch) RETURNING id
+    )
+    SELECT count(*) FROM purged
+""")
+
+
+def find_ticket(db: Session, ticket_id: int = None, display_id: int = None) -> Optional[Union[Ticket, TicketArchive]]:
+    """Тикет по id или display_id; если его нет в tickets - из архива"""
+    for model in (Ticket, TicketArchive):
+        query = db.query(model)
+        query = query.filter(model.id == ticket_id) if ticket_id is not None else query.filter(model.display_id == display_id)
+        row = query.first()
+        if row:
+            return row
+    return None
+
+
+def tickets_with_archive():
+    """Подзапрос tickets UNION ALL tickets_archive с колонками tickets (для отчетов и выгрузок)"""
+    columns = [column.name for column in Ticket.__table__.columns]
+    return union_all(
+        select(*[Ticket.__table__.c[name] for name in columns]),
+        select(*[TicketArchive.__table__.c[name] for name in columns])
+    ).subquery("all_tickets")
+
+
+def ratings_with_archive():
+    """Подзапрос ticket_ratings UNION ALL ticket_ratings_archive"""
+    columns = [column.name for column in TicketRating.__table__.columns]
+    return union_all(
+        select(*[TicketRating.__table__.c[name] for name in columns]),
+        select(*[TicketRatingArchive.__table__.c[name] for name in columns])
+    ).subquery("all_ratings")
+
+
+class ArchiveService:
+    """Перенос старых закрытых тикетов в архивные таблицы.
+
+    Раз в interval секунд тикеты, закрытые больше archive_after_days дней
+    назад, переносятся вместе с историей и оценками в tickets_archive,
+    ticket_history_archive и ticket_ratings_archive пачками по batch_size,
+    каждая в своей короткой транзакции. При retention_days > 0 архив старше
+    этого срока удаляется. Поиск тикета по id и display_id проверяет архив
+    (find_ticket), номера тикетов продолжают нумерацию архива; отчеты и
+    выгрузки читают тикеты и оценки вместе с архивом (tickets_with_archive,
+    ratings_with_archive).
+    """
+
+    def __init__(self, archive_after_days: int = 0, retention_days: int = 0, batch_size: int = 500,
+                 interval: int = 3600, batch_pause: float = 0.1):
+        self.archive_after_days = archive_after_days
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self.batch_pause = batch_pause
+        self._task: Optional[asyncio.Task] = None
+        logger.info("ArchiveService инициализирован")
+
+    def start(self):
+        if self._task is None and self.archive_after_days > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def archive_batch(self) -> int:
+        """Перенести одну пачку тикетов в архив; возвращает количество тикетов"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.archive_after_days)
+        return self._execute_batch(ARCHIVE_BATCH_SQL, {
+            "closed": TicketStatus.CLOSED.value,
+            "cutoff": cutoff,
+            "batch_size": self.batch_size
+        })
+
+    def purge_batch(self) -> int:
+        """Удалить из архива одну пачку тикетов старше retention_days"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        return self._execute_batch(PURGE_BATCH_SQL, {"cutoff": cutoff, "batch_size": self.batch_size})
+
+    def _execute_batch(self, statement, params: dict) -> int:
+        db = get_db()
+        try:
+            count = db.execute(statement, params).scalar()
+            db.commit()
+            return count
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def run_once(self) -> tuple[int, int]:
+        """Перенести в архив все подходящие тикеты и почистить архив; возвращает (перенесено, удалено)"""
+        archived = await self._drain(self.archive_batch)
+        purged = await self._drain(self.purge_batch) if self.retention_days > 0 else 0
+        if archived or purged:
+            logger.info(f"Архивация тикетов: перенесено {archived}, удалено из архива {purged}")
+        return archived, purged
+
+    async def _drain(self, batch) -> int:
+        total = 0
+        while True:
+            count = await asyncio.to_thread(batch)
+            total += count
+            if count < self.batch_size:
+                return total
+            # Пауза между пачками, чтобы не занимать БД надолго
+            await asyncio.sleep(self.batch_pause)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка архивации тикетов: {e}")
+            await asyncio.sleep(self.interval)
@@ -1,18 +1,57 @@
+import asyncio
 import logging
-from typing import Optional
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
 
 from App.Infrastructure.Models.database import get_db
-from App.Infrastructure.Models import AdminBalance
+from App.Infrastructure.Models import AdminBalance, BalanceLedger
+from App.Infrastructure.Models.rollups import bump_admin_daily_stats
 
 logger = logging.getLogger(__name__)
 
+TICKET_REWARD = 50.0
+# Баланс не начисляется за категории "Сбросить HWID" и "Получить ключ"
+UNPAID_CATEGORIES = ("hwid", "key")
+
+
+@dataclass
+class BalanceAccrual:
+    admin_id: int
+    amount: float
+    balance: float
+
 
 class BalanceService:
-    """Сервис для управления балансом администраторов"""
+    """Сервис для управления балансом администраторов.
+
+    Каждое начисление пишется в журнал balance_ledger, а admin_balances
+    хранит текущий итог. Начисление за тикет уникально по ticket_id, поэтому
+    повторное закрытие не оплачивается дважды. Фоновая сверка раз в
+    reconcile_interval секунд приводит admin_balances к сумме журнала.
+    """
 
-    def __init__(self):
+    def __init__(self, reconcile_interval: int = 3600):
+        self.reconcile_interval = reconcile_interval
+        self._reconcile_task: Optional[asyncio.Task] = None
         logger.info("BalanceService инициализирован")
 
+    def start(self, on_corrected: Callable[[int], None] = None):
+        if self._reconcile_task is None:
+            self._reconcile_task = asyncio.create_task(self._reconcile_loop(on_corrected))
+
+    async def stop(self):
+        if self._reconcile_task:
+            self._reconcile_task.cancel()
+            try:
+                await self._reconcile_task
+            except asyncio.CancelledError:
+                pass
+            self._reconcile_task = None
+
     def get_admin_balance(self, admin_id: int) -> float:
         """Получить баланс администратора"""
         db = get_db()
@@ -22,19 +61,90 @@ class BalanceService:
         finally:
             db.close()
 
-    def add_balance(self, admin_id: int, amount: float) -> float:
+    def accrue(self, db: Session, admin_id: int, amount: float, reason: str,
+               ticket_id: int = None) -> Optional[BalanceAccrual]:
+        """Записать начисление в журнал и обновить баланс одним запросом.
+
+        Выполняется в переданной сессии, commit делает вызывающий код.
+        Возвращает None, если за ticket_id уже было начисление.
+        """
+        entry = insert(BalanceLedger).values(admin_id=admin_id, ticket_id=ticket_id, amount=amount, reason=reason)
+        if ticket_id is not None:
+            entry = entry.on_conflict_do_nothing(index_elements=[BalanceLedger.ticket_id])
+        entry = entry.returning(BalanceLedger.admin_id, BalanceLedger.amount).cte("entry")
+
+        stmt = insert(AdminBalance).from_select(["admin_id", "balance"], select(entry.c.admin_id, entry.c.amount))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AdminBalance.admin_id],
+            set_={"balance": func.coalesce(AdminBalance.balance, 0) + stmt.excluded.balance}
+        ).returning(AdminBalance.balance)
+
+        balance = db.execute(stmt).scalar()
+        if balance is None:
+            logger.info(f"Начисление за тикет {ticket_id} уже произведено, пропускаем")
+            return None
+
+        bump_admin_daily_stats(db, admin_id, earnings=amount)
+        return BalanceAccrual(admin_id=admin_id, amount=amount, balance=balance)
+
+    def add_balance(self, admin_id: int, amount: float, reason: str = "manual") -> float:
         """Начислить баланс администратору"""
         db = get_db()
         try:
-            admin = db.query(AdminBalance).filter(AdminBalance.admin_id == admin_id).first()
-            if not admin:
-                admin = AdminBalance(admin_id=admin_id, balance=amount)
-                db.add(admin)
-            else:
-                admin.balance += amount
+            accrual = self.accrue(db, admin_id, amount, reason)
             db.commit()
-            db.refresh(admin)
-            logger.info(f"Начислено {amount} ₽ администратору {admin_id}, новый баланс: {admin.balance}")
-            return admin.balance
+            logger.info(f"Начислено {amount} ₽ администратору {admin_id}, новый баланс: {accrual.balance}")
+            return accrual.balance
+        except Exception:
+            db.rollback()
+            raise
         finally:
             db.close()
+
+    def reconcile(self) -> list[int]:
+        """Привести admin_balances к сумме журнала; возвращает id исправленных администраторов"""
+        db = get_db()
+        try:
+            # Блокировка ждет начисления, уже обновившие admin_balances, и задерживает новые до
+            # commit сверки. Суммы считаются следующим запросом, снимок которого включает
+            # дождавшиеся начисления; иначе сверка перезаписала бы их баланс устаревшей суммой.
+            db.execute(text("LOCK TABLE admin_balances IN SHARE ROW EXCLUSIVE MODE"))
+            totals = select(BalanceLedger.admin_id, func.sum(BalanceLedger.amount).label("total")).group_by(
+                BalanceLedger.admin_id
+            ).cte("totals")
+
+            stmt = insert(AdminBalance).from_select(["admin_id", "balance"], select(totals.c.admin_id, totals.c.total))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[AdminBalance.admin_id],
+                set_={"balance": stmt.excluded.balance},
+                where=func.abs(func.coalesce(AdminBalance.balance, 0) - stmt.excluded.balance) > 0.005
+            ).returning(AdminBalance.admin_id)
+            corrected = list(db.execute(stmt).scalars())
+
+            orphaned = update(AdminBalance).where(
+                AdminBalance.balance != 0,
+                AdminBalance.admin_id.not_in(select(totals.c.admin_id))
+            ).values(balance=0).returning(AdminBalance.admin_id)
+            corrected += list(db.execute(orphaned).scalars())
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        if corrected:
+            logger.warning(f"Баланс расходился с журналом начислений у администраторов {corrected}, исправлено")
+        return corrected
+
+    async def _reconcile_loop(self, on_corrected: Callable[[int], None] = None):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                corrected = await asyncio.to_thread(self.reconcile)
+            except Exception as e:
+                logger.warning(f"Ошибка сверки балансов с журналом: {e}")
+                continue
+            if on_corrected:
+                for admin_id in corrected:
+                    on_corrected(admin_id)
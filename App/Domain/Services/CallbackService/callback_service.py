@@ -1,22 +1,29 @@
 import logging
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import CallbackQuery, BufferedInputFile, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 
 from App.Domain.Models.TicketStates.ticket_states import TicketStates
-from App.Domain.Services.TicketService.ticket_service import TicketService
+from App.Domain.Services.TicketService.ticket_service import TicketService, OUTBOX_RATING_REQUEST
+from App.Domain.Services.TicketService.ticket_close import TicketCloseResult
 from App.Domain.Services.BalanceService.balance_service import BalanceService
 from App.Domain.Services.StatisticsService.statistics_service import StatisticsService
 from App.Domain.Services.RatingService.rating_service import RatingService
+from App.Domain.Services.AdminMenuService.admin_menu_service import AdminMenuService
 
 logger = logging.getLogger(__name__)
 
 
 class CallbackService:
-    def __init__(self, ticket_service: TicketService, balance_service: BalanceService, statistics_service: StatisticsService, rating_service: RatingService):
+    def __init__(self, ticket_service: TicketService, balance_service: BalanceService, statistics_service: StatisticsService, rating_service: RatingService,
+                 admin_menu_service: AdminMenuService = None):
         self.ticket_service = ticket_service
         self.balance_service = balance_service
         self.statistics_service = statistics_service
         self.rating_service = rating_service
+        self.admin_menu_service = admin_menu_service or AdminMenuService(statistics_service, balance_service)
+        if ticket_service.outbox:
+            ticket_service.outbox.register(OUTBOX_RATING_REQUEST, self._deliver_rating_request)
 
     async def process_callback(self, callback: CallbackQuery, state: FSMContext):
         user_id = callback.from_user.id
@@ -46,6 +53,8 @@ class CallbackService:
             await self._handle_show_help_memo_callback(callback)
         elif callback_data == "show_top_stats":
             await self._handle_show_top_stats_callback(callback)
+        elif callback_data == "show_sla":
+            await self._handle_show_sla_callback(callback)
         elif callback_data == "back_menu":
             await self._handle_back_menu_callback(callback)
         elif callback_data.startswith("rate:"):
@@ -146,57 +155,41 @@ class CallbackService:
             await callback.answer("Неверный формат номера тикета", show_alert=True)
             return
 
-        success = await self.ticket_service.close_ticket_by_internal_id(ticket_db_id, admin_id)
-        if success:
-            # Получаем категорию тикета для проверки
-            from App.Infrastructure.Models.database import get_db
-            from App.Infrastructure.Models import Ticket as TicketModelDB
-            db = get_db()
-            try:
-                ticket_record = db.query(TicketModelDB).filter(TicketModelDB.id == ticket_db_id).first()
-                ticket_category = ticket_record.category if ticket_record else None
-            finally:
-                db.close()
-
-            # Баланс не начисляется за категории "Сбросить HWID" и "Получить ключ"
-            excluded_categories = ["hwid", "key"]
-            if ticket_category in excluded_categories:
-                amount = 0.0
-                new_balance = self.balance_service.get_admin_balance(admin_id)
-                message_text = f"Тикет закрыт ✅\nБаланс не начисляется за данную категорию\nБаланс: {new_balance:.2f} ₽"
-            else:
-                amount = 50.0
-                new_balance = self.balance_service.add_balance(admin_id, amount)
-                message_text = f"Тикет закрыт ✅\nНачислено: {amount} ₽\nБаланс: {new_balance} ₽"
+        try:
+            result = await self.ticket_service.close_ticket_by_internal_id(ticket_db_id, admin_id)
+        except Exception as e:
+            logger.error(f"Ошибка закрытия тикета {ticket_db_id}: {e}")
+            await callback.answer("Не удалось закрыть тикет, попробуйте позже", show_alert=True)
+            return
+        if not result:
+            await callback.answer("Тикет не найден", show_alert=True)
+            return
+
+        # За категории "Сбросить HWID" и "Получить ключ" баланс не начисляется
+        if result.accrued_to == admin_id:
+            message_text = f"Тикет закрыт ✅\nНачислено: {result.accrued_amount} ₽\nБаланс: {result.balance} ₽"
+        elif not result.newly_closed:
+            message_text = "Тикет уже закрыт"
+        else:
+            message_text = f"Тикет закрыт ✅\nБаланс не начисляется за данную категорию\nБаланс: {result.balance or 0.0:.2f} ₽"
+
+        await callback.answer(message_text)
 
-            await callback.answer(message_text)
+    async def _deliver_rating_request(self, payload: dict):
+        """Outbox: запрос оценки и обновление общего сообщения после закрытия тикета администратором"""
+        result = TicketCloseResult.from_payload({key: value for key, value in payload.items() if key != "by_admin"})
+        await self._ask_for_rating(result.user_id, result.display_id)
 
-            from App.Infrastructure.Models.database import get_db
-            from App.Infrastructure.Models import Ticket as TicketModelDB
-            from App.Domain.Models.Ticket.Ticket import Ticket
-            db = get_db()
+        if result.channel_message_id:
             try:
-                ticket_record = db.query(TicketModelDB).filter(TicketModelDB.id == ticket_db_id).first()
-                if ticket_record:
-                    await self._ask_for_rating(ticket_record.user_id, ticket_record.display_id)
-
-                    if ticket_record.channel_message_id:
-                        status_text = "✅ Закрыт администратором"
-                        try:
-                            await self.ticket_service.channel_manager.bot.edit_message_text(
-                                chat_id=self.ticket_service.channel_manager.support_channel_id,
-                                message_id=ticket_record.channel_message_id,
-                                text=self.ticket_service.channel_manager._get_ticket_closed_text(ticket_record),
-                                reply_markup=None
-                            )
-                        except Exception as e:
-                            logger.warning(f"Не удалось обновить общее сообщение для закрытого тикета: {e}")
-                else:
-                    logger.warning(f"Не удалось найти тикет {ticket_db_id} для запроса оценки")
-            finally:
-                db.close()
-        else:
-            await callback.answer("Тикет не найден", show_alert=True)
+                await self.ticket_service.channel_manager.bot.edit_message_text(
+                    chat_id=self.ticket_service.channel_manager.support_channel_id,
+                    message_id=result.channel_message_id,
+                    text=self.ticket_service.channel_manager._get_ticket_closed_text(result),
+                    reply_markup=None
+                )
+            except Exception as e:
+                logger.warning(f"Не удалось обновить общее сообщение для закрытого тикета: {e}")
 
     async def _handle_rename_ticket_callback(self, callback: CallbackQuery, state: FSMContext):
         try:
@@ -280,6 +273,21 @@ class CallbackService:
                 reply_markup={"inline_keyboard": [[{"text": "🔙 Назад", "callback_data": "back_menu"}]]}
             )
 
+    async def _handle_show_sla_callback(self, callback: CallbackQuery):
+        await callback.answer()
+
+        try:
+            sla_text = await self.statistics_service.generate_sla_text()
+        except Exception as e:
+            logger.warning(f"Не удалось сгенерировать отчет SLA: {e}")
+            sla_text = "❌ Ошибка загрузки SLA"
+
+        await callback.message.edit_text(
+            text=sla_text,
+            parse_mode="HTML",
+            reply_markup={"inline_keyboard": [[{"text": "🔙 Назад", "callback_data": "back_menu"}]]}
+        )
+
     async def _handle_show_balance_callback(self, callback: CallbackQuery):
         await callback.answer()
         admin_id = callback.from_user.id
@@ -322,32 +330,8 @@ class CallbackService:
     async def _handle_back_menu_callback(self, callback: CallbackQuery):
         await callback.answer()
 
-        from datetime import datetime
-        hour = datetime.now().hour
-        if 5 <= hour < 12:
-            greeting = "Доброе утро ☀️"
-        elif 12 <= hour < 18:
-            greeting = "Добрый день 🌤"
-        else:
-            greeting = "Добрый вечер 🌙"
-
-        active_tickets = self.statistics_service.get_active_tickets_count(admin_id=callback.from_user.id)
-        balance = self.balance_service.get_admin_balance(callback.from_user.id) if self.balance_service else 0.0
-
-        text = f"{greeting}, {callback.from_user.full_name}!\n\n"
-        text += f"🎫 Активных тикетов: <b>{active_tickets}</b>\n"
-        text += f"💰 Баланс: <b>{balance:.2f} ₽</b>"
-
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(text="📊 Статистика", callback_data="show_stats"),
-                InlineKeyboardButton(text="💰 Подробный баланс", callback_data="show_balance")
-            ],
-            [
-                InlineKeyboardButton(text="📖 Памятка", callback_data="show_help_memo"),
-                InlineKeyboardButton(text="🏆 Топ статистика", callback_data="show_top_stats")
-            ]
-        ])
+        text = await self.admin_menu_service.render(callback.from_user.id, callback.from_user.full_name)
+        keyboard = self.admin_menu_service.keyboard()
 
         if callback.message.photo:
             try:
@@ -366,13 +350,29 @@ class CallbackService:
     async def _handle_show_top_stats_callback(self, callback: CallbackQuery):
         await callback.answer()
 
-        image_data = await self.statistics_service.generate_top_stats_image()
-        image_file = BufferedInputFile(image_data, filename="top_stats.png")
-        await callback.message.answer_photo(
-            photo=image_file,
+        try:
+            image = await self.statistics_service.generate_top_stats_image()
+        except Exception as e:
+            logger.error(f"Ошибка генерации топ статистики: {e}")
+            await callback.message.answer("❌ Не удалось построить статистику, попробуйте позже")
+            return
+
+        reply_markup = {"inline_keyboard": [[{"text": "🔙 Назад", "callback_data": "back_menu"}]]}
+        if image.file_id:
+            try:
+                await callback.message.answer_photo(photo=image.file_id, caption="📊 Топ статистика поддержки", reply_markup=reply_markup)
+                return
+            except TelegramBadRequest as e:
+                logger.warning(f"Кэшированный file_id топ статистики не принят: {e}")
+                image.file_id = None
+
+        sent = await callback.message.answer_photo(
+            photo=BufferedInputFile(image.png, filename="top_stats.png"),
             caption="📊 Топ статистика поддержки",
-            reply_markup={"inline_keyboard": [[{"text": "🔙 Назад", "callback_data": "back_menu"}]]}
+            reply_markup=reply_markup
         )
+        if sent.photo:
+            image.file_id = sent.photo[-1].file_id
 
     async def _handle_rate_callback(self, callback: CallbackQuery):
         await callback.answer()
@@ -424,27 +424,15 @@ class CallbackService:
             user_id = callback.from_user.id
             
             if ticket_number:
-                from App.Infrastructure.Models.database import get_db
-                from App.Infrastructure.Models import Ticket as TicketModelDB, TicketRating
-                db = get_db()
-                try:
-                    db_ticket = db.query(TicketModelDB).filter(TicketModelDB.display_id == ticket_number).first()
-                    if db_ticket:
-                        rating_record = db.query(TicketRating).filter(
-                            TicketRating.ticket_id == db_ticket.id,
-                            TicketRating.user_id == user_id
-                        ).first()
-                        
-                        if rating_record:
-                            username = callback.from_user.username or callback.from_user.first_name or f"user_{user_id}"
-                            await self.ticket_service.channel_manager.send_rating_to_reviews_topic(
-                                ticket_number,
-                                username,
-                                rating_record.rating,
-                                None
-                            )
-                finally:
-                    db.close()
+                rating = self.rating_service.get_ticket_rating(ticket_number, user_id)
+                if rating is not None:
+                    username = callback.from_user.username or callback.from_user.first_name or f"user_{user_id}"
+                    await self.ticket_service.channel_manager.send_rating_to_reviews_topic(
+                        ticket_number,
+                        username,
+                        rating,
+                        None
+                    )
         except Exception as e:
             logger.warning(f"Не удалось отправить отзыв в топик при пропуске комментария: {e}")
         
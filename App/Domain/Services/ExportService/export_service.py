@@ -0,0 +1,146 @@
+import csv
+import io
+import json
+import logging
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+
+from App.Domain.Enums.TicketStatus.TicketStatus import TicketStatus
+from App.Domain.Services.ArchiveService.archive_service import ratings_with_archive, tickets_with_archive
+from App.Infrastructure.Models.database import get_read_db
+from App.Infrastructure.Models import AdminDailyStats
+
+logger = logging.getLogger(__name__)
+
+# Сколько строк курсор забирает с сервера за раз
+FETCH_SIZE = 1000
+# Сколько строк собирается в один отправляемый кусок ответа
+ROWS_PER_CHUNK = 500
+
+EXPORT_FORMATS = ("csv", "ndjson")
+
+
+@dataclass
+class ExportFilters:
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    status: Optional[TicketStatus] = None
+    admin_id: Optional[int] = None
+
+
+class ExportService:
+    """Потоковая выгрузка тикетов, оценок и начислений.
+
+    Строки читаются серверным курсором (stream_results + yield_per) и сразу
+    сериализуются, поэтому память не зависит от размера выборки. Тикеты и
+    оценки выгружаются вместе с архивом (ArchiveService).
+    """
+
+    TICKET_COLUMNS = ["id", "display_id", "user_id", "username", "category", "status",
+                      "taken_by", "created_at", "taken_at", "closed_at"]
+    RATING_COLUMNS = ["id", "ticket_id", "display_id", "taken_by", "user_id", "rating", "comment", "created_at"]
+    EARNING_COLUMNS = ["admin_id", "day", "closed_count", "rating_sum", "rating_count", "earnings"]
+
+    def export(self, kind: str, export_format: str, filters: ExportFilters, compress: bool = False) -> Iterator[bytes]:
+        """Итератор кусков ответа для выгрузки kind (tickets, ratings, earnings)"""
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Неизвестный формат выгрузки: {export_format}")
+
+        builders = {
+            "tickets": (self._tickets_query, self.TICKET_COLUMNS),
+            "ratings": (self._ratings_query, self.RATING_COLUMNS),
+            "earnings": (self._earnings_query, self.EARNING_COLUMNS),
+        }
+        if kind not in builders:
+            raise ValueError(f"Неизвестный тип выгрузки: {kind}")
+
+        build_query, columns = builders[kind]
+        chunks = self._serialize(self._stream(build_query(filters)), columns, export_format)
+        return self._gzip(chunks) if compress else chunks
+
+    def _tickets_query(self, filters: ExportFilters):
+        tickets = tickets_with_archive()
+        query = select(*[tickets.c[column] for column in self.TICKET_COLUMNS]).order_by(tickets.c.id)
+        if filters.date_from:
+            query = query.where(tickets.c.created_at >= filters.date_from)
+        if filters.date_to:
+            query = query.where(tickets.c.created_at < filters.date_to + timedelta(days=1))
+        if filters.status:
+            query = query.where(tickets.c.status == filters.status)
+        if filters.admin_id:
+            query = query.where(tickets.c.taken_by == filters.admin_id)
+        return query
+
+    def _ratings_query(self, filters: ExportFilters):
+        tickets, ratings = tickets_with_archive(), ratings_with_archive()
+        query = select(
+            ratings.c.id, ratings.c.ticket_id, tickets.c.display_id, tickets.c.taken_by,
+            ratings.c.user_id, ratings.c.rating, ratings.c.comment, ratings.c.created_at
+        ).join(tickets, tickets.c.id == ratings.c.ticket_id).order_by(ratings.c.id)
+        if filters.date_from:
+            query = query.where(ratings.c.created_at >= filters.date_from)
+        if filters.date_to:
+            query = query.where(ratings.c.created_at < filters.date_to + timedelta(days=1))
+        if filters.status:
+            query = query.where(tickets.c.status == filters.status)
+        if filters.admin_id:
+            query = query.where(tickets.c.taken_by == filters.admin_id)
+        return query
+
+    def _earnings_query(self, filters: ExportFilters):
+        query = select(*[getattr(AdminDailyStats, column) for column in self.EARNING_COLUMNS]).order_by(
+            AdminDailyStats.day, AdminDailyStats.admin_id
+        )
+        if filters.date_from:
+            query = query.where(AdminDailyStats.day >= filters.date_from)
+        if filters.date_to:
+            query = query.where(AdminDailyStats.day <= filters.date_to)
+        if filters.admin_id:
+            query = query.where(AdminDailyStats.admin_id == filters.admin_id)
+        return query
+
+    def _stream(self, query) -> Iterator[tuple]:
+        db = get_read_db()
+        try:
+            result = db.execute(query.execution_options(stream_results=True, yield_per=FETCH_SIZE))
+            for row in result:
+                yield tuple(row)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _serialize(rows: Iterator[tuple], columns: list[str], export_format: str) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if export_format == "csv" else None
+        if writer:
+            writer.writerow(columns)
+
+        count = 0
+        for row in rows:
+            if writer:
+                writer.writerow([value.isoformat() if isinstance(value, (date, datetime)) else value for value in row])
+            else:
+                buffer.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str))
+                buffer.write("\n")
+            count += 1
+            if count % ROWS_PER_CHUNK == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+        logger.info(f"Выгрузка завершена, строк: {count}")
+
+    @staticmethod
+    def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
@@ -1,4 +1,6 @@
+import asyncio
 import logging
+from aiogram.exceptions import TelegramRetryAfter
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 
@@ -7,18 +9,26 @@ from App.Domain.Services.TicketService.ticket_service import TicketService
 from App.Domain.Services.StatisticsService.statistics_service import StatisticsService
 from App.Domain.Services.RatingService.rating_service import RatingService
 from App.Domain.Services.BalanceService.balance_service import BalanceService
+from App.Domain.Services.TicketHistoryService.ticket_history_service import TicketHistoryService
+from App.Domain.Services.AdminMenuService.admin_menu_service import AdminMenuService
 from App.Infrastructure.Config import config
 
 logger = logging.getLogger(__name__)
 
+# Максимальное количество id в одном вызове deleteMessages
+DELETE_MESSAGES_BATCH_SIZE = 100
+
 
 class MessageService:
-    def __init__(self, ticket_service: TicketService, statistics_service: StatisticsService, rating_service: RatingService = None, balance_service: BalanceService = None, bot=None):
+    def __init__(self, ticket_service: TicketService, statistics_service: StatisticsService, rating_service: RatingService = None, balance_service: BalanceService = None, bot=None, ticket_history_service: TicketHistoryService = None, admin_directory=None, admin_menu_service: AdminMenuService = None):
         self.ticket_service = ticket_service
         self.statistics_service = statistics_service
         self.rating_service = rating_service
         self.balance_service = balance_service
         self.bot = bot
+        self.ticket_history_service = ticket_history_service
+        self.admin_directory = admin_directory
+        self.admin_menu_service = admin_menu_service or AdminMenuService(statistics_service, balance_service)
 
     async def process_command(self, message: Message, command: str, state: FSMContext):
         if command == '/start':
@@ -158,7 +168,7 @@ class MessageService:
                 else:
                     greeting = "Добрый вечер 🌙"
 
-                active_tickets = self.statistics_service.get_active_tickets_count(admin_id=message.from_user.id)
+                active_tickets = self.statistics_service.get_admin_snapshot(message.from_user.id).active
 
                 text = f"{greeting}, {message.from_user.full_name}!\n\nУ вас <b>{active_tickets}</b> тикета(ов) в работе."
 
@@ -194,32 +204,8 @@ class MessageService:
             message.message_thread_id == message.chat.id
         )
 
-        from datetime import datetime
-        hour = datetime.now().hour
-        if 5 <= hour < 12:
-            greeting = "Доброе утро ☀️"
-        elif 12 <= hour < 18:
-            greeting = "Добрый день 🌤"
-        else:
-            greeting = "Добрый вечер 🌙"
-
-        active_tickets = self.statistics_service.get_active_tickets_count(admin_id=message.from_user.id)
-        balance = self.balance_service.get_admin_balance(message.from_user.id) if self.balance_service else 0.0
-
-        text = f"{greeting}, {message.from_user.full_name}!\n\n"
-        text += f"🎫 Активных тикетов: <b>{active_tickets}</b>\n"
-        text += f"💰 Баланс: <b>{balance:.2f} ₽</b>"
-
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(text="📊 Статистика", callback_data="show_stats"),
-                InlineKeyboardButton(text="💰 Подробный баланс", callback_data="show_balance")
-            ],
-            [
-                InlineKeyboardButton(text="📖 Памятка", callback_data="show_help_memo"),
-                InlineKeyboardButton(text="🏆 Топ статистика", callback_data="show_top_stats")
-            ]
-        ])
+        text = await self.admin_menu_service.render(message.from_user.id, message.from_user.full_name)
+        keyboard = self.admin_menu_service.keyboard()
 
         await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
 
@@ -264,21 +250,15 @@ class MessageService:
                 await message.answer("❌ Укажите имя пользователя: /stat @username")
                 return
 
-            try:
-                from App.Infrastructure.Config import config
-                admins = await self.bot.get_chat_administrators(config.SUPPORT_CHANNEL_ID)
-                for admin in admins:
-                    admin_username = admin.user.username
-                    if admin_username and admin_username.lower() == username.lower():
-                        target_admin_id = admin.user.id
-                        break
-                else:
+            if self.admin_directory:
+                target_admin_id = self.admin_directory.resolve_username(username)
+                if target_admin_id is None:
                     await message.answer(f"❌ Администратор @{username} не найден в канале поддержки")
                     return
-            except Exception as e:
-                await message.answer("❌ Ошибка получения списка администраторов")
-                logger.error(f"Ошибка получения администраторов канала: {e}")
-                return
+            else:
+                target_admin_id = await self._find_admin_by_username(message, username)
+                if target_admin_id is None:
+                    return
 
         try:
             stats_text = await self.statistics_service.generate_stats_text(target_admin_id)
@@ -287,6 +267,20 @@ class MessageService:
             await message.answer("❌ Ошибка при получении статистики")
             logger.error(f"Ошибка генерации статистики для admin_id {target_admin_id}: {e}")
 
+    async def _find_admin_by_username(self, message: Message, username: str):
+        """Поиск администратора через Bot API, если AdminDirectory не подключен"""
+        try:
+            admins = await self.bot.get_chat_administrators(config.SUPPORT_CHANNEL_ID)
+            for admin in admins:
+                admin_username = admin.user.username
+                if admin_username and admin_username.lower() == username.lower():
+                    return admin.user.id
+            await message.answer(f"❌ Администратор @{username} не найден в канале поддержки")
+        except Exception as e:
+            await message.answer("❌ Ошибка получения списка администраторов")
+            logger.error(f"Ошибка получения администраторов канала: {e}")
+        return None
+
     async def _handle_balance(self, message: Message):
         """Обработчик команды /balance"""
         if not self._is_admin(message.from_user.id):
@@ -315,52 +309,73 @@ class MessageService:
             return
 
         try:
-            # Получаем список сообщений из топика
-            messages_to_delete = []
-            offset_id = 0
-
-            while True:
-                # Получаем пакет сообщений из топика
-                chat_messages = await self.bot.get_chat_history(
-                    chat_id=chat_id,
-                    offset=offset_id,
-                    limit=100,
-                    reply_to_message_id=None
-                )
-
-                # Фильтруем только сообщения из этого топика
-                thread_messages = [
-                    msg for msg in chat_messages
-                    if getattr(msg, 'message_thread_id', None) == thread_id or msg.message_id == thread_id
-                ]
-
-                if not thread_messages:
-                    break
+            message_ids = []
+            if self.ticket_history_service:
+                message_ids = await self.ticket_history_service.get_topic_message_ids(thread_id)
+            # Служебное сообщение создания топика удалить нельзя
+            message_ids = [message_id for message_id in message_ids if message_id != thread_id]
+            if message.message_id not in message_ids:
+                message_ids.append(message.message_id)
 
-                messages_to_delete.extend(thread_messages)
-                offset_id = thread_messages[-1].message_id
+            total = len(message_ids)
+            progress = await message.answer(f"🧹 Очистка топика: 0/{total}")
 
-                if len(chat_messages) < 100:
-                    break
-
-            # Удаляем сообщения (не удаляем системные и служебные)
             deleted_count = 0
-            for msg in messages_to_delete:
-                if hasattr(msg, 'from_user') and msg.from_user:  # Исключаем системные сообщения
+            for start in range(0, total, DELETE_MESSAGES_BATCH_SIZE):
+                batch = message_ids[start:start + DELETE_MESSAGES_BATCH_SIZE]
+                deleted = await self._delete_messages_batch(chat_id, batch)
+                deleted_count += len(deleted)
+                if deleted and self.ticket_history_service:
+                    await self.ticket_history_service.forget_topic_messages(thread_id, deleted)
+
+                if start + DELETE_MESSAGES_BATCH_SIZE < total:
                     try:
-                        await self.bot.delete_message(chat_id, msg.message_id)
-                        deleted_count += 1
+                        await progress.edit_text(f"🧹 Очистка топика: {deleted_count}/{total}")
                     except Exception as e:
-                        logger.warning(f"Не удалось удалить сообщение {msg.message_id}: {e}")
-                        continue
+                        logger.debug(f"Не удалось обновить прогресс очистки: {e}")
+                    await asyncio.sleep(config.CLEAR_BATCH_DELAY)
 
             success_text = config.bot_messages.get('clear_success', '🧹 Чат очищен. Удалено сообщений: {deleted_count}')
-            await message.answer(success_text.format(deleted_count=deleted_count))
+            await progress.edit_text(success_text.format(deleted_count=deleted_count))
 
         except Exception as e:
             await message.answer("❌ Ошибка при очистке чата.")
             logger.error(f"Ошибка очистки чата от администратора {message.from_user.id}: {e}")
 
+    async def _delete_messages_batch(self, chat_id: int, message_ids: list[int]) -> list[int]:
+        """Удаляет пакет сообщений одним вызовом deleteMessages с учетом flood control.
+
+        Если пакет отклонен, сообщения удаляются по одному. Возвращает id
+        действительно удаленных сообщений.
+        """
+        for attempt in range(3):
+            try:
+                await self.bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+                return message_ids
+            except TelegramRetryAfter as e:
+                logger.warning(f"Flood control при очистке топика, ждем {e.retry_after} с")
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                logger.warning(f"Не удалось удалить пакет из {len(message_ids)} сообщений, удаляем по одному: {e}")
+                break
+        else:
+            return []
+
+        deleted = []
+        for message_id in message_ids:
+            for attempt in range(2):
+                try:
+                    await self.bot.delete_message(chat_id=chat_id, message_id=message_id)
+                    deleted.append(message_id)
+                    break
+                except TelegramRetryAfter as e:
+                    logger.warning(f"Flood control при очистке топика, ждем {e.retry_after} с")
+                    await asyncio.sleep(e.retry_after)
+                except Exception as e:
+                    logger.debug(f"Не удалось удалить сообщение {message_id}: {e}")
+                    break
+        return deleted
+
     async def _handle_close(self, message: Message, state: FSMContext):
         user_id = message.from_user.id
 
@@ -1,76 +1,162 @@
 import logging
+from dataclasses import dataclass
+from datetime import timezone
 from typing import Optional
 
+from sqlalchemy import BigInteger, Text, cast, func, literal, literal_column, select, true, update
+from sqlalchemy.dialects.postgresql import insert
+
 from App.Infrastructure.Models.database import get_db
-from App.Infrastructure.Models import TicketRating
+from App.Infrastructure.Models import Ticket, TicketRating
+from App.Infrastructure.Models.rollups import bump_admin_daily_stats
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class RatingResult:
+    ticket_id: int
+    display_id: int
+    user_id: int
+    username: Optional[str]
+    taken_by: Optional[int]
+    rating: int
+    comment: Optional[str]
+    inserted: bool
+    previous_rating: Optional[int] = None
+
+
 class RatingService:
     """Сервис для управления оценками тикетов"""
 
-    def __init__(self):
+    def __init__(self, statistics_service=None):
+        self.statistics_service = statistics_service
         logger.info("RatingService инициализирован")
 
-    def save_ticket_rating(self, ticket_display_id: int, user_id: int, rating: int) -> bool:
-        """Сохранить оценку тикета в отдельную таблицу"""
+    def upsert_rating(self, user_id: Optional[int], rating: Optional[int] = None, comment: Optional[str] = None,
+                      ticket_display_id: int = None, ticket_id: int = None) -> Optional[RatingResult]:
+        """Записать оценку и/или комментарий одним INSERT ... ON CONFLICT DO UPDATE.
+
+        Тикет ищется по display_id или по id внутри того же запроса. Без rating
+        обновляется только комментарий существующей оценки. user_id=None
+        означает владельца тикета (REST API).
+        """
+        ticket_filter = Ticket.id == ticket_id if ticket_id is not None else Ticket.display_id == ticket_display_id
+        ticket = select(Ticket.id, Ticket.display_id, Ticket.user_id, Ticket.username, Ticket.taken_by).where(ticket_filter).cte("ticket")
+        rater_id = func.coalesce(cast(literal(user_id), BigInteger), ticket.c.user_id)
+
+        if rating is None:
+            written = update(TicketRating).where(
+                TicketRating.ticket_id == ticket.c.id,
+                TicketRating.user_id == rater_id
+            ).values(comment=comment).returning(
+                TicketRating.ticket_id, TicketRating.user_id, TicketRating.rating, TicketRating.comment,
+                literal(False).label("inserted")
+            ).cte("written")
+            previous = None
+        else:
+            previous = select(TicketRating.rating, TicketRating.created_at).join(
+                ticket, TicketRating.ticket_id == ticket.c.id
+            ).where(TicketRating.user_id == rater_id).cte("previous")
+            stmt = insert(TicketRating).from_select(
+                ["ticket_id", "user_id", "rating", "comment"],
+                select(ticket.c.id, rater_id, literal(rating), cast(literal(comment), Text))
+            )
+            written = stmt.on_conflict_do_update(
+                constraint="uq_ticket_ratings_ticket_id_user_id",
+                set_={"rating": stmt.excluded.rating, "comment": func.coalesce(stmt.excluded.comment, TicketRating.comment)}
+            ).returning(
+                TicketRating.ticket_id, TicketRating.user_id, TicketRating.rating, TicketRating.comment,
+                literal_column("xmax = 0").label("inserted")
+            ).cte("written")
+
+        columns = [written.c.ticket_id, ticket.c.display_id, written.c.user_id, ticket.c.username, ticket.c.taken_by,
+                   written.c.rating, written.c.comment, written.c.inserted]
+        query = select(*columns).join_from(written, ticket, written.c.ticket_id == ticket.c.id)
+        if previous is not None:
+            query = query.add_columns(previous.c.rating.label("previous_rating"), previous.c.created_at.label("rated_at"))
+            query = query.outerjoin(previous, true())
+
         db = get_db()
         try:
-            from App.Infrastructure.Models import Ticket
-            ticket_record = db.query(Ticket).filter(Ticket.display_id == ticket_display_id).first()
-            if not ticket_record:
-                logger.warning(f"Тикет с display_id {ticket_display_id} не найден")
-                return False
-
-            existing_rating = db.query(TicketRating).filter(
-                TicketRating.ticket_id == ticket_record.id,
-                TicketRating.user_id == user_id
-            ).first()
-            if existing_rating:
-                existing_rating.rating = rating
-                logger.info(f"Обновлен рейтинг для тикета #{ticket_display_id}: {rating}/5")
-            else:
-                new_rating = TicketRating(
-                    ticket_id=ticket_record.id,
-                    user_id=user_id,
-                    rating=rating
-                )
-                db.add(new_rating)
-                logger.info(f"Создан новый рейтинг для тикета #{ticket_display_id}: {rating}/5")
+            if rating is not None:
+                # Одновременные оценки одного тикета от одного пользователя выполняются по очереди:
+                # основной запрос берет снимок после блокировки и видит оценку, записанную первой,
+                # иначе previous у второго пуст и admin_daily_stats не получает разницу оценок
+                lock_key = func.hashtextextended(func.concat(
+                    "ticket_rating:", Ticket.id, ":", func.coalesce(cast(literal(user_id), BigInteger), Ticket.user_id)
+                ), 0)
+                db.execute(select(func.pg_advisory_xact_lock(lock_key)).where(ticket_filter))
+            row = db.execute(query).mappings().first()
+            if not row:
+                db.rollback()
+                return None
 
+            result = RatingResult(
+                ticket_id=row["ticket_id"],
+                display_id=row["display_id"],
+                user_id=row["user_id"],
+                username=row["username"],
+                taken_by=row["taken_by"],
+                rating=row["rating"],
+                comment=row["comment"],
+                inserted=row["inserted"],
+                previous_rating=row.get("previous_rating")
+            )
+            if rating is not None:
+                if result.inserted:
+                    bump_admin_daily_stats(db, result.taken_by, rating_sum=result.rating, rating_count=1)
+                elif result.previous_rating is not None:
+                    rated_day = row["rated_at"].astimezone(timezone.utc).date() if row["rated_at"] else None
+                    bump_admin_daily_stats(db, result.taken_by, rated_day, rating_sum=result.rating - result.previous_rating)
             db.commit()
-            return True
-        except Exception as e:
+        except Exception:
             db.rollback()
-            logger.error(f"Ошибка сохранения оценки для тикета #{ticket_display_id}: {e}")
-            return False
+            raise
         finally:
             db.close()
 
+        if rating is not None and self.statistics_service:
+            self.statistics_service.on_ticket_rated(result.taken_by)
+        return result
+
+    def save_ticket_rating(self, ticket_display_id: int, user_id: int, rating: int) -> bool:
+        """Сохранить оценку тикета в отдельную таблицу"""
+        try:
+            result = self.upsert_rating(user_id, rating, ticket_display_id=ticket_display_id)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения оценки для тикета #{ticket_display_id}: {e}")
+            return False
+
+        if not result:
+            logger.warning(f"Тикет с display_id {ticket_display_id} не найден")
+            return False
+        if result.inserted:
+            logger.info(f"Создан новый рейтинг для тикета #{ticket_display_id}: {rating}/5")
+        else:
+            logger.info(f"Обновлен рейтинг для тикета #{ticket_display_id}: {rating}/5")
+        return True
+
     def save_ticket_comment(self, ticket_display_id: int, user_id: int, comment: str):
         """Сохранить комментарий к рейтингу тикета"""
-        db = get_db()
         try:
-            from App.Infrastructure.Models import Ticket
-            ticket_record = db.query(Ticket).filter(Ticket.display_id == ticket_display_id).first()
-            if not ticket_record:
-                logger.warning(f"Тикет с display_id {ticket_display_id} не найден для комментария")
-                return
-
-            existing_rating = db.query(TicketRating).filter(
-                TicketRating.ticket_id == ticket_record.id,
-                TicketRating.user_id == user_id
-            ).first()
-
-            if existing_rating:
-                existing_rating.comment = comment
-                db.commit()
-                logger.info(f"Добавлен комментарий к рейтингу тикета #{ticket_display_id}")
-            else:
-                logger.warning(f"Рейтинг не найден для комментария к тикету #{ticket_display_id}")
+            result = self.upsert_rating(user_id, comment=comment, ticket_display_id=ticket_display_id)
         except Exception as e:
-            db.rollback()
             logger.error(f"Ошибка сохранения комментария для тикета #{ticket_display_id}: {e}")
+            return
+
+        if result:
+            logger.info(f"Добавлен комментарий к рейтингу тикета #{ticket_display_id}")
+        else:
+            logger.warning(f"Рейтинг не найден для комментария к тикету #{ticket_display_id}")
+
+    def get_ticket_rating(self, ticket_display_id: int, user_id: int) -> Optional[int]:
+        """Оценка пользователя по тикету (один запрос)"""
+        db = get_db()
+        try:
+            return db.query(TicketRating.rating).join(Ticket, Ticket.id == TicketRating.ticket_id).filter(
+                Ticket.display_id == ticket_display_id,
+                TicketRating.user_id == user_id
+            ).scalar()
         finally:
             db.close()
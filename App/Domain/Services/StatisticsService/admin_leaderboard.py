@@ -0,0 +1,142 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from App.Infrastructure.Models.database import get_db
+from App.Infrastructure.Models import AdminDailyStats
+from App.Infrastructure.Models.rollups import utc_today
+
+logger = logging.getLogger(__name__)
+
+
+class AdminLeaderboard:
+    """Скользящий рейтинг администраторов по закрытым тикетам в памяти.
+
+    Хранит дневные корзины закрытых тикетов по каждому администратору за
+    window_days дней. Заполняется из admin_daily_stats при старте, обновляется
+    на каждом закрытии и раз в reconcile_interval секунд сверяется с основной
+    БД (реплика может отставать). Закрытия, записанные после снимка сверки,
+    доигрываются поверх загруженных корзин.
+    """
+
+    def __init__(self, window_days: int = 30, reconcile_interval: int = 900):
+        self.window_days = window_days
+        self.reconcile_interval = reconcile_interval
+        self._buckets: dict[int, dict[date, int]] = {}
+        self._reconcile_task: Optional[asyncio.Task] = None
+        # Закрытия после снимка идущей сверки (None - сверки нет)
+        self._replay: Optional[list[tuple[int, date]]] = None
+
+    def _window_start(self) -> date:
+        return utc_today() - timedelta(days=self.window_days - 1)
+
+    def seed(self):
+        """Загрузить корзины из admin_daily_stats"""
+        self._buckets = self._load()
+        logger.info(f"AdminLeaderboard загружен: {len(self._buckets)} администраторов")
+
+    def start(self):
+        if self._reconcile_task is None:
+            self._reconcile_task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self):
+        if self._reconcile_task:
+            self._reconcile_task.cancel()
+            try:
+                await self._reconcile_task
+            except asyncio.CancelledError:
+                pass
+            self._reconcile_task = None
+
+    def record_close(self, admin_id: Optional[int], day: date = None):
+        if not admin_id:
+            return
+        day = day or utc_today()
+        self._add(self._buckets, admin_id, day)
+        if self._replay is not None:
+            self._replay.append((admin_id, day))
+
+    @staticmethod
+    def _add(buckets_by_admin: dict[int, dict[date, int]], admin_id: int, day: date):
+        buckets = buckets_by_admin.setdefault(admin_id, {})
+        buckets[day] = buckets.get(day, 0) + 1
+
+    def top(self, limit: int = 10) -> list[tuple[int, int]]:
+        """Администраторы с наибольшим числом закрытых тикетов за окно"""
+        start = self._window_start()
+        totals = []
+        for admin_id, buckets in list(self._buckets.items()):
+            for day in [d for d in buckets if d < start]:
+                del buckets[day]
+            if not buckets:
+                del self._buckets[admin_id]
+                continue
+            totals.append((admin_id, sum(buckets.values())))
+        totals.sort(key=lambda item: item[1], reverse=True)
+        return totals[:limit]
+
+    def best(self) -> tuple[Optional[int], int]:
+        top = self.top(limit=1)
+        return top[0] if top else (None, 0)
+
+    @staticmethod
+    def _open_snapshot() -> Session:
+        """Сессия REPEATABLE READ с уже взятым снимком"""
+        db = get_db()
+        try:
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            db.execute(text("SELECT 1"))
+        except Exception:
+            db.close()
+            raise
+        return db
+
+    def _load(self, db: Session = None) -> dict[int, dict[date, int]]:
+        db = db or get_db()
+        try:
+            rows = db.query(AdminDailyStats.admin_id, AdminDailyStats.day, AdminDailyStats.closed_count).filter(
+                AdminDailyStats.day >= self._window_start(),
+                AdminDailyStats.closed_count > 0
+            ).all()
+        finally:
+            db.close()
+
+        buckets: dict[int, dict[date, int]] = defaultdict(dict)
+        for admin_id, day, closed_count in rows:
+            buckets[admin_id][day] = closed_count
+        return dict(buckets)
+
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            # Закрытие коммитится и попадает в record_close синхронно в цикле событий, поэтому
+            # каждое закрытие либо есть в снимке, взятом здесь же, либо попадет в _replay
+            try:
+                db = self._open_snapshot()
+            except Exception as e:
+                logger.warning(f"Ошибка сверки рейтинга администраторов: {e}")
+                continue
+            self._replay = []
+            try:
+                fresh = await asyncio.to_thread(self._load, db)
+            except Exception as e:
+                logger.warning(f"Ошибка сверки рейтинга администраторов: {e}")
+                continue
+            finally:
+                replay, self._replay = self._replay, None
+
+            for admin_id, day in replay:
+                self._add(fresh, admin_id, day)
+
+            drift = sum(
+                abs(sum(fresh.get(admin_id, {}).values()) - sum(self._buckets.get(admin_id, {}).values()))
+                for admin_id in set(fresh) | set(self._buckets)
+            )
+            if drift:
+                logger.info(f"Рейтинг администраторов сверен с БД, расхождение: {drift}")
+            self._buckets = fresh
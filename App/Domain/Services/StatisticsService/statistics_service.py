@@ -1,35 +1,228 @@
 import logging
-import io
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime, timedelta
-
-from App.Infrastructure.Models.database import get_db
-from App.Infrastructure.Models import Ticket, AdminBalance
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from App.Domain.Enums.TicketEventType.TicketEventType import TicketEventType
+from App.Domain.Enums.TicketStatus.TicketStatus import TicketStatus, ACTIVE_TICKET_STATUSES
+from App.Domain.Services.StatisticsService.admin_leaderboard import AdminLeaderboard
+from App.Infrastructure.Components.Charts.render_pool import ChartRenderPool
+from App.Infrastructure.Components.Charts.stats_image_cache import StatsImage, StatsImageCache
+from App.Infrastructure.Config import config
+from App.Infrastructure.Models.database import get_read_db
+from App.Infrastructure.Models import Ticket, AdminBalance, AdminDailyStats
+from App.Infrastructure.Models.rollups import utc_today
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class SlaRow:
+    """Перцентили времени первого ответа и закрытия (в секундах) для группы тикетов"""
+    admin_id: Optional[int]
+    category: Optional[str]
+    tickets: int
+    first_response_p50: Optional[float]
+    first_response_p90: Optional[float]
+    resolution_p50: Optional[float]
+    resolution_p90: Optional[float]
+
+
+@dataclass
+class AdminSnapshot:
+    """Сводная статистика администратора"""
+    active: int = 0
+    today: int = 0
+    week: int = 0
+    month: int = 0
+    rating: float = 0.0
+
+
 class StatisticsService:
     """Сервис для генерации статистики с графиками"""
 
-    def __init__(self, bot=None):
+    def __init__(self, bot=None, admin_directory=None, render_pool: ChartRenderPool = None, image_cache: StatsImageCache = None,
+                 leaderboard: AdminLeaderboard = None):
         self.bot = bot
+        self.admin_directory = admin_directory
+        self.render_pool = render_pool or ChartRenderPool()
+        self.image_cache = image_cache or StatsImageCache()
+        self.leaderboard = leaderboard
         logger.info("StatisticsService инициализирован")
 
     def get_active_tickets_count(self, admin_id: int = None) -> int:
         """Получить количество активных тикетов"""
-        db = get_db()
+        db = get_read_db()
         try:
-            query = db.query(Ticket).filter(Ticket.status.in_(["pending", "taken", "answered"]))
+            query = db.query(Ticket).filter(Ticket.status.in_(ACTIVE_TICKET_STATUSES))
             if admin_id:
                 query = query.filter(Ticket.taken_by == admin_id)
             return query.count()
         finally:
             db.close()
 
+    @staticmethod
+    def _period_start(days: int) -> date:
+        """Первый день окна из days календарных дней, включая сегодня"""
+        return utc_today() - timedelta(days=days - 1)
+
+    def get_admin_snapshot(self, admin_id: int) -> AdminSnapshot:
+        """Получить статистику администратора одним запросом по admin_daily_stats"""
+        from sqlalchemy import func, select
+
+        today = utc_today()
+        week_start = self._period_start(7)
+        month_start = self._period_start(30)
+
+        db = get_read_db()
+        try:
+            active = select(func.count(Ticket.id)).where(
+                Ticket.taken_by == admin_id,
+                Ticket.status.in_(ACTIVE_TICKET_STATUSES)
+            ).scalar_subquery()
+
+            row = db.query(
+                active.label("active"),
+                func.coalesce(func.sum(AdminDailyStats.closed_count).filter(AdminDailyStats.day == today), 0).label("today"),
+                func.coalesce(func.sum(AdminDailyStats.closed_count).filter(AdminDailyStats.day >= week_start), 0).label("week"),
+                func.coalesce(func.sum(AdminDailyStats.closed_count).filter(AdminDailyStats.day >= month_start), 0).label("month"),
+                func.sum(AdminDailyStats.rating_sum).label("rating_sum"),
+                func.sum(AdminDailyStats.rating_count).label("rating_count")
+            ).filter(AdminDailyStats.admin_id == admin_id).one()
+
+            rating = round(row.rating_sum / row.rating_count, 1) if row.rating_count else 0.0
+            return AdminSnapshot(
+                active=row.active,
+                today=int(row.today),
+                week=int(row.week),
+                month=int(row.month),
+                rating=rating
+            )
+        finally:
+            db.close()
+
+    def get_top_admins(self, days: int = 30, limit: int = 10) -> list[tuple[int, int]]:
+        """Администраторы с наибольшим числом закрытых тикетов за days дней"""
+        from sqlalchemy import func
+
+        if self.leaderboard and self.leaderboard.window_days == days:
+            return self.leaderboard.top(limit)
+
+        db = get_read_db()
+        try:
+            closed = func.sum(AdminDailyStats.closed_count)
+            rows = db.query(AdminDailyStats.admin_id, closed.label("closed_count")).filter(
+                AdminDailyStats.day >= self._period_start(days)
+            ).group_by(AdminDailyStats.admin_id).having(closed > 0).order_by(closed.desc()).limit(limit).all()
+            return [(admin_id, int(count)) for admin_id, count in rows]
+        finally:
+            db.close()
+
+    def get_sla_report(self, days: int = 30) -> tuple[list[SlaRow], list[SlaRow]]:
+        """SLA по тикетам, созданным за days дней: строки по администраторам и по категориям.
+
+        Считается одним запросом по ticket_events: для каждого тикета берутся
+        моменты создания, первого ответа поддержки и закрытия, затем
+        перцентили по GROUPING SETS (taken_by), (category).
+        """
+        from sqlalchemy import func, select, extract
+        from App.Infrastructure.Models import TicketEvent
+        from App.Domain.Services.ArchiveService.archive_service import tickets_with_archive
+
+        since = datetime.now() - timedelta(days=days)
+
+        def first(event_type: TicketEventType):
+            return func.min(TicketEvent.created_at).filter(TicketEvent.event_type == event_type.value)
+
+        created_in_window = select(TicketEvent.ticket_id).where(
+            TicketEvent.event_type == TicketEventType.CREATED.value,
+            TicketEvent.created_at >= since
+        )
+        per_ticket = select(
+            TicketEvent.ticket_id,
+            first(TicketEventType.CREATED).label("created_at"),
+            first(TicketEventType.SUPPORT_REPLY).label("first_reply_at"),
+            first(TicketEventType.CLOSED).label("closed_at")
+        ).where(TicketEvent.ticket_id.in_(created_in_window)).group_by(TicketEvent.ticket_id).cte("per_ticket")
+
+        first_response = extract("epoch", per_ticket.c.first_reply_at - per_ticket.c.created_at)
+        resolution = extract("epoch", per_ticket.c.closed_at - per_ticket.c.created_at)
+
+        def percentile(fraction: float, expr):
+            return func.percentile_cont(fraction).within_group(expr)
+
+        tickets = tickets_with_archive()
+        query = select(
+            tickets.c.taken_by,
+            tickets.c.category,
+            func.grouping(tickets.c.taken_by).label("by_category"),
+            func.count().label("tickets"),
+            percentile(0.5, first_response).label("first_response_p50"),
+            percentile(0.9, first_response).label("first_response_p90"),
+            percentile(0.5, resolution).label("resolution_p50"),
+            percentile(0.9, resolution).label("resolution_p90")
+        ).join(tickets, tickets.c.id == per_ticket.c.ticket_id).group_by(
+            func.grouping_sets(tickets.c.taken_by, tickets.c.category)
+        ).order_by(func.count().desc())
+
+        db = get_read_db()
+        try:
+            rows = db.execute(query).all()
+        finally:
+            db.close()
+
+        by_admin, by_category = [], []
+        for row in rows:
+            sla_row = SlaRow(
+                admin_id=row.taken_by,
+                category=row.category,
+                tickets=row.tickets,
+                first_response_p50=row.first_response_p50,
+                first_response_p90=row.first_response_p90,
+                resolution_p50=row.resolution_p50,
+                resolution_p90=row.resolution_p90
+            )
+            (by_category if row.by_category else by_admin).append(sla_row)
+        return by_admin, by_category
+
+    async def generate_sla_text(self, days: int = 30) -> str:
+        """Текстовый отчет SLA для меню администратора"""
+        by_admin, by_category = self.get_sla_report(days)
+
+        def duration(seconds: Optional[float]) -> str:
+            if seconds is None:
+                return "—"
+            minutes = int(seconds // 60)
+            if minutes < 60:
+                return f"{minutes}м"
+            hours, minutes = divmod(minutes, 60)
+            if hours < 24:
+                return f"{hours}ч {minutes}м"
+            days_count, hours = divmod(hours, 24)
+            return f"{days_count}д {hours}ч"
+
+        def line(name: str, row: SlaRow) -> str:
+            return (f"• {name} ({row.tickets}): ответ {duration(row.first_response_p50)} / {duration(row.first_response_p90)}, "
+                    f"закрытие {duration(row.resolution_p50)} / {duration(row.resolution_p90)}\n")
+
+        text = f"⏱ <b>SLA ЗА {days} ДНЕЙ</b>\n<i>медиана / 90-й перцентиль</i>\n\n"
+        if not by_admin and not by_category:
+            return text + "Нет данных"
+
+        text += "👤 <b>По администраторам:</b>\n"
+        for row in by_admin:
+            name = await self._get_admin_display_name(row.admin_id) if row.admin_id else "Не взяты"
+            text += line(name, row)
+
+        text += "\n🗂 <b>По категориям:</b>\n"
+        for row in by_category:
+            text += line(row.category or "Без категории", row)
+        return text
+
     async def _get_admin_display_name(self, admin_id: int) -> str:
         """Получить отображаемое имя администратора (username или user_id)"""
+        if self.admin_directory:
+            return self.admin_directory.display_name(admin_id)
         if not self.bot:
             return f"Админ {admin_id}"
         try:
@@ -43,7 +236,7 @@ class StatisticsService:
 
     def get_closed_tickets_count(self, period: str = "today", admin_id: int = None) -> int:
         """Получить количество закрытых тикетов за период"""
-        db = get_db()
+        db = get_read_db()
         try:
             now = datetime.now()
             if period == "today":
@@ -56,7 +249,7 @@ class StatisticsService:
                 start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
 
             query = db.query(Ticket).filter(
-                Ticket.status == "closed",
+                Ticket.status == TicketStatus.CLOSED,
                 Ticket.closed_at >= start_date
             )
             if admin_id:
@@ -67,130 +260,75 @@ class StatisticsService:
 
     def get_best_admin_by_closed(self):
         """Получить лучшего администратора по количеству закрытых тикетов за месяц"""
-        db = get_db()
-        try:
-            now = datetime.now()
-            start_date = now - timedelta(days=30)
-
-            from sqlalchemy import func
-            result = db.query(Ticket.taken_by, func.count(Ticket.id).label("closed_count")).filter(
-                Ticket.status == "closed",
-                Ticket.closed_at >= start_date,
-                Ticket.taken_by.isnot(None)
-            ).group_by(Ticket.taken_by).order_by(func.count(Ticket.id).desc()).first()
-
-            if result:
-                return result[0], result[1]
-            return None, 0
-        finally:
-            db.close()
-
-    def generate_stats_image(self, admin_id: int) -> bytes:
+        top = self.get_top_admins(30, limit=1)
+        if top:
+            return top[0]
+        return None, 0
+
+    async def get_best_admin_text(self) -> str:
+        """Строка "лучший администратор месяца" для меню (пустая, если нет данных)"""
+        admin_id, closed_count = self.get_best_admin_by_closed()
+        template = config.bot_messages.get('best_admin')
+        if not admin_id or not template:
+            return ""
+        admin_name = await self._get_admin_display_name(admin_id)
+        return template.format(admin_name=admin_name, closed_count=closed_count)
+
+    def on_ticket_closed(self, admin_id: int = None):
+        """Хук закрытия тикета: обновляет рейтинг и сбрасывает кэш картинок"""
+        if self.leaderboard:
+            self.leaderboard.record_close(admin_id)
+        self.image_cache.invalidate_admin(admin_id)
+
+    def on_ticket_auto_closed(self, admin_id: int = None):
+        """Хук автоматического закрытия тикета: в рейтинг не идет, сбрасывает кэш картинок"""
+        self.image_cache.invalidate_admin(admin_id)
+
+    def on_ticket_rated(self, admin_id: int = None):
+        """Хук новой оценки тикета: сбрасывает кэш картинок статистики"""
+        self.image_cache.invalidate_admin(admin_id)
+
+    async def generate_stats_image(self, admin_id: int) -> StatsImage:
         """Генерировать изображение с графиком статистики администратора"""
-        today = self.get_closed_tickets_count("today", admin_id)
-        week = self.get_closed_tickets_count("week", admin_id)
-        month = self.get_closed_tickets_count("month", admin_id)
-        active = self.get_active_tickets_count(admin_id)
-
-        periods = ['Сегодня', 'За неделю', 'За месяц']
-        closed_counts = [today, week, month]
-
-        sns.set_style("whitegrid")
-        plt.figure(figsize=(8, 5))
-        plt.suptitle(f'Статистика администратора {admin_id}', fontsize=16, fontweight='bold')
-        plt.subplot(1, 2, 1)
-
-        plt.bar(periods, closed_counts, color=['skyblue', 'lightgreen', 'coral'])
-        plt.title('Закрытые тикеты', fontsize=14)
-        plt.ylabel('Количество', fontsize=12)
-
-        plt.subplot(1, 2, 2)
-        plt.axis('off')
-        info_text = f"""Активных тикетов: {active}
-Закрыто сегодня: {today}
-За неделю: {week}
-За месяц: {month}"""
-        plt.text(0.1, 0.5, info_text, fontsize=12, verticalalignment='center', bbox=dict(boxstyle="round,pad=0.5", facecolor="wheat"))
-
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-        plt.close()
-        buf.seek(0)
-        return buf.getvalue()
-
-    async def generate_top_stats_image(self) -> bytes:
-        """Генерировать изображение с статистикой"""
-        from App.Infrastructure.Models.database import get_db
-        from datetime import datetime, timedelta
-        from sqlalchemy import func
+        view = self.image_cache.admin_view(admin_id)
+        cached = self.image_cache.get_view(view)
+        if cached:
+            return cached
 
-        db = get_db()
-        try:
-            now = datetime.now()
-            start_date = now - timedelta(days=30)
-
-            results = db.query(Ticket.taken_by, func.count(Ticket.id).label("closed_count")).filter(
-                Ticket.status == "closed",
-                Ticket.closed_at >= start_date,
-                Ticket.taken_by.isnot(None)
-            ).group_by(Ticket.taken_by).order_by(func.count(Ticket.id).desc()).limit(10).all()
-
-            plt.style.use('dark_background')
-            fig, ax = plt.subplots(figsize=(10, 8), facecolor='black')
-            ax.axis('off')
-
-            fig.suptitle('ТОП ПОДДЕРЖКИ ЗА 30 ДНЕЙ', fontsize=18, fontweight='bold', color='white', y=0.93)
-
-            if results:
-                table_data = []
-                for i, (admin_id, count) in enumerate(results, 1):
-                    admin_name = await self._get_admin_display_name(admin_id)
-                    table_data.append([f'{i}.', admin_name, f'{count}'])
-                col_labels = ['№', 'Админ', 'Тикетов']
-            else:
-                table_data = [['—', 'Нет данных', '—']]
-
-            table = ax.table(
-                cellText=table_data,
-                colLabels=col_labels,
-                cellLoc='center',
-                colLoc='center',
-                loc='center',
-                colWidths=[0.15, 0.4, 0.25],
-            )
+        generation = self.image_cache.generation
+        snapshot = self.get_admin_snapshot(admin_id)
 
-            table.auto_set_font_size(False)
-            table.set_fontsize(12)
-            table.scale(1, 2)
-
-            for i in range(len(col_labels)):
-                table[(0, i)].set_facecolor('#4CAF50')
-                table[(0, i)].set_text_props(weight='bold', color='white')
-
-            for i in range(1, len(table_data) + 1):
-                color = '#f0f0f0'
-                for j in range(len(col_labels)):
-                    table[(i, j)].set_facecolor(color)
-                    table[(i, j)].set_text_props(color='black')
-
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', dpi=150, bbox_inches='tight', facecolor='black')
-            plt.close()
-            plt.style.use('default')
-            buf.seek(0)
-            return buf.getvalue()
-        finally:
-            db.close()
+        data = [admin_id, snapshot.today, snapshot.week, snapshot.month, snapshot.active]
+        return await self._render_cached(view, generation, data, "render_admin_stats", *data)
+
+    async def generate_top_stats_image(self) -> StatsImage:
+        """Генерировать изображение с статистикой"""
+        view = StatsImageCache.TOP_VIEW
+        cached = self.image_cache.get_view(view)
+        if cached:
+            return cached
+
+        generation = self.image_cache.generation
+        results = self.get_top_admins(30, limit=10)
+
+        rows = [(await self._get_admin_display_name(admin_id), count) for admin_id, count in results]
+        return await self._render_cached(view, generation, rows, "render_top_stats", rows)
+
+    async def _render_cached(self, view: str, generation: int, data, render_name: str, *args) -> StatsImage:
+        """Отдает готовую картинку для тех же данных или рисует новую"""
+        data_key = self.image_cache.data_key(view, data)
+        image = self.image_cache.get_image(data_key)
+        if not image:
+            png = await self.render_pool.render(render_name, *args)
+            image = self.image_cache.put_image(data_key, png)
+        self.image_cache.bind_view(view, data_key, generation)
+        return image
 
     async def generate_stats_text(self, admin_id: int) -> str:
         """Генерировать текстовую статистику администратора для edit_message"""
         try:
-            today = self.get_closed_tickets_count("today", admin_id)
-            week = self.get_closed_tickets_count("week", admin_id)
-            month = self.get_closed_tickets_count("month", admin_id)
-            active = self.get_active_tickets_count(admin_id)
-
-            rating = self._get_admin_average_rating(admin_id)
+            snapshot = self.get_admin_snapshot(admin_id)
+            active, today, week, month, rating = snapshot.active, snapshot.today, snapshot.week, snapshot.month, snapshot.rating
 
             stats_text = "📊 <b>ВАША СТАТИСТИКА</b>\n\n"
             stats_text += f"🎫 <b>Активных тикетов:</b> {active}\n"
@@ -219,14 +357,15 @@ class StatisticsService:
             return "❌ Ошибка загрузки статистики"
 
     def _get_admin_average_rating(self, admin_id: int) -> float:
-        """Получить средний рейтинг администратора"""
-        from App.Infrastructure.Models import TicketRating
-        db = get_db()
+        """Получить средний рейтинг администратора (вместе с архивом)"""
+        from App.Domain.Services.ArchiveService.archive_service import ratings_with_archive, tickets_with_archive
+        db = get_read_db()
         try:
-            from sqlalchemy import func
-            result = db.query(func.avg(TicketRating.rating).label("avg_rating")).filter(
-                TicketRating.ticket_id.in_(
-                    db.query(Ticket.id).filter(Ticket.taken_by == admin_id)
+            from sqlalchemy import func, select
+            tickets, ratings = tickets_with_archive(), ratings_with_archive()
+            result = db.query(func.avg(ratings.c.rating).label("avg_rating")).filter(
+                ratings.c.ticket_id.in_(
+                    select(tickets.c.id).where(tickets.c.taken_by == admin_id)
                 )
             ).first()
 
@@ -241,11 +380,11 @@ class StatisticsService:
 
     def get_admin_stats_by_username(self, username: str) -> dict:
         """Получить статистику администратора по username"""
-        from App.Infrastructure.Models.database import get_db
+        from App.Infrastructure.Models.database import get_read_db
         from App.Domain.Models.Ticket.Ticket import Ticket
         from datetime import datetime, timedelta
 
-        db = get_db()
+        db = get_read_db()
         try:
             return {}
         finally:
@@ -1,11 +1,14 @@
 import logging
 from datetime import datetime
 
+from App.Domain.Enums.TicketStatus.TicketStatus import TicketStatus
 from App.Domain.Services.TicketService.ticket_service import TicketService
 from App.Domain.Services.RatingService.rating_service import RatingService
+from App.Domain.Services.TicketHistoryService.ticket_history_service import TicketHistoryService
 from App.Domain.Models.RatingRequest.RatingRequest import RatingRequest
 from App.Domain.Models.TicketResponse.TicketResponse import TicketResponse
 from App.Domain.Models.TicketStatusResponse.TicketStatusResponse import TicketStatusResponse
+from App.Domain.Models.TicketMessagesResponse.TicketMessagesResponse import TicketMessagesResponse
 from App.Domain.Models.RatingResponse.RatingResponse import RatingResponse
 from App.Domain.Models.MessageRequest.MessageRequest import MessageRequest
 from App.Domain.Models.MessageResponse.MessageResponse import MessageResponse
@@ -18,10 +21,12 @@ class TicketApplicationService:
     def __init__(
         self,
         ticket_service: TicketService,
-        rating_service: RatingService
+        rating_service: RatingService,
+        ticket_history_service: TicketHistoryService = None
     ):
         self.ticket_service = ticket_service
         self.rating_service = rating_service
+        self.ticket_history_service = ticket_history_service or TicketHistoryService()
 
     async def create_ticket(
         self,
@@ -30,10 +35,6 @@ class TicketApplicationService:
         message: str,
         category: str = ""
     ) -> TicketResponse:
-        from App.Infrastructure.Models.database import get_db
-        from App.Infrastructure.Models import Ticket as TicketModelDB
-        from App.Domain.Services.TicketService.ticket_service import TicketService
-
         ticket = await self.ticket_service.create_ticket(
             user_id=user_id,
             username=username,
@@ -41,19 +42,10 @@ class TicketApplicationService:
             category=category
         )
 
-        db = get_db()
-        try:
-            db_ticket = db.query(TicketModelDB).filter(TicketModelDB.id == ticket.db_id).first()
-            status_str = db_ticket.status if db_ticket else "pending"
-        finally:
-            db.close()
-
-
-
         return TicketResponse(
             ticket_id=ticket.db_id,
             display_id=ticket.display_id,
-            status=status_str,
+            status=ticket.status,
             message="Тикет успешно создан"
         )
 
@@ -65,54 +57,35 @@ class TicketApplicationService:
         if not (1 <= rating_request.rating <= 5):
             raise ValueError("Оценка должна быть от 1 до 5")
 
-        from App.Infrastructure.Models.database import get_db
-        from App.Infrastructure.Models import Ticket as TicketModelDB, TicketRating
-
-        db = get_db()
-        try:
-            db_ticket = db.query(TicketModelDB).filter(TicketModelDB.id == ticket_id).first()
-            if not db_ticket:
-                raise ValueError("Тикет не найден")
-
-            display_id = db_ticket.display_id
-            user_id = db_ticket.user_id
-
-            success = self.rating_service.save_ticket_rating(display_id, user_id, rating_request.rating)
-
-            if not success:
-                raise ValueError("Ошибка сохранения оценки")
-
-            if rating_request.comment:
-                self.rating_service.save_ticket_comment(display_id, user_id, rating_request.comment)
-
-            rating_record = db.query(TicketRating).filter(
-                TicketRating.ticket_id == db_ticket.id,
-                TicketRating.user_id == user_id
-            ).first()
-
-            if rating_record:
-                username = db_ticket.username or f"user_{user_id}"
-                await self.ticket_service.channel_manager.send_rating_to_reviews_topic(
-                    display_id,
-                    username,
-                    rating_record.rating,
-                    rating_request.comment
-                )
+        result = self.rating_service.upsert_rating(
+            None,
+            rating_request.rating,
+            rating_request.comment,
+            ticket_id=ticket_id
+        )
+        if not result:
+            raise ValueError("Тикет не найден")
+
+        username = result.username or f"user_{result.user_id}"
+        await self.ticket_service.channel_manager.send_rating_to_reviews_topic(
+            result.display_id,
+            username,
+            result.rating,
+            rating_request.comment
+        )
 
-            return RatingResponse(
-                success=True,
-                message="Оценка успешно сохранена"
-            )
-        finally:
-            db.close()
+        return RatingResponse(
+            success=True,
+            message="Оценка успешно сохранена"
+        )
 
     def get_ticket_status(self, ticket_id: int) -> TicketStatusResponse:
         from App.Infrastructure.Models.database import get_db
-        from App.Infrastructure.Models import Ticket as TicketModelDB
+        from App.Domain.Services.ArchiveService.archive_service import find_ticket
 
         db = get_db()
         try:
-            db_ticket = db.query(TicketModelDB).filter(TicketModelDB.id == ticket_id).first()
+            db_ticket = find_ticket(db, ticket_id=ticket_id)
             if not db_ticket:
                 raise ValueError("Тикет не найден")
 
@@ -126,6 +99,13 @@ class TicketApplicationService:
         finally:
             db.close()
 
+    def get_ticket_messages(self, ticket_id: int, before: int = None, limit: int = 50) -> TicketMessagesResponse:
+        """Страница переписки тикета (keyset по id сообщения)"""
+        page = self.ticket_history_service.get_ticket_messages(ticket_id, before, limit)
+        if page is None:
+            raise ValueError("Тикет не найден")
+        return page
+
     async def send_message_to_ticket(self, ticket_id: int, message_request: MessageRequest) -> MessageResponse:
         """Отправить сообщение в тикет"""
         try:
@@ -153,10 +133,10 @@ class TicketApplicationService:
             if not ticket:
                 raise ValueError("Тикет не найден")
 
-            if ticket.status == "closed":
+            if ticket.status == TicketStatus.CLOSED:
                 raise ValueError("Тикет уже закрыт")
 
-            if ticket.status == "cancelled":
+            if ticket.status == TicketStatus.CANCELLED:
                 raise ValueError("Тикет отменен")
 
             success = await self.ticket_service.close_ticket_by_internal_id(ticket_id)
@@ -0,0 +1,33 @@
+import logging
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from App.Domain.Enums.TicketEventType.TicketEventType import TicketEventType
+from App.Infrastructure.Models.database import get_db
+from App.Infrastructure.Models import TicketEvent
+
+logger = logging.getLogger(__name__)
+
+
+class TicketEventService:
+    """Журнал событий жизненного цикла тикетов (только добавление)"""
+
+    def record(self, ticket_id: Optional[int], event_type: TicketEventType, actor_id: Optional[int] = None,
+               db: Session = None):
+        """Записать событие; с db - в транзакции вызывающего кода (commit делает он)"""
+        if not ticket_id:
+            return
+        if db is not None:
+            db.add(TicketEvent(ticket_id=ticket_id, event_type=event_type.value, actor_id=actor_id))
+            return
+
+        db = get_db()
+        try:
+            db.add(TicketEvent(ticket_id=ticket_id, event_type=event_type.value, actor_id=actor_id))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Не удалось записать событие {event_type.value} тикета {ticket_id}: {e}")
+        finally:
+            db.close()
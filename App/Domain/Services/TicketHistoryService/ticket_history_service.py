@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from App.Domain.Models.TicketMessagesResponse.TicketMessagesResponse import TicketMessage, TicketMessagesResponse
+from App.Infrastructure.Models.database import get_db
+from App.Infrastructure.Models import Ticket, TicketArchive, TicketHistory, TicketHistoryArchive
+
+logger = logging.getLogger(__name__)
+
+
+class TicketHistoryService:
+    """Сервис истории сообщений в топиках тикетов.
+
+    Сообщения не пишутся в БД по одному: record_topic_message кладет строку в
+    буфер, который сбрасывается одним многострочным INSERT при накоплении
+    batch_size строк или раз в flush_interval секунд, и при остановке. При
+    падении процесса теряется не больше несброшенного буфера; если БД
+    недоступна, в буфере держится не больше max_pending строк, самые старые
+    отбрасываются. Если пачку отклонили из-за самих данных (нарушение
+    ключа, недопустимый текст), строки пишутся по одной и отбрасываются
+    только отклоненные.
+
+    Сообщения с ticket_id образуют переписку тикета, которая отдается
+    страницами по (ticket_id, id). Последняя страница кэшируется для
+    cache_size тикетов и сбрасывается при новом сообщении тикета.
+
+    Методы чтения и flush блокирующие (БД), из async-кода они вызываются
+    через asyncio.to_thread.
+    """
+
+    def __init__(self, batch_size: int = 200, flush_interval: float = 1.0, max_pending: int = 10000,
+                 cache_size: int = 256):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: deque[dict] = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._dropped = 0
+        self.cache_size = cache_size
+        # Кэш последних страниц и его версия защищены self._lock: страницы читаются в потоках
+        self._latest_pages: OrderedDict[int, tuple[int, TicketMessagesResponse]] = OrderedDict()
+        self._cache_version = 0
+        logger.info("TicketHistoryService инициализирован")
+
+    def start(self):
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await asyncio.to_thread(self.flush)
+
+    def record_topic_message(self, topic_thread_id: Optional[int], message_id: Optional[int], sender_id: int,
+                             text: Optional[str] = None, ticket_id: Optional[int] = None):
+        """Запомнить сообщение, появившееся в топике (запись в БД - при сбросе буфера)"""
+        if not topic_thread_id or not message_id:
+            return
+
+        with self._lock:
+            self._pending.append({
+                "ticket_id": ticket_id,
+                "sender_id": sender_id,
+                "message": text,
+                "topic_thread_id": topic_thread_id,
+                "message_id": message_id,
+                "created_at": datetime.now(timezone.utc)
+            })
+            self._trim()
+            pending = len(self._pending)
+            if ticket_id:
+                self._latest_pages.pop(ticket_id, None)
+                self._cache_version += 1
+
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Записать буфер в БД; возвращает количество записанных строк"""
+        with self._flush_lock:
+            with self._lock:
+                rows = list(self._pending)
+                self._pending.clear()
+            if not rows:
+                return 0
+
+            db = get_db()
+            try:
+                db.execute(insert(TicketHistory), rows)
+                db.commit()
+                return len(rows)
+            except (IntegrityError, DataError, ValueError) as e:
+                db.rollback()
+                logger.warning(f"Пачка истории топиков отклонена ({e}), сохраняем сообщения по одному")
+                return self._insert_one_by_one(db, rows)
+            except Exception as e:
+                db.rollback()
+                self._requeue(rows)
+                logger.warning(f"Не удалось сохранить {len(rows)} сообщений истории топиков: {e}")
+                return 0
+            finally:
+                db.close()
+
+    def _insert_one_by_one(self, db, rows: list[dict]) -> int:
+        """Записать строки по одной в savepoint'ах, отбросив отклоненные (вызывается под self._flush_lock)"""
+        written = 0
+        try:
+            for row in rows:
+                try:
+                    with db.begin_nested():
+                        db.execute(insert(TicketHistory), row)
+                    written += 1
+                except (IntegrityError, DataError, ValueError) as e:
+                    logger.error(f"Сообщение {row['message_id']} топика {row['topic_thread_id']} "
+                                 f"не сохранено в историю и отброшено: {e}")
+            db.commit()
+            return written
+        except Exception as e:
+            db.rollback()
+            self._requeue(rows)
+            logger.warning(f"Не удалось сохранить {len(rows)} сообщений истории топиков: {e}")
+            return 0
+
+    def _requeue(self, rows: list[dict]):
+        """Вернуть несохраненные строки в начало буфера"""
+        with self._lock:
+            self._pending.extendleft(reversed(rows))
+            self._trim()
+
+    def _trim(self):
+        """Ограничить буфер max_pending строками (вызывается под self._lock)"""
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            for _ in range(overflow):
+                self._pending.popleft()
+            # Пишем в лог первое отбрасывание и далее каждую тысячу, чтобы не засорять лог при недоступной БД
+            if self._dropped == 0 or (self._dropped + overflow) // 1000 > self._dropped // 1000:
+                logger.error(f"Буфер истории топиков переполнен, всего отброшено {self._dropped + overflow} сообщений")
+            self._dropped += overflow
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await asyncio.to_thread(self.flush)
+
+    async def get_topic_message_ids(self, topic_thread_id: int) -> list[int]:
+        """Получить id сообщений, которые еще находятся в топике"""
+        await asyncio.to_thread(self.flush)
+        return await asyncio.to_thread(self._load_topic_message_ids, topic_thread_id)
+
+    async def forget_topic_messages(self, topic_thread_id: int, message_ids: list[int]):
+        """Отметить сообщения топика как удаленные (текст истории сохраняется)"""
+        if not message_ids:
+            return
+
+        await asyncio.to_thread(self.flush)
+        await asyncio.to_thread(self._clear_topic_message_ids, topic_thread_id, message_ids)
+
+    @staticmethod
+    def _load_topic_message_ids(topic_thread_id: int) -> list[int]:
+        db = get_db()
+        try:
+            rows = db.query(TicketHistory.message_id).filter(
+                TicketHistory.topic_thread_id == topic_thread_id,
+                TicketHistory.message_id.isnot(None)
+            ).distinct().order_by(TicketHistory.message_id).all()
+            return [row[0] for row in rows]
+        finally:
+            db.close()
+
+    @staticmethod
+    def _clear_topic_message_ids(topic_thread_id: int, message_ids: list[int]):
+        db = get_db()
+        try:
+            db.query(TicketHistory).filter(
+                TicketHistory.topic_thread_id == topic_thread_id,
+                TicketHistory.message_id.in_(message_ids)
+            ).update({TicketHistory.message_id: None}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Не удалось обновить историю топика {topic_thread_id}: {e}")
+        finally:
+            db.close()
+
+    def get_ticket_messages(self, ticket_id: int, before: Optional[int] = None,
+                            limit: int = 50) -> Optional[TicketMessagesResponse]:
+        """Страница переписки тикета: limit сообщений с id < before (или последние).
+
+        Переписка перенесенного в архив тикета читается из архива. Возвращает
+        None, если тикета нет.
+        """
+        if before is None:
+            with self._lock:
+                cached = self._latest_pages.get(ticket_id)
+                if cached and cached[0] == limit:
+                    self._latest_pages.move_to_end(ticket_id)
+                    return cached[1]
+                version = self._cache_version
+            # Последняя страница должна включать еще не сброшенные сообщения
+            self.flush()
+
+        db = get_db()
+        try:
+            rows = self._load_page(db, TicketHistory, Ticket, ticket_id, before, limit)
+            if not rows and not db.query(Ticket.id).filter(Ticket.id == ticket_id).first():
+                if not db.query(TicketArchive.id).filter(TicketArchive.id == ticket_id).first():
+                    return None
+                rows = self._load_page(db, TicketHistoryArchive, TicketArchive, ticket_id, before, limit)
+        finally:
+            db.close()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        page = TicketMessagesResponse(
+            ticket_id=ticket_id,
+            messages=[TicketMessage(
+                id=row.id,
+                sender_id=row.sender_id,
+                from_support=row.from_support,
+                message=row.message,
+                created_at=row.created_at
+            ) for row in reversed(rows)],
+            next_before=rows[-1].id if has_more else None
+        )
+
+        if before is None:
+            with self._lock:
+                # Сообщение, пришедшее во время чтения, могло не попасть в страницу - такую не кэшируем
+                if version == self._cache_version:
+                    self._latest_pages[ticket_id] = (limit, page)
+                    if len(self._latest_pages) > self.cache_size:
+                        self._latest_pages.popitem(last=False)
+        return page
+
+    @staticmethod
+    def _load_page(db, history_model, ticket_model, ticket_id: int, before: Optional[int], limit: int) -> list:
+        query = db.query(
+            history_model.id, history_model.sender_id, history_model.message, history_model.created_at,
+            (history_model.sender_id != ticket_model.user_id).label("from_support")
+        ).join(ticket_model, ticket_model.id == history_model.ticket_id).filter(history_model.ticket_id == ticket_id)
+        if before is not None:
+            query = query.filter(history_model.id < before)
+        return query.order_by(history_model.id.desc()).limit(limit + 1).all()
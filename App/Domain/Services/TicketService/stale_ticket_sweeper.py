@@ -0,0 +1,159 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import text
+
+from App.Domain.Enums.TicketEventType.TicketEventType import TicketEventType
+from App.Domain.Services.TicketService.ticket_close import TicketCloseResult
+from App.Domain.Services.TicketService.ticket_service import (
+    TicketService, OUTBOX_AUTO_CLOSE_NOTICE, OUTBOX_TICKET_AUTO_CLOSED
+)
+from App.Infrastructure.Components.Outbox.outbox_dispatcher import enqueue_outbox_many
+from App.Infrastructure.Models.database import get_db
+
+logger = logging.getLogger(__name__)
+
+# Закрытие пачки неактивных тикетов одним запросом. Кандидаты берутся по
+# ix_tickets_active_updated_at (updated_at < latest_cutoff - самый короткий
+# порог), затем для каждого проверяется порог его категории и отсутствие
+# событий (сообщений, взятия) за это время. Строки блокируются FOR UPDATE
+# SKIP LOCKED, поэтому тикеты, которые сейчас закрывают или берут, пропускаются.
+# Начислений и admin_daily_stats нет: тикет никто не закрывал.
+CLOSE_STALE_TICKETS_SQL = text("""
+    WITH thresholds AS (
+        SELECT * FROM unnest(CAST(:categories AS text[]), CAST(:idle_seconds AS double precision[]))
+            AS th(category, idle_seconds)
+    ),
+    batch AS (
+        SELECT t.id, t.status
+        FROM tickets t
+        LEFT JOIN thresholds th ON th.category = t.category
+        WHERE t.status IN ('pending', 'in_progress')
+          AND t.updated_at < :latest_cutoff
+          AND COALESCE(th.idle_seconds, :default_idle_seconds) > 0
+          AND t.updated_at < :now - make_interval(secs => COALESCE(th.idle_seconds, :default_idle_seconds))
+          AND NOT EXISTS (
+              SELECT 1 FROM ticket_events e
+              WHERE e.ticket_id = t.id
+                AND e.created_at >= :now - make_interval(secs => COALESCE(th.idle_seconds, :default_idle_seconds))
+          )
+        ORDER BY t.updated_at
+        LIMIT :batch_size
+        FOR UPDATE OF t SKIP LOCKED
+    ),
+    closed AS (
+        UPDATE tickets t
+        SET status = 'closed', closed_at = :now, updated_at = :now
+        FROM batch
+        WHERE t.id = batch.id
+        RETURNING t.id AS ticket_id, t.display_id, t.user_id, t.username, t.user_message, t.category,
+                  t.created_at, t.channel_message_id, t.topic_thread_id, t.taken_by,
+                  batch.status AS previous_status
+    ),
+    event AS (
+        INSERT INTO ticket_events (ticket_id, event_type, actor_id)
+        SELECT ticket_id, :event_type, NULL FROM closed
+    )
+    SELECT * FROM closed
+""")
+
+
+class StaleTicketSweeper:
+    """Автоматическое закрытие тикетов без активности.
+
+    Раз в interval секунд закрывает pending/in_progress тикеты, у которых
+    дольше порога не было изменений и событий. Порог - idle_hours или
+    idle_hours_by_category для категории тикета (0 - не закрывать). Тикеты
+    закрываются пачками по batch_size одним UPDATE ... RETURNING; закрытие
+    топиков и уведомления пользователей идут через outbox с ограничением
+    частоты (OUTBOX_TICKET_AUTO_CLOSED, OUTBOX_AUTO_CLOSE_NOTICE). По
+    умолчанию (idle_hours = 0) выключено.
+    """
+
+    def __init__(self, ticket_service: TicketService, idle_hours: float = 0,
+                 idle_hours_by_category: dict[str, float] = None, batch_size: int = 200, interval: int = 600,
+                 batch_pause: float = 0.1):
+        self.ticket_service = ticket_service
+        self.idle_hours = idle_hours
+        self.idle_hours_by_category = idle_hours_by_category or {}
+        self.batch_size = batch_size
+        self.interval = interval
+        self.batch_pause = batch_pause
+        self._task: Optional[asyncio.Task] = None
+        logger.info("StaleTicketSweeper инициализирован")
+
+    @property
+    def enabled(self) -> bool:
+        return any(hours > 0 for hours in [self.idle_hours, *self.idle_hours_by_category.values()])
+
+    def start(self):
+        if self._task is None and self.enabled:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def close_batch(self) -> list[TicketCloseResult]:
+        """Закрыть одну пачку неактивных тикетов и поставить уведомления в outbox"""
+        if not self.enabled:
+            return []
+
+        now = datetime.now(timezone.utc)
+        shortest = min(hours for hours in [self.idle_hours, *self.idle_hours_by_category.values()] if hours > 0)
+        categories = list(self.idle_hours_by_category)
+
+        db = get_db()
+        try:
+            rows = db.execute(CLOSE_STALE_TICKETS_SQL, {
+                "categories": categories,
+                "idle_seconds": [self.idle_hours_by_category[category] * 3600 for category in categories],
+                "default_idle_seconds": self.idle_hours * 3600,
+                "latest_cutoff": now - timedelta(hours=shortest),
+                "now": now,
+                "batch_size": self.batch_size,
+                "event_type": TicketEventType.AUTO_CLOSED.value,
+            }).mappings().all()
+            results = [TicketCloseResult(**row) for row in rows]
+            for kind in (OUTBOX_TICKET_AUTO_CLOSED, OUTBOX_AUTO_CLOSE_NOTICE):
+                enqueue_outbox_many(db, kind, [
+                    (f"{kind}:{result.ticket_id}", result.to_payload()) for result in results
+                ])
+            db.commit()
+            return results
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def run_once(self) -> int:
+        """Закрыть все неактивные тикеты; возвращает их количество"""
+        total = 0
+        while True:
+            results = await asyncio.to_thread(self.close_batch)
+            self.ticket_service.on_tickets_auto_closed(results)
+            total += len(results)
+            if len(results) < self.batch_size:
+                break
+            # Пауза между пачками, чтобы не занимать БД надолго
+            await asyncio.sleep(self.batch_pause)
+
+        if total:
+            logger.info(f"Автоматически закрыто {total} неактивных тикетов")
+        return total
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка автоматического закрытия тикетов: {e}")
+            await asyncio.sleep(self.interval)
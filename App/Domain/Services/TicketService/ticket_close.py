@@ -0,0 +1,130 @@
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from App.Domain.Enums.TicketEventType.TicketEventType import TicketEventType
+from App.Domain.Enums.TicketStatus.TicketStatus import TicketStatus
+from App.Domain.Services.BalanceService.balance_service import TICKET_REWARD, UNPAID_CATEGORIES
+
+# Закрытие тикета одним запросом: блокировка строки, смена статуса, событие
+# closed, начисление в balance_ledger/admin_balances и admin_daily_stats.
+# Строка блокируется FOR UPDATE, поэтому при одновременном закрытии второй
+# запрос видит status = 'closed' и ничего не начисляет. closed_count и
+# earnings пишутся одним INSERT, так как исполнитель тикета и закрывший
+# администратор обычно совпадают и попадают в одну строку admin_daily_stats.
+CLOSE_TICKET_SQL = text("""
+    WITH target AS (
+        SELECT id, status FROM tickets WHERE id = :ticket_id FOR UPDATE
+    ),
+    closed AS (
+        UPDATE tickets t
+        SET status = 'closed',
+            closed_at = CASE WHEN target.status <> 'closed' THEN :closed_at ELSE t.closed_at END
+        FROM target
+        WHERE t.id = target.id
+        RETURNING t.id AS ticket_id, t.display_id, t.user_id, t.username, t.user_message, t.category,
+                  t.created_at, t.channel_message_id, t.topic_thread_id, t.taken_by,
+                  target.status AS previous_status
+    ),
+    event AS (
+        INSERT INTO ticket_events (ticket_id, event_type, actor_id)
+        SELECT ticket_id, :event_type, COALESCE(:actor_id, user_id)
+        FROM closed
+        WHERE previous_status <> 'closed'
+    ),
+    entry AS (
+        INSERT INTO balance_ledger (admin_id, ticket_id, amount, reason)
+        SELECT :admin_id, ticket_id, :reward, 'ticket_closed'
+        FROM closed
+        WHERE previous_status <> 'closed'
+          AND :admin_id IS NOT NULL
+          AND COALESCE(category, '') <> ALL(:unpaid_categories)
+        ON CONFLICT (ticket_id) DO NOTHING
+        RETURNING admin_id, amount
+    ),
+    balance AS (
+        INSERT INTO admin_balances (admin_id, balance)
+        SELECT admin_id, amount FROM entry
+        ON CONFLICT (admin_id) DO UPDATE SET balance = COALESCE(admin_balances.balance, 0) + EXCLUDED.balance
+        RETURNING admin_id, balance
+    ),
+    rollup AS (
+        INSERT INTO admin_daily_stats (admin_id, day, closed_count, rating_sum, rating_count, earnings)
+        SELECT admin_id, :day, SUM(closed_count), 0, 0, SUM(earnings)
+        FROM (
+            SELECT taken_by AS admin_id, 1 AS closed_count, 0.0 AS earnings
+            FROM closed
+            WHERE previous_status <> 'closed' AND taken_by IS NOT NULL
+            UNION ALL
+            SELECT admin_id, 0, amount FROM entry
+        ) AS changes
+        GROUP BY admin_id
+        ON CONFLICT (admin_id, day) DO UPDATE SET
+            closed_count = admin_daily_stats.closed_count + EXCLUDED.closed_count,
+            earnings = admin_daily_stats.earnings + EXCLUDED.earnings
+    )
+    SELECT closed.*, entry.amount AS accrued_amount, balance.admin_id AS accrued_to,
+           COALESCE(balance.balance, (SELECT b.balance FROM admin_balances b WHERE b.admin_id = :admin_id)) AS balance
+    FROM closed
+    LEFT JOIN entry ON true
+    LEFT JOIN balance ON true
+""")
+
+
+@dataclass
+class TicketCloseResult:
+    ticket_id: int
+    display_id: int
+    user_id: int
+    username: Optional[str]
+    user_message: Optional[str]
+    category: Optional[str]
+    created_at: Optional[datetime]
+    channel_message_id: Optional[int]
+    topic_thread_id: Optional[int]
+    taken_by: Optional[int]
+    previous_status: str
+    accrued_amount: Optional[float] = None
+    accrued_to: Optional[int] = None
+    balance: Optional[float] = None
+
+    @property
+    def newly_closed(self) -> bool:
+        return self.previous_status != TicketStatus.CLOSED
+
+    def to_payload(self) -> dict:
+        """Данные для сообщения outbox (JSON)"""
+        payload = asdict(self)
+        payload["created_at"] = self.created_at.isoformat() if self.created_at else None
+        return payload
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "TicketCloseResult":
+        payload = dict(payload)
+        if payload.get("created_at"):
+            payload["created_at"] = datetime.fromisoformat(payload["created_at"])
+        return cls(**payload)
+
+
+def close_ticket(db: Session, ticket_id: int, admin_id: int = None, actor_id: int = None) -> Optional[TicketCloseResult]:
+    """Закрыть тикет в переданной сессии (commit делает вызывающий код).
+
+    admin_id - администратор, которому начисляется оплата за тикет; без него
+    (закрытие пользователем или через API) начисления нет. В результате
+    balance - баланс этого администратора после закрытия.
+    """
+    closed_at = datetime.now(timezone.utc)
+    row = db.execute(CLOSE_TICKET_SQL, {
+        "ticket_id": ticket_id,
+        "admin_id": admin_id,
+        "actor_id": actor_id,
+        "closed_at": closed_at,
+        "day": closed_at.date(),
+        "event_type": TicketEventType.CLOSED.value,
+        "reward": TICKET_REWARD,
+        "unpaid_categories": list(UNPAID_CATEGORIES),
+    }).mappings().first()
+    return TicketCloseResult(**row) if row else None
@@ -1,20 +1,47 @@
+import asyncio
 import logging
 from typing import Optional
 
+from App.Domain.Enums.TicketEventType.TicketEventType import TicketEventType
+from App.Domain.Enums.TicketStatus.TicketStatus import TicketStatus, ACTIVE_TICKET_STATUSES
 from App.Domain.Models.Ticket.Ticket import Ticket
+from App.Domain.Services.TicketEventService.ticket_event_service import TicketEventService
+from App.Domain.Services.TicketService.ticket_close import TicketCloseResult, close_ticket
+from App.Infrastructure.Components.Outbox.outbox_dispatcher import OutboxDispatcher, enqueue_outbox
 from App.Infrastructure.Components.TelegramBot.ChannelManager.channel_manager import ChannelManager
 from App.Infrastructure.Config import config
 
 logger = logging.getLogger(__name__)
 
+OUTBOX_TICKET_CREATED = "ticket_created"
+OUTBOX_TICKET_CLOSED = "ticket_closed"
+OUTBOX_RATING_REQUEST = "ticket_rating_request"
+OUTBOX_TICKET_AUTO_CLOSED = "ticket_auto_closed"
+OUTBOX_AUTO_CLOSE_NOTICE = "ticket_auto_close_notice"
+
 
 class TicketService:
-    def __init__(self, channel_manager: ChannelManager, websocket_manager=None):
+    def __init__(self, channel_manager: ChannelManager, websocket_manager=None, statistics_service=None,
+                 event_service: TicketEventService = None, admin_menu_service=None, balance_service=None,
+                 outbox: OutboxDispatcher = None):
         self.channel_manager = channel_manager
         self.websocket_manager = websocket_manager
+        self.statistics_service = statistics_service
+        self.event_service = event_service or TicketEventService()
+        self.admin_menu_service = admin_menu_service
+        self.balance_service = balance_service
+        self.outbox = outbox
+        if outbox:
+            outbox.register(OUTBOX_TICKET_CREATED, self._deliver_ticket_created)
+            outbox.register(OUTBOX_TICKET_CLOSED, self._deliver_ticket_closed)
+            outbox.register(OUTBOX_TICKET_AUTO_CLOSED, self._deliver_ticket_auto_closed,
+                            min_interval=config.AUTO_CLOSE_DELIVERY_INTERVAL)
+            outbox.register(OUTBOX_AUTO_CLOSE_NOTICE, self._deliver_auto_close_notice,
+                            min_interval=config.AUTO_CLOSE_DELIVERY_INTERVAL)
         self.active_tickets: dict[int, Ticket] = {}
         self.ticket_by_message_id: dict[int, Ticket] = {}
         self.ticket_by_thread_id: dict[int, Ticket] = {}
+        self._media_groups: dict[str, dict] = {}
         self._load_active_tickets()
         logger.info("TicketService инициализирован")
 
@@ -26,7 +53,7 @@ class TicketService:
         db = get_db()
         try:
             active_db_tickets = db.query(TicketModelDB).filter(
-                TicketModelDB.status.in_(["pending", "in_progress"])
+                TicketModelDB.status.in_(ACTIVE_TICKET_STATUSES)
             ).all()
 
             for db_ticket in active_db_tickets:
@@ -57,12 +84,16 @@ class TicketService:
         logger.info(f"Создание тикета для пользователя {user_id} с категорией {category}")
 
         from App.Infrastructure.Models.database import get_db
-        from App.Infrastructure.Models import Ticket as TicketModelDB
-        from sqlalchemy import func
+        from App.Infrastructure.Models import Ticket as TicketModelDB, TicketArchive
+        from sqlalchemy import func, select
 
         db = get_db()
         try:
-            max_display_id = db.query(func.max(TicketModelDB.display_id)).scalar() or 0
+            # Номер продолжает нумерацию и тикетов, перенесенных в архив
+            max_display_id = db.query(func.greatest(
+                select(func.max(TicketModelDB.display_id)).scalar_subquery(),
+                select(func.max(TicketArchive.display_id)).scalar_subquery()
+            )).scalar() or 0
             display_id = max_display_id + 1
 
             db_ticket = TicketModelDB(
@@ -71,56 +102,33 @@ class TicketService:
                 username=username,
                 user_message=user_message,
                 category=category,
-                status="pending"
+                status=TicketStatus.PENDING
             )
             db.add(db_ticket)
+            db.flush()
+            self.event_service.record(db_ticket.id, TicketEventType.CREATED, user_id, db=db)
+            enqueue_outbox(db, OUTBOX_TICKET_CREATED, f"{OUTBOX_TICKET_CREATED}:{db_ticket.id}", {
+                "ticket_id": db_ticket.id,
+                "user_id": user_id
+            })
             db.commit()
-            db.refresh(db_ticket)
 
             ticket = Ticket(
                 db_id=db_ticket.id,
-                display_id=db_ticket.display_id,
+                display_id=display_id,
                 user_id=user_id,
                 username=username,
                 user_message=user_message,
                 category=category,
+                status=TicketStatus.PENDING,
                 is_renaming=False
             )
         finally:
             db.close()
 
-        try:
-            channel_message_id, topic_thread_id = await self.channel_manager.create_ticket_topic_and_thread(ticket)
-            ticket.channel_message_id = channel_message_id
-            ticket.topic_thread_id = topic_thread_id
-
-            db = get_db()
-            try:
-                db_ticket = db.query(TicketModelDB).filter(TicketModelDB.id == ticket.db_id).first()
-                if db_ticket:
-                    db_ticket.channel_message_id = channel_message_id
-                    db_ticket.topic_thread_id = topic_thread_id
-                    db.commit()
-            finally:
-                db.close()
-
-            self.active_tickets[user_id] = ticket
-            self.ticket_by_message_id[channel_message_id] = ticket
-            if ticket.topic_thread_id:
-                self.ticket_by_thread_id[ticket.topic_thread_id] = ticket
-            
-            if self.websocket_manager:
-                from App.Domain.Models.TicketUpdate.TicketUpdate import TicketUpdate
-                await self.websocket_manager.notify_update(
-                    ticket.db_id,
-                    TicketUpdate(ticket_id=ticket.db_id, status="pending", message="Тикет создан")
-                )
-            
-            logger.info(f"Тикет создан: {ticket.id}")
-        except Exception as e:
-            logger.error(f"Ошибка создания топика в канале: {e}")
-            raise
-
+        self.active_tickets[user_id] = ticket
+        self._wake_outbox()
+        logger.info(f"Тикет создан: {ticket.display_id}")
         return ticket
 
     async def take_ticket(self, admin_id: int, admin_name: str, ticket_display_id: int) -> Optional[Ticket]:
@@ -135,14 +143,14 @@ class TicketService:
                 logger.warning(f"Тикет с display_id {ticket_display_id} не найден в базе данных")
                 return None
 
-            if db_ticket.status != "pending":
+            if db_ticket.status != TicketStatus.PENDING:
                 logger.warning(f"Тикет {ticket_display_id} уже взят или закрыт")
                 return None
 
             from datetime import datetime
             db_ticket.taken_by = admin_id
             db_ticket.taken_at = datetime.utcnow()
-            db_ticket.status = "in_progress"
+            db_ticket.status = TicketStatus.IN_PROGRESS
             db.commit()
 
             ticket = Ticket(
@@ -164,6 +172,9 @@ class TicketService:
 
                 db_ticket.topic_thread_id = ticket.topic_thread_id
                 db.commit()
+                self.event_service.record(ticket.db_id, TicketEventType.TAKEN, admin_id)
+                if self.admin_menu_service:
+                    self.admin_menu_service.on_ticket_taken(admin_id)
 
                 self.active_tickets[ticket.user_id] = ticket
                 self.ticket_by_message_id[menu_message_id] = ticket
@@ -174,7 +185,7 @@ class TicketService:
                     from App.Domain.Models.TicketUpdate.TicketUpdate import TicketUpdate
                     await self.websocket_manager.notify_update(
                         ticket.db_id,
-                        TicketUpdate(ticket_id=ticket.db_id, status="in_progress", message="Тикет взят в работу")
+                        TicketUpdate(ticket_id=ticket.db_id, status=TicketStatus.IN_PROGRESS, message="Тикет взят в работу")
                     )
 
                 logger.info(f"Тикет {ticket_display_id} взят администратором {admin_name}")
@@ -182,7 +193,7 @@ class TicketService:
 
             except Exception as e:
                 logger.error(f"Ошибка взятия тикета {ticket_display_id}: {e}")
-                db_ticket.status = "pending"
+                db_ticket.status = TicketStatus.PENDING
                 db_ticket.taken_by = None
                 db_ticket.taken_at = None
                 db.commit()
@@ -213,6 +224,7 @@ class TicketService:
         if message.content_type in ['photo', 'video', 'sticker', 'document', 'animation']:
             
             await self.channel_manager.send_support_media_reply(ticket.user_id, message)
+            self.event_service.record(ticket.db_id, TicketEventType.SUPPORT_REPLY, message.from_user.id)
 
             
             if self.websocket_manager:
@@ -222,6 +234,7 @@ class TicketService:
             if support_message.strip():
                 
                 await self.channel_manager.send_support_reply(ticket.user_id, support_message, support_name)
+                self.event_service.record(ticket.db_id, TicketEventType.SUPPORT_REPLY, message.from_user.id)
 
                 
                 if self.websocket_manager:
@@ -296,8 +309,9 @@ class TicketService:
             logger.info(f"Сообщение от пользователя {user_id} пропущено (идет переименование тикета)")
             return False
 
-        if ticket.status == "in_progress":
+        if ticket.status == TicketStatus.IN_PROGRESS:
             await self.channel_manager.send_user_message(ticket, message_text)
+            self.event_service.record(ticket.db_id, TicketEventType.USER_MESSAGE, user_id)
 
             
             if self.websocket_manager:
@@ -334,13 +348,47 @@ class TicketService:
             logger.info(f"Медиа от пользователя {user_id} пропущено (идет переименование тикета)")
             return False
 
-        if ticket.status == "in_progress":
-            await self.channel_manager.send_user_media(ticket, message)
+        if ticket.status == TicketStatus.IN_PROGRESS:
+            if message.media_group_id:
+                self._buffer_media_group(ticket, message)
+            else:
+                await self.channel_manager.send_user_media(ticket, message)
+            self.event_service.record(ticket.db_id, TicketEventType.USER_MESSAGE, user_id)
             # Не меняем иконку на ❓ для медиа тикетов которые уже в работе
             logger.info(f"Медиа от пользователя {user_id}")
         else:
             logger.info(f"Медиа от пользователя {user_id} игнорировано, тикет не взят")
 
+    def _buffer_media_group(self, ticket: Ticket, message):
+        """Накапливает части альбома, чтобы переслать их в топик одним вызовом"""
+        loop = asyncio.get_running_loop()
+        group = self._media_groups.get(message.media_group_id)
+        if group is None:
+            group = {"messages": [], "last_at": loop.time()}
+            self._media_groups[message.media_group_id] = group
+            group["task"] = asyncio.create_task(self._flush_media_group(ticket, message.media_group_id))
+
+        group["messages"].append(message)
+        group["last_at"] = loop.time()
+
+    async def _flush_media_group(self, ticket: Ticket, media_group_id: str):
+        """Ждет, пока альбом перестанет пополняться, и пересылает его целиком"""
+        loop = asyncio.get_running_loop()
+        group = self._media_groups[media_group_id]
+        try:
+            while True:
+                delay = group["last_at"] + config.MEDIA_GROUP_WINDOW - loop.time()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+        finally:
+            self._media_groups.pop(media_group_id, None)
+
+        try:
+            await self.channel_manager.send_user_media_group(ticket, group["messages"])
+        except Exception as e:
+            logger.error(f"Ошибка пересылки альбома {media_group_id} в тикет {ticket.id}: {e}")
+
     async def process_support_message(self, message_id: int, support_message: str, support_name: str):
         """Обработка сообщения от поддержки"""
         if message_id not in self.ticket_by_message_id:
@@ -372,13 +420,13 @@ class TicketService:
             if ticket.db_id == db_id:
                 return ticket
 
-        # Загружаем из БД если не найдено в памяти
+        # Загружаем из БД (или архива) если не найдено в памяти
         from App.Infrastructure.Models.database import get_db
-        from App.Infrastructure.Models import Ticket as TicketModelDB
+        from App.Domain.Services.ArchiveService.archive_service import find_ticket
 
         db = get_db()
         try:
-            db_ticket = db.query(TicketModelDB).filter(TicketModelDB.id == db_id).first()
+            db_ticket = find_ticket(db, ticket_id=db_id)
             if not db_ticket:
                 return None
 
@@ -405,13 +453,13 @@ class TicketService:
             if ticket.display_id == display_id:
                 return ticket
 
-        # Загружаем из БД если не найдено в памяти
+        # Загружаем из БД (или архива) если не найдено в памяти
         from App.Infrastructure.Models.database import get_db
-        from App.Infrastructure.Models import Ticket as TicketModelDB
+        from App.Domain.Services.ArchiveService.archive_service import find_ticket
 
         db = get_db()
         try:
-            db_ticket = db.query(TicketModelDB).filter(TicketModelDB.display_id == display_id).first()
+            db_ticket = find_ticket(db, display_id=display_id)
             if not db_ticket:
                 return None
 
@@ -442,12 +490,13 @@ class TicketService:
             logger.info(f"Сообщение для тикета {ticket_id} пропущено (идет переименование)")
             return False
         
-        if ticket.status not in ["pending", "in_progress"]:
+        if ticket.status not in ACTIVE_TICKET_STATUSES:
             raise ValueError("Тикет закрыт или отменен, нельзя отправить сообщение")
         
-        if ticket.status == "in_progress" and ticket.topic_thread_id:
+        if ticket.status == TicketStatus.IN_PROGRESS and ticket.topic_thread_id:
             
             await self.channel_manager.send_user_message(ticket, message_text)
+            self.event_service.record(ticket.db_id, TicketEventType.USER_MESSAGE, ticket.user_id)
             await self.channel_manager.update_topic_icon(ticket, "❓")
 
             
@@ -464,7 +513,7 @@ class TicketService:
 
             logger.info(f"Сообщение отправлено в тикет {ticket_id}: {message_text}")
             return True
-        elif ticket.status == "pending":
+        elif ticket.status == TicketStatus.PENDING:
             
             
             logger.info(f"Сообщение для тикета {ticket_id} (еще не взят): {message_text}")
@@ -485,13 +534,16 @@ class TicketService:
                 logger.warning(f"Тикет с display_id {display_id} не найден")
                 return False
 
-            if db_ticket.status == "closed":
+            if db_ticket.status == TicketStatus.CLOSED:
                 return False
 
             from datetime import datetime
-            db_ticket.status = "cancelled"
+            was_in_progress = db_ticket.status == TicketStatus.IN_PROGRESS
+            db_ticket.status = TicketStatus.CANCELLED
             db_ticket.closed_at = datetime.utcnow()
             db.commit()
+            if was_in_progress and self.admin_menu_service:
+                self.admin_menu_service.on_ticket_released(db_ticket.taken_by)
 
             user_id = db_ticket.user_id
             ticket = self.active_tickets.get(user_id)
@@ -535,7 +587,7 @@ class TicketService:
                 from App.Domain.Models.TicketUpdate.TicketUpdate import TicketUpdate
                 await self.websocket_manager.notify_update(
                     ticket.db_id,
-                    TicketUpdate(ticket_id=ticket.db_id, status="cancelled", message="Тикет отменен")
+                    TicketUpdate(ticket_id=ticket.db_id, status=TicketStatus.CANCELLED, message="Тикет отменен")
                 )
                 await self.websocket_manager.close_connections(ticket.db_id, "Тикет отменен")
 
@@ -547,97 +599,230 @@ class TicketService:
         finally:
             db.close()
 
-    async def close_ticket_by_internal_id(self, ticket_db_id: int, admin_id: int = None) -> bool:
-        """Закрывает тикет по ID базы данных"""
+    async def close_ticket_by_internal_id(self, ticket_db_id: int, admin_id: int = None) -> Optional[TicketCloseResult]:
+        """Закрывает тикет по ID базы данных.
+
+        Статус, событие, начисление администратору и сообщения outbox
+        фиксируются одной транзакцией; уведомления в Telegram и WebSocket
+        отправляет OutboxDispatcher. None - тикет не найден; ошибки БД
+        пробрасываются вызывающему коду.
+        """
+        result = self._close_in_db(ticket_db_id, admin_id, admin_id)
+        if not result:
+            logger.warning(f"Тикет с db_id {ticket_db_id} не найден")
+            return None
+
+        self._forget_active_ticket(result.user_id)
+        self._wake_outbox()
+        logger.info(f"Тикет {ticket_db_id} закрыт")
+        return result
+
+    async def close_ticket_by_user(self, user_id: int):
+        """Закрывает тикет по ID пользователя (самостоятельное закрытие)"""
+        if user_id not in self.active_tickets:
+            raise ValueError("У пользователя нет активного тикета")
+
+        ticket = self.active_tickets[user_id]
+        self._close_in_db(ticket.db_id, None, user_id)
+
+        self._forget_active_ticket(user_id)
+        self._wake_outbox()
+        logger.info(f"Тикет {ticket.display_id} закрыт пользователем {ticket.username}")
+
+    def _wake_outbox(self):
+        if self.outbox:
+            self.outbox.wake()
+
+    def _close_in_db(self, ticket_db_id: int, admin_id: Optional[int], actor_id: Optional[int]) -> Optional[TicketCloseResult]:
         from App.Infrastructure.Models.database import get_db
-        from App.Infrastructure.Models import Ticket as TicketModelDB
 
         db = get_db()
         try:
-            db_ticket = db.query(TicketModelDB).filter(TicketModelDB.id == ticket_db_id).first()
-            if not db_ticket:
-                logger.warning(f"Тикет с db_id {ticket_db_id} не найден")
-                return False
-
-            from datetime import datetime
-            db_ticket.status = "closed"
-            db_ticket.closed_at = datetime.utcnow()
-            if admin_id:
-                db_ticket.admin_id = admin_id
+            result = close_ticket(db, ticket_db_id, admin_id, actor_id)
+            if result and result.newly_closed:
+                payload = result.to_payload()
+                payload["by_admin"] = bool(admin_id)
+                enqueue_outbox(db, OUTBOX_TICKET_CLOSED, f"{OUTBOX_TICKET_CLOSED}:{ticket_db_id}", payload)
+                if admin_id:
+                    enqueue_outbox(db, OUTBOX_RATING_REQUEST, f"{OUTBOX_RATING_REQUEST}:{ticket_db_id}", payload)
             db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
 
-            user_id = db_ticket.user_id
-            if user_id in self.active_tickets:
-                ticket = self.active_tickets[user_id]
-                del self.active_tickets[user_id]
+        if result and result.newly_closed:
+            if self.statistics_service:
+                self.statistics_service.on_ticket_closed(result.taken_by)
+            if result.previous_status == TicketStatus.IN_PROGRESS and self.admin_menu_service:
+                self.admin_menu_service.on_ticket_released(result.taken_by)
+        if result and result.accrued_to and self.admin_menu_service:
+            self.admin_menu_service.on_balance_changed(result.accrued_to, result.balance)
+        return result
+
+    def on_tickets_auto_closed(self, results: list[TicketCloseResult]):
+        """Убрать из памяти тикеты, закрытые StaleTicketSweeper (уведомления уже в outbox)"""
+        for result in results:
+            ticket = self.active_tickets.get(result.user_id)
+            if ticket and ticket.db_id == result.ticket_id:
+                self._forget_active_ticket(result.user_id)
+            if self.statistics_service:
+                self.statistics_service.on_ticket_auto_closed(result.taken_by)
+            if result.previous_status == TicketStatus.IN_PROGRESS and self.admin_menu_service:
+                self.admin_menu_service.on_ticket_released(result.taken_by)
+
+    def _forget_active_ticket(self, user_id: int) -> Optional[Ticket]:
+        ticket = self.active_tickets.pop(user_id, None)
+        if ticket:
+            self.ticket_by_message_id.pop(ticket.channel_message_id, None)
+            self.ticket_by_thread_id.pop(ticket.topic_thread_id, None)
+        return ticket
 
-                if ticket.channel_message_id in self.ticket_by_message_id:
-                    del self.ticket_by_message_id[ticket.channel_message_id]
-                if ticket.topic_thread_id in self.ticket_by_thread_id:
-                    del self.ticket_by_thread_id[ticket.topic_thread_id]
+    async def _deliver_ticket_created(self, payload: dict):
+        """Outbox: опубликовать новый тикет в канале поддержки (идемпотентно)"""
+        # Транзакция не держится открытой на время запросов к Telegram
+        ticket = await asyncio.to_thread(self._load_undelivered_ticket, payload["ticket_id"])
+        if not ticket:
+            return
+        active = self.active_tickets.get(ticket.user_id)
+        if active and active.db_id == ticket.db_id:
+            ticket = active
+
+        channel_message_id, topic_thread_id = await self.channel_manager.create_ticket_topic_and_thread(ticket)
+        saved = await asyncio.to_thread(self._save_channel_ids, ticket.db_id, channel_message_id, topic_thread_id)
+        if not saved:
+            logger.warning(f"Тикет {ticket.db_id} уже опубликован, сообщение {channel_message_id} не сохранено")
+            return
 
-                
-                if admin_id:
-                    await self.channel_manager.close_ticket_by_admin(ticket)
-                else:
-                    await self.channel_manager.close_ticket_by_user(ticket)
+        ticket.channel_message_id = channel_message_id
+        ticket.topic_thread_id = topic_thread_id
+        self.ticket_by_message_id[channel_message_id] = ticket
+        if topic_thread_id:
+            self.ticket_by_thread_id[topic_thread_id] = ticket
 
-            if self.websocket_manager:
-                from App.Domain.Models.TicketUpdate.TicketUpdate import TicketUpdate
-                await self.websocket_manager.notify_update(
-                    ticket_db_id,
-                    TicketUpdate(ticket_id=ticket_db_id, status="closed", message="Тикет закрыт")
-                )
-                await self.websocket_manager.close_connections(ticket_db_id, "Тикет закрыт")
+        if self.websocket_manager:
+            from App.Domain.Models.TicketUpdate.TicketUpdate import TicketUpdate
+            await self.websocket_manager.notify_update(
+                ticket.db_id,
+                TicketUpdate(ticket_id=ticket.db_id, status=TicketStatus.PENDING, message="Тикет создан")
+            )
 
-            logger.info(f"Тикет {ticket_db_id} закрыт")
-            return True
-        except Exception as e:
-            logger.error(f"Ошибка закрытия тикета {ticket_db_id}: {e}")
-            return False
+    @staticmethod
+    def _load_undelivered_ticket(ticket_id: int) -> Optional[Ticket]:
+        """Тикет для публикации в канале или None, если публиковать не нужно"""
+        from App.Infrastructure.Models.database import get_db
+        from App.Infrastructure.Models import Ticket as TicketModelDB
+
+        db = get_db()
+        try:
+            db_ticket = db.query(TicketModelDB).filter(TicketModelDB.id == ticket_id).first()
+            if not db_ticket or db_ticket.status != TicketStatus.PENDING or db_ticket.channel_message_id:
+                return None
+            return Ticket(
+                db_id=db_ticket.id,
+                display_id=db_ticket.display_id,
+                user_id=db_ticket.user_id,
+                username=db_ticket.username,
+                user_message=db_ticket.user_message,
+                category=db_ticket.category,
+                status=db_ticket.status,
+                is_renaming=False
+            )
         finally:
             db.close()
 
-    async def close_ticket_by_user(self, user_id: int):
-        """Закрывает тикет по ID пользователя (самостоятельное закрытие)"""
-        if user_id not in self.active_tickets:
-            raise ValueError("У пользователя нет активного тикета")
-
-        ticket = self.active_tickets[user_id]
-        username = ticket.username
-
+    @staticmethod
+    def _save_channel_ids(ticket_id: int, channel_message_id: int, topic_thread_id: Optional[int]) -> bool:
+        """Сохранить сообщение и топик тикета, если их еще не сохранили; True - сохранено"""
         from App.Infrastructure.Models.database import get_db
         from App.Infrastructure.Models import Ticket as TicketModelDB
 
         db = get_db()
         try:
-            db_ticket = db.query(TicketModelDB).filter(TicketModelDB.id == ticket.db_id).first()
-            if db_ticket:
-                from datetime import datetime
-                db_ticket.status = "closed"
-                db_ticket.closed_at = datetime.utcnow()
-                db.commit()
+            updated = db.query(TicketModelDB).filter(
+                TicketModelDB.id == ticket_id,
+                TicketModelDB.channel_message_id.is_(None)
+            ).update({
+                TicketModelDB.channel_message_id: channel_message_id,
+                TicketModelDB.topic_thread_id: topic_thread_id
+            }, synchronize_session=False)
+            db.commit()
+            return updated > 0
+        except Exception:
+            db.rollback()
+            raise
         finally:
             db.close()
 
-        del self.active_tickets[user_id]
+    async def _deliver_ticket_closed(self, payload: dict):
+        """Outbox: закрыть топик, обновить сообщения канала и WebSocket-клиентов"""
+        by_admin = payload.get("by_admin", False)
+        result = TicketCloseResult.from_payload({key: value for key, value in payload.items() if key != "by_admin"})
+        ticket = Ticket(
+            db_id=result.ticket_id,
+            display_id=result.display_id,
+            user_id=result.user_id,
+            username=result.username,
+            user_message=result.user_message,
+            category=result.category,
+            status=TicketStatus.CLOSED,
+            channel_message_id=result.channel_message_id,
+            topic_thread_id=result.topic_thread_id,
+            is_renaming=False
+        )
 
-        if ticket.channel_message_id in self.ticket_by_message_id:
-            del self.ticket_by_message_id[ticket.channel_message_id]
-        if ticket.topic_thread_id in self.ticket_by_thread_id:
-            del self.ticket_by_thread_id[ticket.topic_thread_id]
+        if by_admin:
+            await self.channel_manager.close_ticket_by_admin(ticket)
+        else:
+            await self.channel_manager.close_ticket_by_user(ticket)
 
-        await self.channel_manager.close_ticket_by_user(ticket)
-        
         if self.websocket_manager:
             from App.Domain.Models.TicketUpdate.TicketUpdate import TicketUpdate
+            message = "Тикет закрыт" if by_admin else "Тикет закрыт пользователем"
             await self.websocket_manager.notify_update(
-                ticket.db_id,
-                TicketUpdate(ticket_id=ticket.db_id, status="closed", message="Тикет закрыт пользователем")
+                result.ticket_id,
+                TicketUpdate(ticket_id=result.ticket_id, status=TicketStatus.CLOSED, message=message)
             )
-            await self.websocket_manager.close_connections(ticket.db_id, "Тикет закрыт пользователем")
-        
-        logger.info(f"Тикет {ticket.id} закрыт пользователем {username}")
+            await self.websocket_manager.close_connections(result.ticket_id, message)
+
+    @staticmethod
+    def _auto_closed_ticket(payload: dict) -> Ticket:
+        result = TicketCloseResult.from_payload(payload)
+        return Ticket(
+            db_id=result.ticket_id,
+            display_id=result.display_id,
+            user_id=result.user_id,
+            username=result.username,
+            user_message=result.user_message,
+            category=result.category,
+            status=TicketStatus.CLOSED,
+            channel_message_id=result.channel_message_id,
+            topic_thread_id=result.topic_thread_id,
+            is_renaming=False
+        )
+
+    async def _deliver_auto_close_notice(self, payload: dict):
+        """Outbox: сообщить пользователю об автоматическом закрытии тикета.
+
+        Отдельное сообщение outbox, чтобы повтор из-за ошибки Telegram в топике
+        не отправлял пользователю уведомление второй раз.
+        """
+        await self.channel_manager.notify_user_ticket_auto_closed(self._auto_closed_ticket(payload))
+
+    async def _deliver_ticket_auto_closed(self, payload: dict):
+        """Outbox: закрыть топик неактивного тикета и уведомить WebSocket-клиентов"""
+        result = TicketCloseResult.from_payload(payload)
+        await self.channel_manager.close_ticket_by_timeout(self._auto_closed_ticket(payload))
+
+        if self.websocket_manager:
+            from App.Domain.Models.TicketUpdate.TicketUpdate import TicketUpdate
+            message = "Тикет закрыт из-за неактивности"
+            await self.websocket_manager.notify_update(
+                result.ticket_id,
+                TicketUpdate(ticket_id=result.ticket_id, status=TicketStatus.CLOSED, message=message)
+            )
+            await self.websocket_manager.close_connections(result.ticket_id, message)
 
     async def _send_support_media_to_client(self, ticket_id: int, message, support_name: str):
         """Скачивает медиа из Telegram и отправляет клиенту через websocket в base64"""
@@ -677,8 +862,12 @@ class TicketService:
                 return
 
             
-            file = await self.channel_manager.bot.get_file(file_id)
-            file_path = file.file_path
+            media_cache = self.channel_manager.media_cache
+            file_path = media_cache.get_file_path(file_id)
+            if not file_path:
+                file = await self.channel_manager.bot.get_file(file_id)
+                file_path = file.file_path
+                media_cache.put_file_path(file_id, file_path)
 
             
             download_url = f"https://api.telegram.org/file/bot{self.channel_manager.bot.token}/{file_path}"
@@ -0,0 +1,84 @@
+import io
+
+import matplotlib
+from matplotlib import style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import seaborn as sns
+
+
+def _to_png(fig: Figure, **kwargs) -> bytes:
+    FigureCanvasAgg(fig)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=150, bbox_inches='tight', **kwargs)
+    return buf.getvalue()
+
+
+def render_admin_stats(admin_id: int, today: int, week: int, month: int, active: int) -> bytes:
+    """График закрытых тикетов администратора"""
+    periods = ['Сегодня', 'За неделю', 'За месяц']
+    closed_counts = [today, week, month]
+
+    with matplotlib.rc_context(sns.axes_style("whitegrid")):
+        fig = Figure(figsize=(8, 5))
+        fig.suptitle(f'Статистика администратора {admin_id}', fontsize=16, fontweight='bold')
+
+        bar_ax = fig.add_subplot(1, 2, 1)
+        bar_ax.bar(periods, closed_counts, color=['skyblue', 'lightgreen', 'coral'])
+        bar_ax.set_title('Закрытые тикеты', fontsize=14)
+        bar_ax.set_ylabel('Количество', fontsize=12)
+
+        info_ax = fig.add_subplot(1, 2, 2)
+        info_ax.axis('off')
+        info_text = f"""Активных тикетов: {active}
+Закрыто сегодня: {today}
+За неделю: {week}
+За месяц: {month}"""
+        info_ax.text(0.1, 0.5, info_text, fontsize=12, verticalalignment='center', bbox=dict(boxstyle="round,pad=0.5", facecolor="wheat"))
+
+        return _to_png(fig)
+
+
+def render_top_stats(rows: list[tuple[str, int]]) -> bytes:
+    """Таблица топа администраторов: rows — пары (имя, количество тикетов)"""
+    with style.context('dark_background'):
+        fig = Figure(figsize=(10, 8), facecolor='black')
+        ax = fig.add_subplot()
+        ax.axis('off')
+
+        fig.suptitle('ТОП ПОДДЕРЖКИ ЗА 30 ДНЕЙ', fontsize=18, fontweight='bold', color='white', y=0.93)
+
+        col_labels = ['№', 'Админ', 'Тикетов']
+        if rows:
+            table_data = [[f'{i}.', name, f'{count}'] for i, (name, count) in enumerate(rows, 1)]
+        else:
+            table_data = [['—', 'Нет данных', '—']]
+
+        table = ax.table(
+            cellText=table_data,
+            colLabels=col_labels,
+            cellLoc='center',
+            colLoc='center',
+            loc='center',
+            colWidths=[0.15, 0.4, 0.25],
+        )
+
+        table.auto_set_font_size(False)
+        table.set_fontsize(12)
+        table.scale(1, 2)
+
+        for i in range(len(col_labels)):
+            table[(0, i)].set_facecolor('#4CAF50')
+            table[(0, i)].set_text_props(weight='bold', color='white')
+
+        for i in range(1, len(table_data) + 1):
+            for j in range(len(col_labels)):
+                table[(i, j)].set_facecolor('#f0f0f0')
+                table[(i, j)].set_text_props(color='black')
+
+        return _to_png(fig, facecolor='black')
+
+
+def warm_up():
+    """Прогрев воркера: загрузка шрифтов и бэкенда до первого запроса"""
+    render_top_stats([('warm_up', 1)])
@@ -0,0 +1,133 @@
+import importlib.util
+import io
+import os
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from App.Infrastructure.Config import config
+
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+]
+BOLD_FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
+]
+
+
+def _bundled_font(name: str):
+    """Шрифт DejaVu из пакета matplotlib, без импорта самого matplotlib"""
+    spec = importlib.util.find_spec("matplotlib")
+    if not spec or not spec.submodule_search_locations:
+        return None
+    return os.path.join(spec.submodule_search_locations[0], "mpl-data", "fonts", "ttf", name)
+
+
+@lru_cache(maxsize=None)
+def _font(size: int, bold: bool = False) -> ImageFont.ImageFont:
+    candidates = [config.CHART_FONT] if config.CHART_FONT else []
+    candidates += BOLD_FONT_CANDIDATES if bold else FONT_CANDIDATES
+    candidates.append(_bundled_font("DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf"))
+    for path in candidates:
+        if path and os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size)
+
+
+def _to_png(image: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, format='PNG', optimize=True)
+    return buf.getvalue()
+
+
+def _center_text(draw: ImageDraw.ImageDraw, box: tuple[int, int, int, int], text: str, font, fill):
+    left, top, right, bottom = box
+    draw.text(((left + right) / 2, (top + bottom) / 2), text, font=font, fill=fill, anchor="mm")
+
+
+def render_admin_stats(admin_id: int, today: int, week: int, month: int, active: int) -> bytes:
+    """График закрытых тикетов администратора"""
+    width, height = 1200, 750
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+
+    _center_text(draw, (0, 20, width, 80), f'Статистика администратора {admin_id}', _font(34, bold=True), "black")
+
+    # Столбчатая диаграмма слева
+    chart_left, chart_top, chart_right, chart_bottom = 110, 170, 620, 640
+    _center_text(draw, (chart_left, 110, chart_right, 160), 'Закрытые тикеты', _font(28), "black")
+    y_label = Image.new("RGBA", (300, 40), (255, 255, 255, 0))
+    _center_text(ImageDraw.Draw(y_label), (0, 0, 300, 40), 'Количество', _font(22), "black")
+    y_label = y_label.rotate(90, expand=True)
+    image.paste(y_label, (15, int((chart_top + chart_bottom - y_label.height) / 2)), y_label)
+
+    step = max(1, -(-max(today, week, month) // 4))
+    max_value = step * 4
+    for i in range(5):
+        y = chart_bottom - (chart_bottom - chart_top) * i / 4
+        draw.line((chart_left, y, chart_right, y), fill="#e6e6e6", width=2)
+        draw.text((chart_left - 12, y), f'{step * i}', font=_font(18), fill="#444444", anchor="rm")
+
+    periods = [('Сегодня', today, 'skyblue'), ('За неделю', week, 'lightgreen'), ('За месяц', month, 'coral')]
+    slot = (chart_right - chart_left) / len(periods)
+    for i, (label, value, color) in enumerate(periods):
+        left = chart_left + slot * i + slot * 0.15
+        right = chart_left + slot * (i + 1) - slot * 0.15
+        top = chart_bottom - (chart_bottom - chart_top) * value / max_value
+        draw.rectangle((left, top, right, chart_bottom), fill=color)
+        _center_text(draw, (left, chart_bottom + 10, right, chart_bottom + 50), label, _font(20), "black")
+    draw.line((chart_left, chart_bottom, chart_right, chart_bottom), fill="black", width=2)
+
+    # Сводка справа
+    info_text = f"""Активных тикетов: {active}
+Закрыто сегодня: {today}
+За неделю: {week}
+За месяц: {month}"""
+    info_font = _font(26)
+    text_box = draw.multiline_textbbox((0, 0), info_text, font=info_font, spacing=12)
+    box_left, box_top = 700, (height - (text_box[3] - text_box[1])) / 2 - 20
+    draw.rounded_rectangle(
+        (box_left, box_top, box_left + text_box[2] + 50, box_top + text_box[3] + 40),
+        radius=18, fill="wheat", outline="black", width=2
+    )
+    draw.multiline_text((box_left + 25, box_top + 20), info_text, font=info_font, fill="black", spacing=12)
+
+    return _to_png(image)
+
+
+def render_top_stats(rows: list[tuple[str, int]]) -> bytes:
+    """Таблица топа администраторов: rows — пары (имя, количество тикетов)"""
+    col_labels = ['№', 'Админ', 'Тикетов']
+    if rows:
+        table_data = [[f'{i}.', name, f'{count}'] for i, (name, count) in enumerate(rows, 1)]
+    else:
+        table_data = [['—', 'Нет данных', '—']]
+
+    width, row_height = 1200, 56
+    col_widths = [180, 480, 300]
+    table_left = (width - sum(col_widths)) // 2
+    table_top = 150
+    height = table_top + row_height * (len(table_data) + 1) + 80
+
+    image = Image.new("RGB", (width, height), "black")
+    draw = ImageDraw.Draw(image)
+    _center_text(draw, (0, 30, width, 100), 'ТОП ПОДДЕРЖКИ ЗА 30 ДНЕЙ', _font(40, bold=True), "white")
+
+    for row_index, row in enumerate([col_labels] + table_data):
+        top = table_top + row_index * row_height
+        is_header = row_index == 0
+        left = table_left
+        for col_index, value in enumerate(row):
+            box = (left, top, left + col_widths[col_index], top + row_height)
+            draw.rectangle(box, fill='#4CAF50' if is_header else '#f0f0f0', outline="black", width=2)
+            _center_text(draw, box, value, _font(24, bold=is_header), "white" if is_header else "black")
+            left += col_widths[col_index]
+
+    return _to_png(image)
+
+
+def warm_up():
+    """Прогрев воркера: загрузка шрифтов до первого запроса"""
+    render_top_stats([('warm_up', 1)])
@@ -0,0 +1,86 @@
+import asyncio
+import importlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# pillow — легкий отрисовщик по умолчанию, rich — matplotlib/seaborn
+RENDERERS = {
+    "pillow": "App.Infrastructure.Components.Charts.pillow_renderer",
+    "rich": "App.Infrastructure.Components.Charts.matplotlib_renderer",
+}
+
+
+class ChartRenderPool:
+    """Пул процессов для отрисовки графиков вне event loop.
+
+    Воркеры запускаются и прогреваются при старте (импорт matplotlib, кэш
+    шрифтов), число одновременных задач ограничено семафором, каждая
+    отрисовка ограничена timeout секундами. Если отрисовка зависла, пул
+    пересоздается, чтобы зависший воркер не занимал место.
+    """
+
+    def __init__(self, workers: int = 2, timeout: float = 15.0, max_pending: int = None, renderer: str = "pillow"):
+        if renderer not in RENDERERS:
+            raise ValueError(f"Неизвестный отрисовщик графиков: {renderer}")
+        self.renderer = importlib.import_module(RENDERERS[renderer])
+        self.workers = workers
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_pending or workers * 2)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def start(self):
+        if self._executor is not None:
+            return
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=self.renderer.warm_up)
+        self._executor = executor
+        # Процессы пула создаются только при отправке задач: по пустой задаче на
+        # воркер, чтобы запуск процессов и warm_up прошли до первого запроса
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.gather(*(loop.run_in_executor(executor, os.getpid) for _ in range(self.workers)))
+        except Exception as e:
+            logger.error(f"Ошибка прогрева ChartRenderPool: {e}")
+        logger.info(f"ChartRenderPool запущен, воркеров: {self.workers}, отрисовщик: {self.renderer.__name__}")
+
+    def stop(self):
+        if self._executor:
+            self._shutdown(self._executor)
+            self._executor = None
+            logger.info("ChartRenderPool остановлен")
+
+    @staticmethod
+    def _shutdown(executor: ProcessPoolExecutor, terminate: bool = False):
+        # shutdown не прерывает выполняющиеся задачи и забывает процессы, поэтому
+        # список берется заранее, а зависший процесс завершается явно
+        processes = list((getattr(executor, "_processes", None) or {}).values()) if terminate else []
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    async def _recycle(self, executor: ProcessPoolExecutor):
+        """Пересоздать пул после зависшей отрисовки"""
+        if self._executor is not executor:
+            return
+        self._executor = None
+        self._shutdown(executor, terminate=True)
+        logger.warning("ChartRenderPool пересоздается после зависшей отрисовки")
+        await self.start()
+
+    async def render(self, name: str, *args) -> bytes:
+        """Выполнить функцию отрисовки name (render_admin_stats, render_top_stats) в пуле"""
+        func = getattr(self.renderer, name)
+        await self.start()
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            executor = self._executor
+            future = loop.run_in_executor(executor, func, *args)
+            try:
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"Отрисовка {name} не уложилась в {self.timeout} сек")
+                await self._recycle(executor)
+                raise
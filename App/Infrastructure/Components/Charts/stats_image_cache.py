@@ -0,0 +1,85 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StatsImage:
+    png: bytes
+    file_id: Optional[str] = None
+
+
+class StatsImageCache:
+    """Кэш отрисованных картинок статистики.
+
+    Картинки хранятся по хэшу входных данных вместе с file_id после первой
+    отправки. Представления ("top", "admin:<id>") указывают на хэш данных и
+    сбрасываются при закрытии тикета или новой оценке; если после сброса
+    данные не изменились, используется уже готовая картинка. ttl ограничивает
+    жизнь представления, так как окна "сегодня"/"30 дней" сдвигаются сами.
+    """
+
+    TOP_VIEW = "top"
+
+    def __init__(self, ttl: int = 600, max_images: int = 200):
+        self.ttl = ttl
+        self.max_images = max_images
+        self._views: dict[str, tuple[str, float]] = {}
+        self._images: OrderedDict[str, StatsImage] = OrderedDict()
+        self._generation = 0
+
+    @staticmethod
+    def admin_view(admin_id: int) -> str:
+        return f"admin:{admin_id}"
+
+    @staticmethod
+    def data_key(view: str, data) -> str:
+        payload = json.dumps([view, data], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @property
+    def generation(self) -> int:
+        """Счетчик сбросов; передается в bind_view, чтобы не сохранить устаревшие данные"""
+        return self._generation
+
+    def get_view(self, view: str) -> Optional[StatsImage]:
+        bound = self._views.get(view)
+        if not bound:
+            return None
+        data_key, bound_at = bound
+        if time.monotonic() - bound_at > self.ttl:
+            del self._views[view]
+            return None
+        return self.get_image(data_key)
+
+    def get_image(self, data_key: str) -> Optional[StatsImage]:
+        image = self._images.get(data_key)
+        if image:
+            self._images.move_to_end(data_key)
+        return image
+
+    def put_image(self, data_key: str, png: bytes) -> StatsImage:
+        image = StatsImage(png=png)
+        self._images[data_key] = image
+        while len(self._images) > self.max_images:
+            self._images.popitem(last=False)
+        return image
+
+    def bind_view(self, view: str, data_key: str, generation: int):
+        if generation != self._generation:
+            return
+        self._views[view] = (data_key, time.monotonic())
+
+    def invalidate_admin(self, admin_id: Optional[int]):
+        """Сбросить представления, зависящие от статистики администратора"""
+        self._generation += 1
+        self._views.pop(self.TOP_VIEW, None)
+        if admin_id:
+            self._views.pop(self.admin_view(admin_id), None)
+        logger.debug(f"Кэш картинок статистики сброшен для администратора {admin_id}")
@@ -0,0 +1,53 @@
+import logging
+import secrets
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from App.Domain.Services.ExportService.export_service import ExportService, ExportFilters, EXPORT_FORMATS
+from App.Infrastructure.Config import config
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class ExportController:
+    def __init__(self, export_service: ExportService):
+        self.export_service = export_service
+
+    def export(
+        self,
+        kind: str,
+        admin_token: Optional[str],
+        filters: ExportFilters,
+        export_format: str = "csv",
+        compress: bool = False
+    ) -> StreamingResponse:
+        self._check_token(admin_token)
+        if export_format not in EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Формат должен быть одним из: {', '.join(EXPORT_FORMATS)}")
+
+        filename = f"{kind}.{export_format}"
+        media_type = MEDIA_TYPES[export_format]
+        if compress:
+            filename += ".gz"
+            media_type = "application/gzip"
+
+        logger.info(f"Выгрузка {filename}, фильтры: {filters}")
+        return StreamingResponse(
+            self.export_service.export(kind, export_format, filters, compress),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+
+    @staticmethod
+    def _check_token(admin_token: Optional[str]):
+        if not config.EXPORT_API_TOKEN:
+            raise HTTPException(status_code=403, detail="Выгрузка отключена: не задан EXPORT_API_TOKEN")
+        if not admin_token or not secrets.compare_digest(admin_token, config.EXPORT_API_TOKEN):
+            raise HTTPException(status_code=401, detail="Неверный токен администратора")
@@ -1,9 +1,14 @@
+import asyncio
 import logging
-from fastapi import HTTPException, Query
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+from fastapi.responses import JSONResponse
 
 from App.Domain.Services.TicketApplicationService.ticket_application_service import TicketApplicationService
 from App.Domain.Models.TicketResponse.TicketResponse import TicketResponse
 from App.Domain.Models.TicketStatusResponse.TicketStatusResponse import TicketStatusResponse
+from App.Domain.Models.TicketMessagesResponse.TicketMessagesResponse import TicketMessagesResponse
 from App.Domain.Models.MessageRequest.MessageRequest import MessageRequest
 from App.Domain.Models.MessageResponse.MessageResponse import MessageResponse
 
@@ -42,6 +47,37 @@ class TicketController:
             logger.error(f"Ошибка получения статуса тикета {ticket_id}: {e}")
             raise HTTPException(status_code=500, detail=f"Ошибка получения статуса: {str(e)}")
 
+    async def get_ticket_messages(
+        self,
+        ticket_id: int,
+        before: Optional[int],
+        limit: int,
+        if_none_match: Optional[str] = None
+    ) -> Response:
+        try:
+            page = await asyncio.to_thread(self.ticket_application_service.get_ticket_messages, ticket_id, before, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as e:
+            logger.error(f"Ошибка получения сообщений тикета {ticket_id}: {e}")
+            raise HTTPException(status_code=500, detail=f"Ошибка получения сообщений: {str(e)}")
+
+        headers = {
+            "ETag": self._messages_etag(page, before, limit),
+            # Старые страницы не меняются, последнюю клиент перепроверяет через If-None-Match
+            "Cache-Control": "private, no-cache" if before is None else "private, max-age=3600"
+        }
+        if if_none_match and headers["ETag"] in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(page.model_dump(mode="json"), headers=headers)
+
+    @staticmethod
+    def _messages_etag(page: TicketMessagesResponse, before: Optional[int], limit: int) -> str:
+        # Сообщения не редактируются, поэтому страницу определяют ее границы и размер
+        first_id = page.messages[0].id if page.messages else 0
+        last_id = page.messages[-1].id if page.messages else 0
+        return f'W/"{page.ticket_id}-{before or 0}-{limit}-{first_id}-{last_id}-{len(page.messages)}"'
+
     async def send_message_to_ticket(
         self,
         ticket_id: int,
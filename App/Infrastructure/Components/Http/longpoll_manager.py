@@ -2,6 +2,7 @@ import logging
 import asyncio
 from typing import Dict, List, Optional
 
+from App.Domain.Enums.TicketStatus.TicketStatus import TicketStatus
 from App.Domain.Models.TicketUpdate.TicketUpdate import TicketUpdate
 
 logger = logging.getLogger(__name__)
@@ -66,7 +67,7 @@ class LongpollManager:
                 try:
                     queue.put_nowait(TicketUpdate(
                         ticket_id=ticket_id,
-                        status="closed",
+                        status=TicketStatus.CLOSED,
                         message="Тикет закрыт"
                     ))
                 except Exception:
@@ -1,9 +1,10 @@
 import logging
 import json
 from datetime import datetime
-from typing import Dict, Set
+from typing import Dict, Optional, Set
 from fastapi import WebSocket, WebSocketDisconnect
 
+from App.Domain.Enums.TicketStatus.TicketStatus import TicketStatus
 from App.Domain.Models.TicketUpdate.TicketUpdate import TicketUpdate
 
 logger = logging.getLogger(__name__)
@@ -294,8 +295,10 @@ class WebSocketManager:
         try:
             media_binary_data = None
             filename = media_filename or "media_file"
+            media_cache = self.channel_manager.media_cache
+            cache_keys = []
+            ticket_service = TicketService(self.channel_manager, self)
 
-            
             if media_data_b64:
                 if not media_filename:
                     await self._send_json_by_ticket(ticket_id, {
@@ -333,9 +336,8 @@ class WebSocketManager:
                         media_binary_data = await response.read()
                         logger.info(f"Скачан файл по URL {media_url}, размер: {len(media_binary_data)} байт")
 
-            
-            ticket_service = TicketService(self.channel_manager, self)
-            await self._send_media_to_support(ticket_service, user_id, media_type, media_binary_data, filename, media_caption)
+            cache_keys.append(media_cache.content_key(media_type, media_binary_data))
+            await self._send_media_to_support(ticket_service, user_id, media_type, media_binary_data, filename, media_caption, cache_keys)
 
             await self._send_json_by_ticket(ticket_id, {
                 "type": "media_sent",
@@ -349,50 +351,58 @@ class WebSocketManager:
                 "message": "Ошибка отправки медиа"
             })
 
-    async def _send_media_to_support(self, ticket_service: 'TicketService', user_id: int, media_type: str, media_data: bytes, filename: str, caption: str):
-        """Отправка медиа в поддержку через Telegram бот"""
-        from io import BytesIO
+    async def _send_media_to_support(self, ticket_service: 'TicketService', user_id: int, media_type: str, media_data: Optional[bytes], filename: str, caption: str, cache_keys: Optional[list[str]] = None):
+        """Отправка медиа в поддержку через Telegram бот.
+
+        Если содержимое уже загружалось в Telegram, медиа отправляется по
+        file_id из кэша, без повторной загрузки байтов."""
+        from aiogram.exceptions import TelegramBadRequest
         from aiogram.types import BufferedInputFile
-        from App.Domain.Models.Ticket.Ticket import Ticket
+        from App.Domain.Enums.TicketEventType.TicketEventType import TicketEventType
 
         
         if user_id not in ticket_service.active_tickets:
             raise ValueError("У пользователя нет активного тикета")
 
         ticket = ticket_service.active_tickets[user_id]
+        media_cache = ticket_service.channel_manager.media_cache
+        cache_keys = cache_keys or []
 
         try:
-            
-            buffered_file = BufferedInputFile(media_data, filename=filename)
-
-            
-            if media_type == "photo":
-                message = await ticket_service.channel_manager.bot.send_photo(
-                    chat_id=ticket_service.channel_manager.support_channel_id,
-                    photo=buffered_file,
-                    caption=caption,
-                    message_thread_id=ticket.topic_thread_id
-                )
-            elif media_type == "video":
-                message = await ticket_service.channel_manager.bot.send_video(
-                    chat_id=ticket_service.channel_manager.support_channel_id,
-                    video=buffered_file,
-                    caption=caption,
-                    message_thread_id=ticket.topic_thread_id
-                )
-            elif media_type == "document":
-                message = await ticket_service.channel_manager.bot.send_document(
-                    chat_id=ticket_service.channel_manager.support_channel_id,
-                    document=buffered_file,
-                    caption=caption,
-                    message_thread_id=ticket.topic_thread_id
-                )
+            message = None
+            cached_file_id = None
+            for key in cache_keys:
+                cached_file_id = await media_cache.get_file_id(key)
+                if cached_file_id:
+                    break
+            if cached_file_id:
+                try:
+                    message = await self._send_media_by_type(ticket_service, ticket, media_type, cached_file_id, caption)
+                    logger.info(f"Медиа {filename} отправлено по кэшированному file_id")
+                except TelegramBadRequest as e:
+                    logger.warning(f"Кэшированный file_id для {filename} отклонен Telegram: {e}")
+                    for key in cache_keys:
+                        await media_cache.forget(key)
+                    if media_data is None:
+                        raise
+
+            if message is None:
+                buffered_file = BufferedInputFile(media_data, filename=filename)
+                message = await self._send_media_by_type(ticket_service, ticket, media_type, buffered_file, caption)
+
+                file_id, file_size = media_cache.extract_file_id(message)
+                if file_id:
+                    for key in cache_keys:
+                        await media_cache.put_file_id(key, file_id, file_size)
+
+            ticket_service.channel_manager.remember_topic_message(ticket.topic_thread_id, message.message_id, user_id, caption, ticket)
+            ticket_service.event_service.record(ticket.db_id, TicketEventType.USER_MESSAGE, user_id)
 
             logger.info(f"Медиа {filename} типа {media_type} отправлено в топик тикета")
             print(f"DEBUG: Медиа {filename} отправлено в Telegram как {media_type}")
 
             # Обновить иконку топика
-            if ticket.status == "in_progress":
+            if ticket.status == TicketStatus.IN_PROGRESS:
                 await ticket_service.channel_manager.update_topic_icon(ticket, "❓")
 
         except Exception as e:
@@ -400,6 +410,18 @@ class WebSocketManager:
             print(f"DEBUG: Ошибка отправки медиа: {e}")
             raise
 
+    async def _send_media_by_type(self, ticket_service: 'TicketService', ticket, media_type: str, media, caption: str):
+        """Отправить медиа (file_id или файл) в топик тикета методом, соответствующим типу"""
+        bot = ticket_service.channel_manager.bot
+        chat_id = ticket_service.channel_manager.support_channel_id
+        if media_type == "photo":
+            return await bot.send_photo(chat_id=chat_id, photo=media, caption=caption, message_thread_id=ticket.topic_thread_id)
+        elif media_type == "video":
+            return await bot.send_video(chat_id=chat_id, video=media, caption=caption, message_thread_id=ticket.topic_thread_id)
+        elif media_type == "document":
+            return await bot.send_document(chat_id=chat_id, document=media, caption=caption, message_thread_id=ticket.topic_thread_id)
+        raise ValueError(f"Неподдерживаемый тип медиа: {media_type}")
+
     async def _send_json_by_ticket(self, ticket_id: int, data: dict) -> int:
         """Отправить JSON сообщение всем websocket соединениям тикета
         Возвращает количество успешных отправок"""
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from App.Infrastructure.Models.database import get_db
+from App.Infrastructure.Models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+OutboxHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# На сколько секунд сообщение резервируется за обработчиком после выборки
+LEASE_SECONDS = 60
+MAX_BACKOFF_SECONDS = 300
+# Сколько дней хранить обработанные сообщения
+RETENTION_DAYS = 7
+
+
+def enqueue_outbox(db: Session, kind: str, idempotency_key: str, payload: Dict[str, Any]):
+    """Добавить сообщение в outbox в транзакции переданной сессии.
+
+    Повторная запись с тем же idempotency_key игнорируется; commit делает
+    вызывающий код вместе с изменением тикета.
+    """
+    stmt = insert(OutboxMessage).values(kind=kind, idempotency_key=idempotency_key, payload=payload)
+    db.execute(stmt.on_conflict_do_nothing(index_elements=[OutboxMessage.idempotency_key]))
+
+
+def enqueue_outbox_many(db: Session, kind: str, messages: Sequence[tuple[str, Dict[str, Any]]]):
+    """Добавить пачку сообщений (idempotency_key, payload) одним INSERT, как enqueue_outbox"""
+    if not messages:
+        return
+    stmt = insert(OutboxMessage).on_conflict_do_nothing(index_elements=[OutboxMessage.idempotency_key])
+    db.execute(stmt, [
+        {"kind": kind, "idempotency_key": idempotency_key, "payload": payload}
+        for idempotency_key, payload in messages
+    ])
+
+
+class OutboxDispatcher:
+    """Фоновая отправка побочных эффектов (Telegram, WebSocket) из таблицы outbox.
+
+    Сообщения выбираются пачками по batch_size через FOR UPDATE SKIP LOCKED и
+    резервируются на LEASE_SECONDS. Ошибка обработчика откладывает сообщение
+    с экспоненциальной задержкой; после max_attempts попыток оно помечается
+    обработанным с last_error. Обработчики должны быть идемпотентны: при
+    падении процесса сообщение будет доставлено повторно.
+
+    Виды, зарегистрированные с min_interval, обрабатываются отдельной задачей
+    по одному сообщению не чаще раза в min_interval секунд (ограничения
+    Telegram на массовые отправки) и не задерживают остальные виды.
+    """
+
+    def __init__(self, batch_size: int = 50, poll_interval: float = 1.0, max_attempts: int = 10):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._handlers: Dict[str, OutboxHandler] = {}
+        self._min_intervals: Dict[str, float] = {}
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._last_prune: Optional[datetime] = None
+
+    def register(self, kind: str, handler: OutboxHandler, min_interval: float = 0):
+        self._handlers[kind] = handler
+        if min_interval > 0:
+            self._min_intervals[kind] = min_interval
+
+    def wake(self):
+        """Разбудить диспетчер сразу после commit, не дожидаясь poll_interval"""
+        self._wakeup.set()
+
+    def start(self):
+        if not self._tasks:
+            self._tasks.append(asyncio.create_task(self._run()))
+            for kind, min_interval in self._min_intervals.items():
+                self._tasks.append(asyncio.create_task(self._run_throttled(kind, min_interval)))
+            logger.info(f"OutboxDispatcher запущен, обработчики: {sorted(self._handlers)}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.dispatch_once()
+            except Exception as e:
+                logger.error(f"Ошибка обработки outbox: {e}")
+                processed = 0
+
+            if processed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def _run_throttled(self, kind: str, min_interval: float):
+        while True:
+            try:
+                processed = await self.dispatch_once(kind)
+            except Exception as e:
+                logger.error(f"Ошибка обработки outbox ({kind}): {e}")
+                processed = 0
+            await asyncio.sleep(min_interval if processed else max(min_interval, self.poll_interval))
+
+    async def dispatch_once(self, kind: Optional[str] = None) -> int:
+        """Обработать одну пачку сообщений; возвращает их количество.
+
+        Без kind обрабатываются все виды, кроме ограниченных по частоте; с
+        kind - одно сообщение этого вида.
+        """
+        if kind is None:
+            messages = await asyncio.to_thread(self._claim_batch, self.batch_size)
+        else:
+            messages = await asyncio.to_thread(self._claim_batch, 1, kind)
+        processed_ids = []
+        for message_id, kind, payload, attempts in messages:
+            handler = self._handlers.get(kind)
+            try:
+                if handler is None:
+                    raise LookupError(f"нет обработчика для {kind}")
+                await handler(payload)
+            except Exception as e:
+                await asyncio.to_thread(self._mark_failed, message_id, kind, attempts + 1, str(e))
+            else:
+                processed_ids.append(message_id)
+
+        if processed_ids:
+            await asyncio.to_thread(self._mark_processed, processed_ids)
+
+        if kind is None:
+            await asyncio.to_thread(self._prune)
+        return len(messages)
+
+    def _claim_batch(self, limit: int, kind: Optional[str] = None) -> list[tuple]:
+        db = get_db()
+        try:
+            now = datetime.now(timezone.utc)
+            query = db.query(OutboxMessage.id, OutboxMessage.kind, OutboxMessage.payload, OutboxMessage.attempts).filter(
+                OutboxMessage.processed_at.is_(None),
+                OutboxMessage.available_at <= now
+            )
+            if kind is not None:
+                query = query.filter(OutboxMessage.kind == kind)
+            elif self._min_intervals:
+                query = query.filter(OutboxMessage.kind.not_in(list(self._min_intervals)))
+            rows = query.order_by(OutboxMessage.id).limit(limit).with_for_update(skip_locked=True).all()
+
+            if rows:
+                db.execute(update(OutboxMessage).where(OutboxMessage.id.in_([row.id for row in rows])).values(
+                    available_at=now + timedelta(seconds=LEASE_SECONDS)
+                ))
+            db.commit()
+            return [tuple(row) for row in rows]
+        finally:
+            db.close()
+
+    def _mark_processed(self, message_ids: list[int]):
+        db = get_db()
+        try:
+            db.execute(update(OutboxMessage).where(OutboxMessage.id.in_(message_ids)).values(
+                processed_at=datetime.now(timezone.utc),
+                last_error=None
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def _mark_failed(self, message_id: int, kind: str, attempts: int, error: str):
+        now = datetime.now(timezone.utc)
+        values = {"attempts": attempts, "last_error": error}
+        if attempts >= self.max_attempts:
+            values["processed_at"] = now
+            logger.error(f"Сообщение outbox {message_id} ({kind}) отброшено после {attempts} попыток: {error}")
+        else:
+            values["available_at"] = now + timedelta(seconds=min(2 ** attempts, MAX_BACKOFF_SECONDS))
+            logger.warning(f"Сообщение outbox {message_id} ({kind}) не обработано, попытка {attempts}: {error}")
+
+        db = get_db()
+        try:
+            db.execute(update(OutboxMessage).where(OutboxMessage.id == message_id).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    def _prune(self):
+        now = datetime.now(timezone.utc)
+        if self._last_prune and now - self._last_prune < timedelta(hours=1):
+            return
+        self._last_prune = now
+
+        db = get_db()
+        try:
+            deleted = db.query(OutboxMessage).filter(
+                OutboxMessage.processed_at < now - timedelta(days=RETENTION_DAYS)
+            ).delete(synchronize_session=False)
+            db.commit()
+            if deleted:
+                logger.info(f"Удалено {deleted} обработанных сообщений outbox")
+        finally:
+            db.close()
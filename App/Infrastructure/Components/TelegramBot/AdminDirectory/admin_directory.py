@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+
+from App.Infrastructure.Config import config
+
+logger = logging.getLogger(__name__)
+
+
+class AdminDirectory:
+    """Кэш администраторов канала поддержки: id → имя и username → id.
+
+    Список администраторов загружается через get_chat_administrators в фоне
+    раз в ttl секунд и целиком заменяет кэш, поэтому снятые администраторы
+    из него пропадают. Между обновлениями username уже известных
+    администраторов (и TELEGRAM_ADMIN_IDS) обновляется по from_user обычных
+    апдейтов. Поиск по кэшу никогда не обращается к Bot API.
+    """
+
+    def __init__(self, bot, chat_id: int = None, ttl: int = 600):
+        self.bot = bot
+        self.chat_id = chat_id or config.SUPPORT_CHANNEL_ID
+        self.ttl = ttl
+        self._usernames_by_id: Dict[int, Optional[str]] = {}
+        self._ids_by_username: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+            logger.info(f"AdminDirectory запущен, обновление раз в {self.ttl} сек")
+
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    def is_admin(self, user_id: int) -> bool:
+        return user_id in self._usernames_by_id or user_id in config.TELEGRAM_ADMIN_IDS
+
+    def display_name(self, admin_id: int) -> str:
+        """Отображаемое имя администратора (@username или user_id)"""
+        username = self._usernames_by_id.get(admin_id)
+        if username:
+            return f"@{username}"
+        return f"user_{admin_id}"
+
+    def resolve_username(self, username: str) -> Optional[int]:
+        """Найти id администратора по username"""
+        return self._ids_by_username.get(username.lstrip('@').lower())
+
+    def observe(self, user: Optional[User]):
+        """Обновить данные администратора по from_user входящего апдейта"""
+        if user is None or user.is_bot or not self.is_admin(user.id):
+            return
+        self._remember(self._usernames_by_id, self._ids_by_username, user.id, user.username)
+
+    async def refresh(self):
+        try:
+            admins = await self.bot.get_chat_administrators(self.chat_id)
+        except Exception as e:
+            logger.warning(f"Не удалось обновить список администраторов: {e}")
+            return
+
+        usernames_by_id: Dict[int, Optional[str]] = {}
+        ids_by_username: Dict[str, int] = {}
+        # Администраторы из конфига могут не состоять в канале: их username из апдейтов сохраняется
+        for admin_id in config.TELEGRAM_ADMIN_IDS:
+            if admin_id in self._usernames_by_id:
+                self._remember(usernames_by_id, ids_by_username, admin_id, self._usernames_by_id[admin_id])
+        for admin in admins:
+            if not admin.user.is_bot:
+                self._remember(usernames_by_id, ids_by_username, admin.user.id, admin.user.username)
+        self._usernames_by_id, self._ids_by_username = usernames_by_id, ids_by_username
+        self._loaded_at = time.monotonic()
+        logger.info(f"Список администраторов обновлен: {len(self._usernames_by_id)}")
+
+    async def _refresh_loop(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.ttl)
+
+    @staticmethod
+    def _remember(usernames_by_id: Dict[int, Optional[str]], ids_by_username: Dict[str, int],
+                  user_id: int, username: Optional[str]):
+        previous = usernames_by_id.get(user_id)
+        if previous and previous.lower() != (username or "").lower():
+            ids_by_username.pop(previous.lower(), None)
+        usernames_by_id[user_id] = username
+        if username:
+            ids_by_username[username.lower()] = user_id
+
+
+class AdminDirectoryMiddleware(BaseMiddleware):
+    """Outer middleware, передающий from_user каждого апдейта в AdminDirectory"""
+
+    def __init__(self, admin_directory: AdminDirectory):
+        self.admin_directory = admin_directory
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        self.admin_directory.observe(data.get("event_from_user"))
+        return await handler(event, data)
@@ -1,17 +1,24 @@
 import logging
 from aiogram import Bot
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
 from aiogram.types import Message as TgMessage, InlineKeyboardMarkup, InlineKeyboardButton
 from typing import Optional
 
 from App.Domain.Models.Ticket.Ticket import Ticket
+from App.Infrastructure.Components.TelegramBot.MediaCache.media_cache import MediaFileCache
 from App.Infrastructure.Config import config
 
 logger = logging.getLogger(__name__)
 
+# Временные ошибки Telegram: доставку через outbox стоит повторить позже
+TRANSIENT_TELEGRAM_ERRORS = (TelegramRetryAfter, TelegramNetworkError, TelegramServerError)
+
 
 class ChannelManager:
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, history_service=None):
         self.bot = bot
+        self.history_service = history_service
+        self.media_cache = MediaFileCache(config.MEDIA_CACHE_SIZE, config.MEDIA_CACHE_TTL)
         self.support_channel_id = config.SUPPORT_CHANNEL_ID
         self.general_topic_id = config.GENERAL_TOPIC_ID
         self._reviews_topic_id: Optional[int] = config.REVIEWS_TOPIC_ID  
@@ -81,7 +88,7 @@ class ChannelManager:
             logger.error(f"Ошибка отправки тикета в общий топик: {e}")
             raise
 
-    async def update_general_message(self, ticket: Ticket, status: str):
+    async def update_general_message(self, ticket: Ticket, status: str, raise_transient: bool = False):
         cancelled_text = (
             f"🎫 Тикет #{ticket.display_id}\n"
             f"👤 Пользователь: @{ticket.username}\n"
@@ -99,6 +106,8 @@ class ChannelManager:
             )
             logger.info(f"Сообщение тикета {ticket.id} обновлено в общем топике")
         except Exception as e:
+            if raise_transient and isinstance(e, TRANSIENT_TELEGRAM_ERRORS):
+                raise
             logger.error(f"Ошибка обновления сообщения в общем топике: {e}")
 
     def _get_ticket_closed_text(self, db_ticket):
@@ -197,13 +206,26 @@ class ChannelManager:
         except Exception as e:
             logger.error(f"Ошибка редактирования сообщения пользователя при отмене: {e}")
 
+    def remember_topic_message(self, thread_id: Optional[int], message_id: int, sender_id: int, text: Optional[str] = None, ticket: Optional[Ticket] = None):
+        """Запоминает сообщение топика, чтобы /clear мог удалить его пакетно"""
+        if not self.history_service:
+            return
+        self.history_service.record_topic_message(
+            thread_id,
+            message_id,
+            sender_id,
+            text,
+            ticket.db_id if ticket else None
+        )
+
     async def send_user_message(self, ticket: Ticket, message_text: str):
         try:
-            await self.bot.send_message(
+            message = await self.bot.send_message(
                 chat_id=self.support_channel_id,
                 message_thread_id=ticket.topic_thread_id,
                 text=message_text
             )
+            self.remember_topic_message(ticket.topic_thread_id, message.message_id, ticket.user_id, message_text, ticket)
             logger.info(f"Сообщение пользователя добавлено в тикет {ticket.id}")
         except Exception as e:
             logger.error(f"Ошибка отправки сообщения пользователя: {e}")
@@ -211,16 +233,33 @@ class ChannelManager:
     async def send_user_media(self, ticket: Ticket, message):
         """Отправка медиа от пользователя в топик тикета"""
         try:
-            await self.bot.copy_message(
+            copied = await self.bot.copy_message(
                 chat_id=self.support_channel_id,
                 from_chat_id=message.chat.id,
                 message_id=message.message_id,
                 message_thread_id=ticket.topic_thread_id
             )
+            self.remember_topic_message(ticket.topic_thread_id, copied.message_id, ticket.user_id, message.caption, ticket)
             logger.info(f"Медиа пользователя добавлено в тикет {ticket.id}")
         except Exception as e:
             logger.error(f"Ошибка отправки медиа пользователя: {e}")
 
+    async def send_user_media_group(self, ticket: Ticket, messages: list):
+        """Отправка альбома пользователя в топик тикета одним вызовом copyMessages"""
+        messages = sorted(messages, key=lambda m: m.message_id)
+        try:
+            copied = await self.bot.copy_messages(
+                chat_id=self.support_channel_id,
+                from_chat_id=messages[0].chat.id,
+                message_ids=[m.message_id for m in messages],
+                message_thread_id=ticket.topic_thread_id
+            )
+            for original, copy in zip(messages, copied):
+                self.remember_topic_message(ticket.topic_thread_id, copy.message_id, ticket.user_id, original.caption, ticket)
+            logger.info(f"Альбом из {len(messages)} медиа пользователя добавлен в тикет {ticket.id}")
+        except Exception as e:
+            logger.error(f"Ошибка отправки альбома пользователя: {e}")
+
     async def send_support_reply(self, user_id: int, support_message: str, support_name: str):
         try:
             
@@ -374,6 +413,8 @@ class ChannelManager:
                 reply_markup=menu_keyboard,
                 parse_mode="HTML"
             )
+            # Служебное сообщение топика: без ticket, чтобы не попасть в переписку тикета
+            self.remember_topic_message(ticket.topic_thread_id, menu_message.message_id, self.bot.id, menu_message.text)
 
             taken_text = (
                 f"🎫 Тикет #{ticket.display_id}\n"
@@ -472,6 +513,41 @@ class ChannelManager:
         except Exception as e:
             logger.warning(f"Ошибка в close_ticket_by_admin: {e}")
 
+    async def close_ticket_by_timeout(self, ticket: Ticket):
+        """Обрабатывает обновления UI при автоматическом закрытии неактивного тикета.
+
+        Временные ошибки Telegram пробрасываются, чтобы outbox повторил
+        доставку; повторяемые шаги идут первыми, уведомление поддержки - последним.
+        """
+        await self.update_general_message(ticket, "✅ Закрыт автоматически", raise_transient=True)
+
+        if ticket.topic_thread_id:
+            try:
+                await self.bot.close_forum_topic(
+                    chat_id=self.support_channel_id,
+                    message_thread_id=ticket.topic_thread_id
+                )
+            except TRANSIENT_TELEGRAM_ERRORS:
+                raise
+            except Exception as e:
+                logger.warning(f"Не удалось закрыть топик форума: {e}")
+
+        await self._notify_ticket_auto_closed(ticket)
+
+    async def notify_user_ticket_auto_closed(self, ticket: Ticket):
+        """Сообщает пользователю об автоматическом закрытии тикета (временные ошибки пробрасываются)"""
+        try:
+            await self.bot.send_message(
+                chat_id=ticket.user_id,
+                text=config.bot_messages.get('ticket_auto_closed_dm', 'Ваш тикет закрыт.').format(
+                    number=ticket.display_id
+                )
+            )
+        except TRANSIENT_TELEGRAM_ERRORS:
+            raise
+        except Exception as e:
+            logger.warning(f"Не удалось уведомить пользователя {ticket.user_id} о закрытии тикета #{ticket.display_id}: {e}")
+
     async def notify_ticket_cancelled(self, ticket: Ticket, cancelled_by_admin: bool):
         """Уведомляет команду поддержки об отмене тикета"""
         if cancelled_by_admin:
@@ -525,7 +601,23 @@ class ChannelManager:
 
         await self._send_notification_to_threads(notification_text, target_threads)
 
-    async def _send_notification_to_threads(self, text: str, thread_ids: list[int | None]):
+    async def _notify_ticket_auto_closed(self, ticket: Ticket):
+        """Информирует сотрудников поддержки об автоматическом закрытии тикета"""
+        notification_text = (
+            f"⏱ Тикет #{ticket.display_id} закрыт автоматически из-за неактивности\n"
+        )
+
+        target_threads = []
+        if ticket.topic_thread_id:
+            target_threads.append(ticket.topic_thread_id)
+
+        general_thread_id = self.general_topic_id if self.general_topic_id and self.general_topic_id > 0 else None
+        if general_thread_id not in target_threads:
+            target_threads.append(general_thread_id)
+
+        await self._send_notification_to_threads(notification_text, target_threads, raise_transient=True)
+
+    async def _send_notification_to_threads(self, text: str, thread_ids: list[int | None], raise_transient: bool = False):
         """Отправляет уведомление в несколько топиков (топик или общий чат)"""
         unique_thread_ids = []
         for thread_id in thread_ids:
@@ -534,14 +626,17 @@ class ChannelManager:
 
         for thread_id in unique_thread_ids:
             try:
-                await self.bot.send_message(
+                message = await self.bot.send_message(
                     chat_id=self.support_channel_id,
                     message_thread_id=thread_id,
                     text=text
                 )
+                self.remember_topic_message(thread_id, message.message_id, self.bot.id, text)
                 thread_label = thread_id if thread_id is not None else "общий чат"
                 logger.info(f"Уведомление отправлено в {thread_label}: {text}")
             except Exception as e:
+                if raise_transient and isinstance(e, TRANSIENT_TELEGRAM_ERRORS):
+                    raise
                 thread_label = thread_id if thread_id is not None else "общий чат"
                 logger.warning(f"Не удалось отправить уведомление в {thread_label}: {e}")
 
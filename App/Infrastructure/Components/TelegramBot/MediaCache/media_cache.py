@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import insert
+
+from App.Infrastructure.Models.database import get_db
+from App.Infrastructure.Models import MediaFileId
+
+logger = logging.getLogger(__name__)
+
+# Telegram гарантирует, что ссылка на скачивание файла действует не меньше часа
+FILE_PATH_TTL = 3600
+# Как часто чистить устаревшие записи таблицы (по количеству новых записей)
+PRUNE_EVERY = 100
+
+
+class MediaFileCache:
+    """Кэш Telegram file_id по хэшу содержимого медиа.
+
+    Горячие записи держатся в LRU в памяти, все записи сохраняются в таблицу
+    media_file_ids и переживают перезапуск. Записи старше ttl секунд
+    считаются устаревшими. Ключ - только хэш содержимого: по URL содержимое
+    может поменяться, поэтому медиа по ссылке всегда скачивается. Обращения
+    к таблице выполняются в потоке, не блокируя event loop. Дополнительно
+    кэширует file_path из get_file, чтобы не запрашивать его для каждого
+    скачивания.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl: int = 30 * 86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._file_ids: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._file_paths: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._puts_since_prune = 0
+
+    @staticmethod
+    def content_key(media_type: str, data: bytes) -> str:
+        return f"{media_type}:sha256:{hashlib.sha256(data).hexdigest()}"
+
+    @staticmethod
+    def extract_file_id(message) -> tuple[Optional[str], Optional[int]]:
+        """Достает file_id и размер из отправленного сообщения с медиа"""
+        if message.photo:
+            return message.photo[-1].file_id, message.photo[-1].file_size
+        for media in (message.video, message.document, message.animation):
+            if media:
+                return media.file_id, media.file_size
+        return None, None
+
+    async def get_file_id(self, cache_key: str) -> Optional[str]:
+        now = time.time()
+        cached = self._file_ids.get(cache_key)
+        if cached:
+            file_id, stored_at = cached
+            if now - stored_at <= self.ttl:
+                self._file_ids.move_to_end(cache_key)
+                return file_id
+            del self._file_ids[cache_key]
+
+        row = await asyncio.to_thread(self._load_row, cache_key)
+        if not row:
+            return None
+        file_id, stored_at = row
+        self._remember(self._file_ids, cache_key, file_id, stored_at)
+        return file_id
+
+    async def put_file_id(self, cache_key: str, file_id: str, file_size: Optional[int] = None):
+        self._remember(self._file_ids, cache_key, file_id, time.time())
+        await asyncio.to_thread(self._write_row, cache_key, file_id, file_size)
+
+        self._puts_since_prune += 1
+        if self._puts_since_prune >= PRUNE_EVERY:
+            self._puts_since_prune = 0
+            await asyncio.to_thread(self._prune)
+
+    async def forget(self, cache_key: str):
+        """Удалить запись, если Telegram перестал принимать file_id"""
+        self._file_ids.pop(cache_key, None)
+        await asyncio.to_thread(self._delete_row, cache_key)
+
+    def _load_row(self, cache_key: str) -> Optional[tuple[str, float]]:
+        db = get_db()
+        try:
+            row = db.query(MediaFileId).filter(MediaFileId.cache_key == cache_key).first()
+            if not row or row.created_at < datetime.now(timezone.utc) - timedelta(seconds=self.ttl):
+                return None
+            return row.file_id, row.created_at.timestamp()
+        except Exception as e:
+            logger.warning(f"Ошибка чтения кэша file_id: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _write_row(self, cache_key: str, file_id: str, file_size: Optional[int]):
+        db = get_db()
+        try:
+            stmt = insert(MediaFileId).values(cache_key=cache_key, file_id=file_id, file_size=file_size)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[MediaFileId.cache_key],
+                set_={"file_id": stmt.excluded.file_id, "file_size": stmt.excluded.file_size, "created_at": datetime.now(timezone.utc)}
+            )
+            db.execute(stmt)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Ошибка сохранения file_id в кэш: {e}")
+        finally:
+            db.close()
+
+    def _delete_row(self, cache_key: str):
+        db = get_db()
+        try:
+            db.query(MediaFileId).filter(MediaFileId.cache_key == cache_key).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Ошибка удаления file_id из кэша: {e}")
+        finally:
+            db.close()
+
+    def get_file_path(self, file_id: str) -> Optional[str]:
+        cached = self._file_paths.get(file_id)
+        if not cached:
+            return None
+        file_path, stored_at = cached
+        if time.time() - stored_at > FILE_PATH_TTL:
+            del self._file_paths[file_id]
+            return None
+        self._file_paths.move_to_end(file_id)
+        return file_path
+
+    def put_file_path(self, file_id: str, file_path: str):
+        self._remember(self._file_paths, file_id, file_path, time.time())
+
+    def _remember(self, entries: OrderedDict, key: str, value: str, stored_at: float):
+        entries[key] = (value, stored_at)
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def _prune(self):
+        """Удаляет из таблицы устаревшие записи и самые старые сверх лимита"""
+        db = get_db()
+        try:
+            threshold = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+            db.query(MediaFileId).filter(MediaFileId.created_at < threshold).delete(synchronize_session=False)
+
+            overflow_keys = db.query(MediaFileId.cache_key).order_by(MediaFileId.created_at.desc()).offset(self.max_entries)
+            db.query(MediaFileId).filter(MediaFileId.cache_key.in_(overflow_keys.scalar_subquery())).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Ошибка очистки кэша file_id: {e}")
+        finally:
+            db.close()
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy.dialects.postgresql import insert
+
+from App.Infrastructure.Models.database import get_db
+from App.Infrastructure.Models import FsmState
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _CachedRecord:
+    state: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.monotonic)
+    touched_at: float = field(default_factory=time.monotonic)
+
+
+class PostgresStorage(BaseStorage):
+    """FSM хранилище в Postgres с write-through кэшем в памяти.
+
+    Запись сохраняется в таблицу fsm_states и только после commit попадает
+    в кэш. Чтения обслуживаются из кэша не дольше cache_ttl секунд после
+    загрузки или записи; отсутствие состояния тоже кэшируется, поэтому
+    get_state на каждый апдейт не ходит в БД. Другой процесс с той же
+    таблицей увидит изменения только через cache_ttl секунд: при нескольких
+    процессах бота cache_ttl нужно выставить в 0 (кэш выключен). Состояния,
+    которые не менялись дольше state_ttl секунд, считаются брошенными и
+    удаляются из памяти и из БД.
+    """
+
+    def __init__(self, state_ttl: int = 86400, cache_ttl: int = 60, cleanup_interval: int = 600):
+        self.state_ttl = state_ttl
+        self.cache_ttl = cache_ttl
+        self.cleanup_interval = cleanup_interval
+        self._cache: Dict[str, _CachedRecord] = {}
+        # Увеличивается при каждой записи: загрузка, начатая до записи, не попадает в кэш
+        self._write_version = 0
+        self._last_cleanup = time.monotonic()
+        logger.info(f"PostgresStorage инициализирован, state_ttl={state_ttl}, cache_ttl={cache_ttl}")
+
+    @staticmethod
+    def _build_key(key: StorageKey) -> str:
+        parts = [str(key.bot_id), str(key.chat_id), str(key.user_id)]
+        if key.thread_id:
+            parts.append(str(key.thread_id))
+        if key.business_connection_id:
+            parts.append(key.business_connection_id)
+        parts.append(key.destiny)
+        return ":".join(parts)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get_record(key)
+        state = state.state if isinstance(state, State) else state
+        await self._save(self._build_key(key), _CachedRecord(state=state, data=record.data))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = await self._get_record(key)
+        return record.state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise ValueError(f"Data must be a dict, got {type(data).__name__}")
+        record = await self._get_record(key)
+        await self._save(self._build_key(key), _CachedRecord(state=record.state, data=data.copy()))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = await self._get_record(key)
+        return record.data.copy()
+
+    async def close(self) -> None:
+        self._cache.clear()
+
+    async def _get_record(self, key: StorageKey) -> _CachedRecord:
+        storage_key = self._build_key(key)
+        now = time.monotonic()
+        self._maybe_cleanup(now)
+
+        record = self._cache.get(storage_key)
+        if record and now - record.loaded_at <= self.cache_ttl and now - record.touched_at <= self.state_ttl:
+            return record
+
+        version = self._write_version
+        record = await asyncio.to_thread(self._load_row, storage_key)
+        if self.cache_ttl > 0 and version == self._write_version:
+            self._cache[storage_key] = record
+        return record
+
+    def _load_row(self, storage_key: str) -> _CachedRecord:
+        db = get_db()
+        try:
+            row = db.query(FsmState).filter(FsmState.key == storage_key).first()
+            if not row or self._is_expired(row.updated_at):
+                return _CachedRecord()
+            return _CachedRecord(state=row.state, data=dict(row.data or {}))
+        finally:
+            db.close()
+
+    async def _save(self, storage_key: str, record: _CachedRecord):
+        # При ошибке записи в кэше не должно остаться несохраненное состояние
+        self._cache.pop(storage_key, None)
+        self._write_version += 1
+        await asyncio.to_thread(self._write_row, storage_key, record.state, record.data)
+        if self.cache_ttl > 0:
+            record.touched_at = record.loaded_at = time.monotonic()
+            self._cache[storage_key] = record
+
+    def _write_row(self, storage_key: str, state: Optional[str], data: Dict[str, Any]):
+        db = get_db()
+        try:
+            if state is None and not data:
+                db.query(FsmState).filter(FsmState.key == storage_key).delete(synchronize_session=False)
+            else:
+                stmt = insert(FsmState).values(key=storage_key, state=state, data=data, updated_at=datetime.now(timezone.utc))
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[FsmState.key],
+                    set_={"state": stmt.excluded.state, "data": stmt.excluded.data, "updated_at": stmt.excluded.updated_at}
+                )
+                db.execute(stmt)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Ошибка сохранения FSM состояния {storage_key}: {e}")
+            raise
+        finally:
+            db.close()
+
+    def _is_expired(self, updated_at: Optional[datetime]) -> bool:
+        if updated_at is None:
+            return False
+        return updated_at < datetime.now(timezone.utc) - timedelta(seconds=self.state_ttl)
+
+    def _maybe_cleanup(self, now: float):
+        """Периодически удаляет брошенные состояния из памяти и из БД"""
+        if now - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = now
+
+        expired = [
+            k for k, record in self._cache.items()
+            if now - record.touched_at > self.state_ttl or now - record.loaded_at > self.cache_ttl
+        ]
+        for storage_key in expired:
+            del self._cache[storage_key]
+
+        asyncio.get_running_loop().run_in_executor(None, self._delete_expired_rows)
+
+    def _delete_expired_rows(self):
+        db = get_db()
+        try:
+            threshold = datetime.now(timezone.utc) - timedelta(seconds=self.state_ttl)
+            deleted = db.query(FsmState).filter(FsmState.updated_at < threshold).delete(synchronize_session=False)
+            db.commit()
+            if deleted:
+                logger.info(f"Удалено {deleted} брошенных FSM состояний")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Ошибка очистки FSM состояний: {e}")
+        finally:
+            db.close()
@@ -50,7 +50,7 @@ class MessageProcessor:
 
             if text.startswith('/'):
                 command = text.split()[0].lower()
-                if command in ['/menu', '/help', '/stat', '/start']:
+                if command in ['/menu', '/help', '/stat', '/start', '/clear']:
                     await self.message_service.process_command(message, command, state)
         except Exception as e:
             logger.error(f"Ошибка обработки группового сообщения: {e}")
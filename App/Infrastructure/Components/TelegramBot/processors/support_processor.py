@@ -1,5 +1,6 @@
 import logging
 from aiogram import Router, F
+from aiogram.dispatcher.event.bases import SkipHandler
 from aiogram.types import Message
 from aiogram.enums import ChatType
 from aiogram.fsm.context import FSMContext
@@ -24,6 +25,10 @@ class SupportProcessor:
         )
 
     async def _process_support_message(self, message: Message, state: FSMContext):
+        # Команды (/clear, /menu ...) обрабатывает MessageProcessor
+        if message.text and message.text.startswith('/'):
+            raise SkipHandler()
+
         try:
             user_id = message.from_user.id
 
@@ -32,27 +37,36 @@ class SupportProcessor:
             rename_ticket_id = state_data.get('rename_ticket_id')
             rename_admin_id = state_data.get('rename_admin_id')
 
+            # Ответ поддержки входит в переписку тикета, новое название темы - нет
+            self.ticket_service.channel_manager.remember_topic_message(
+                message.message_thread_id,
+                message.message_id,
+                user_id,
+                message.text or message.caption,
+                self.ticket_service.get_ticket_by_thread_id(message.message_thread_id) if rename_ticket_id is None else None
+            )
+
             if rename_ticket_id is not None:
                 # Проверяем, что пользователь администратор
                 if not self._is_admin(user_id):
-                    await message.answer("❌ Только администраторы могут переименовывать тикеты")
+                    await self._answer(message, "❌ Только администраторы могут переименовывать тикеты")
                     return
 
                 # Проверяем, что это тот же администратор, который запросил переименование
                 if rename_admin_id is not None and user_id != rename_admin_id:
-                    await message.answer("❌ Вы не можете переименовать этот тикет, так как запросили это не вы")
+                    await self._answer(message, "❌ Вы не можете переименовать этот тикет, так как запросили это не вы")
                     return
 
                 # Если пользователь в состоянии переименования, обрабатываем как ответ на переименование
                 if not message.text or message.text.strip() == "":
-                    await message.answer("❌ Название не может быть пустым")
+                    await self._answer(message, "❌ Название не может быть пустым")
                     return
 
                 success = await self.ticket_service.rename_ticket(rename_ticket_id, message.text.strip())
                 if success:
-                    await message.answer(f"✅ Тикет #{rename_ticket_id} переименован на: {message.text.strip()}")
+                    await self._answer(message, f"✅ Тикет #{rename_ticket_id} переименован на: {message.text.strip()}")
                 else:
-                    await message.answer("❌ Не удалось переименовать тикет")
+                    await self._answer(message, "❌ Не удалось переименовать тикет")
 
                 await state.clear()
                 return
@@ -72,6 +86,16 @@ class SupportProcessor:
         except Exception as e:
             logger.error(f"Ошибка обработки сообщения поддержки: {e}")
 
+    async def _answer(self, message: Message, text: str):
+        """Ответ в топике, который тоже попадет под /clear"""
+        answer = await message.answer(text)
+        self.ticket_service.channel_manager.remember_topic_message(
+            answer.message_thread_id,
+            answer.message_id,
+            answer.from_user.id if answer.from_user else message.bot.id,
+            text
+        )
+
     def _is_admin(self, user_id: int) -> bool:
         """Проверяет, является ли пользователь администратором"""
         from App.Infrastructure.Config import config
@@ -1,6 +1,8 @@
 import logging
 from typing import Optional
 from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
 
 from App.Infrastructure.Config import config
 
@@ -16,16 +18,28 @@ class TelegramBotClient:
     def _initialize_bot(self):
         try:
             self.bot = Bot(token=config.TELEGRAM_BOT_TOKEN)
-            self.dp = Dispatcher()
+            self.dp = Dispatcher(storage=self._create_storage())
             logger.info("Telegram бот инициализирован")
         except Exception as e:
             logger.error(f"Ошибка инициализации Telegram бота: {e}")
             raise
 
+    def _create_storage(self) -> BaseStorage:
+        """Создает FSM хранилище согласно FSM_STORAGE (postgres или memory)"""
+        if config.FSM_STORAGE == 'postgres':
+            from App.Infrastructure.Components.TelegramBot.Storage.postgres_storage import PostgresStorage
+            return PostgresStorage(state_ttl=config.FSM_STATE_TTL, cache_ttl=config.FSM_CACHE_TTL)
+        logger.info("Используется FSM хранилище в памяти")
+        return MemoryStorage()
+
     def register_router(self, router):
         self.dp.include_router(router)
         logger.info(f"Роутер зарегистрирован")
 
+    def register_middleware(self, middleware):
+        self.dp.update.outer_middleware(middleware)
+        logger.info(f"Middleware {type(middleware).__name__} зарегистрирован")
+
     async def start(self):
         try:
             logger.info("Запуск поллинга Telegram бота...")
@@ -14,6 +14,41 @@ class Config:
         self.GENERAL_TOPIC_ID: int = int(os.getenv('GENERAL_TOPIC_ID', '1'))  
         self.REVIEWS_TOPIC_ID: Optional[int] = int(os.getenv('REVIEWS_TOPIC_ID', '0')) if os.getenv('REVIEWS_TOPIC_ID') else None
         self.LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')
+        self.CLEAR_BATCH_DELAY: float = float(os.getenv('CLEAR_BATCH_DELAY', '1.0'))
+        self.MEDIA_GROUP_WINDOW: float = float(os.getenv('MEDIA_GROUP_WINDOW', '1.0'))
+        self.MEDIA_CACHE_SIZE: int = int(os.getenv('MEDIA_CACHE_SIZE', '5000'))
+        self.MEDIA_CACHE_TTL: int = int(os.getenv('MEDIA_CACHE_TTL', str(30 * 86400)))
+        self.FSM_STORAGE: str = os.getenv('FSM_STORAGE', 'postgres').lower()
+        self.FSM_STATE_TTL: int = int(os.getenv('FSM_STATE_TTL', '86400'))
+        # Кэш FSM в памяти процесса (сек); при нескольких процессах бота обязательно 0 (кэш выключен)
+        self.FSM_CACHE_TTL: int = int(os.getenv('FSM_CACHE_TTL', '60'))
+        self.CHART_WORKERS: int = int(os.getenv('CHART_WORKERS', '2'))
+        self.CHART_RENDERER: str = os.getenv('CHART_RENDERER', 'pillow').lower()
+        self.CHART_FONT: str = os.getenv('CHART_FONT', '')
+        self.CHART_RENDER_TIMEOUT: float = float(os.getenv('CHART_RENDER_TIMEOUT', '15'))
+        self.STATS_CACHE_TTL: int = int(os.getenv('STATS_CACHE_TTL', '600'))
+        self.LEADERBOARD_RECONCILE_INTERVAL: int = int(os.getenv('LEADERBOARD_RECONCILE_INTERVAL', '900'))
+        self.BALANCE_RECONCILE_INTERVAL: int = int(os.getenv('BALANCE_RECONCILE_INTERVAL', '3600'))
+        self.OUTBOX_BATCH_SIZE: int = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))
+        self.OUTBOX_POLL_INTERVAL: float = float(os.getenv('OUTBOX_POLL_INTERVAL', '1.0'))
+        self.HISTORY_BATCH_SIZE: int = int(os.getenv('HISTORY_BATCH_SIZE', '200'))
+        self.HISTORY_FLUSH_INTERVAL: float = float(os.getenv('HISTORY_FLUSH_INTERVAL', '1.0'))
+        # Через сколько дней после закрытия тикет переносится в архив (0 - не архивировать)
+        self.ARCHIVE_AFTER_DAYS: int = int(os.getenv('ARCHIVE_AFTER_DAYS', '0'))
+        # Сколько дней хранить архив (0 - бессрочно)
+        self.ARCHIVE_RETENTION_DAYS: int = int(os.getenv('ARCHIVE_RETENTION_DAYS', '0'))
+        self.ARCHIVE_BATCH_SIZE: int = int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))
+        self.ARCHIVE_INTERVAL: int = int(os.getenv('ARCHIVE_INTERVAL', '3600'))
+        # Через сколько часов без активности тикет закрывается автоматически (0 - не закрывать)
+        self.STALE_TICKET_HOURS: float = float(os.getenv('STALE_TICKET_HOURS', '0'))
+        # Пороги по категориям: "категория:часы,категория:часы"
+        self.STALE_TICKET_HOURS_BY_CATEGORY: Dict[str, float] = {}
+        self.STALE_SWEEP_BATCH_SIZE: int = int(os.getenv('STALE_SWEEP_BATCH_SIZE', '200'))
+        self.STALE_SWEEP_INTERVAL: int = int(os.getenv('STALE_SWEEP_INTERVAL', '600'))
+        # Не чаще одного закрытия топика и уведомления за столько секунд
+        self.AUTO_CLOSE_DELIVERY_INTERVAL: float = float(os.getenv('AUTO_CLOSE_DELIVERY_INTERVAL', '3.0'))
+        self.EXPORT_API_TOKEN: str = os.getenv('EXPORT_API_TOKEN', '')
+        self.ADMIN_DIRECTORY_TTL: int = int(os.getenv('ADMIN_DIRECTORY_TTL', '600'))
 
         
         self.DB_HOST: str = os.getenv('DB_HOST', 'localhost')
@@ -24,10 +59,21 @@ class Config:
 
         
         self.DATABASE_URL: str = f"postgresql+psycopg2://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
+        self.DB_REPLICA_HOST: str = os.getenv('DB_REPLICA_HOST', '')
+        self.DB_REPLICA_PORT: str = os.getenv('DB_REPLICA_PORT', self.DB_PORT)
+        self.DB_REPLICA_NAME: str = os.getenv('DB_REPLICA_NAME', self.DB_NAME)
+        self.DB_REPLICA_MAX_LAG: float = float(os.getenv('DB_REPLICA_MAX_LAG', '10'))
+        self.DB_REPLICA_CHECK_INTERVAL: float = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', '5'))
+        self.DATABASE_REPLICA_URL: str = (
+            f"postgresql+psycopg2://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_REPLICA_HOST}:{self.DB_REPLICA_PORT}/{self.DB_REPLICA_NAME}"
+            if self.DB_REPLICA_HOST else ""
+        )
         self.bot_messages: Dict[str, Any] = {}
         self.bot_keyboards: Dict[str, Any] = {}
         self._load_bot_messages()
         self._parse_admin_ids()
+        self._parse_stale_ticket_hours()
         self._validate()
 
     def _load_bot_messages(self):
@@ -53,6 +99,17 @@ class Config:
             except ValueError as e:
                 print(f"Ошибка парсинга TELEGRAM_ADMIN_IDS: {e}")
 
+    def _parse_stale_ticket_hours(self):
+        hours_str = os.getenv('STALE_TICKET_HOURS_BY_CATEGORY', '')
+        if hours_str:
+            try:
+                self.STALE_TICKET_HOURS_BY_CATEGORY = {
+                    category.strip(): float(hours)
+                    for category, hours in (item.split(':', 1) for item in hours_str.split(',') if item.strip())
+                }
+            except ValueError as e:
+                print(f"Ошибка парсинга STALE_TICKET_HOURS_BY_CATEGORY: {e}")
+
     def _validate(self):
         if not self.TELEGRAM_BOT_TOKEN:
             raise ValueError("TELEGRAM_BOT_TOKEN не установлен")
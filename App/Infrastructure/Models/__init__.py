@@ -1,11 +1,26 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Text, Float
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, ForeignKey, Text, Float, JSON, Index, UniqueConstraint, Enum
+from sqlalchemy.sql import func, text
+
+from App.Domain.Enums.TicketStatus.TicketStatus import TicketStatus
 
 Base = declarative_base()
 
+TICKET_STATUS_TYPE = Enum(TicketStatus, name="ticket_status", values_callable=lambda statuses: [s.value for s in statuses])
+
 class Ticket(Base):
     __tablename__ = "tickets"
+    __table_args__ = (
+        # Предикат должен совпадать с ACTIVE_TICKET_STATUSES
+        Index("ix_tickets_active_taken_by", "taken_by",
+              postgresql_where=text("status IN ('pending', 'in_progress')")),
+        Index("ix_tickets_active_updated_at", "updated_at",
+              postgresql_where=text("status IN ('pending', 'in_progress')")),
+        Index("ix_tickets_closed_taken_by_closed_at", "taken_by", "closed_at",
+              postgresql_where=text("status = 'closed'")),
+        Index("ix_tickets_closed_closed_at", "closed_at", postgresql_include=["taken_by"],
+              postgresql_where=text("status = 'closed'")),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     display_id = Column(Integer, unique=True, nullable=False, index=True)
@@ -13,7 +28,8 @@ class Ticket(Base):
     username = Column(String, nullable=True)
     user_message = Column(Text, nullable=True)
     category = Column(String, nullable=True)
-    status = Column(String, default="pending", index=True)  
+    status = Column(TICKET_STATUS_TYPE, nullable=False, default=TicketStatus.PENDING,
+                    server_default=TicketStatus.PENDING.value, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     taken_by = Column(BigInteger, nullable=True, index=True)
@@ -37,19 +53,141 @@ class Meta(Base):
 
 class TicketHistory(Base):
     __tablename__ = "ticket_history"
+    __table_args__ = (
+        Index("ix_ticket_history_ticket_id_id", "ticket_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     ticket_id = Column(Integer, ForeignKey("tickets.id"), nullable=True)
     sender_id = Column(BigInteger, nullable=False)
     message = Column(Text, nullable=True)
+    topic_thread_id = Column(BigInteger, nullable=True, index=True)
+    message_id = Column(BigInteger, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class TicketRating(Base):
     __tablename__ = "ticket_ratings"
+    __table_args__ = (
+        UniqueConstraint("ticket_id", "user_id", name="uq_ticket_ratings_ticket_id_user_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    ticket_id = Column(Integer, ForeignKey("tickets.id", ondelete="CASCADE"), nullable=False, index=True)
+    ticket_id = Column(Integer, ForeignKey("tickets.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(BigInteger, nullable=False, index=True)
     rating = Column(Integer, nullable=False)
     comment = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class FsmState(Base):
+    __tablename__ = "fsm_states"
+
+    key = Column(String, primary_key=True)
+    state = Column(String, nullable=True)
+    data = Column(JSON, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class MediaFileId(Base):
+    __tablename__ = "media_file_ids"
+
+    cache_key = Column(String, primary_key=True)
+    file_id = Column(String, nullable=False)
+    file_size = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class BalanceLedger(Base):
+    __tablename__ = "balance_ledger"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    admin_id = Column(BigInteger, nullable=False, index=True)
+    ticket_id = Column(Integer, nullable=True, unique=True)
+    amount = Column(Float, nullable=False)
+    reason = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class AdminDailyStats(Base):
+    __tablename__ = "admin_daily_stats"
+
+    admin_id = Column(BigInteger, primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    closed_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    earnings = Column(Float, nullable=False, default=0.0)
+
+class TicketEvent(Base):
+    __tablename__ = "ticket_events"
+    __table_args__ = (
+        Index("ix_ticket_events_ticket_id_event_type", "ticket_id", "event_type"),
+        Index("ix_ticket_events_event_type_created_at", "event_type", "created_at"),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    ticket_id = Column(Integer, nullable=False)
+    event_type = Column(String, nullable=False)
+    actor_id = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index("ix_outbox_pending", "available_at", postgresql_where=text("processed_at IS NULL")),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)
+    idempotency_key = Column(String, nullable=False, unique=True)
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+# Архив закрытых тикетов (ArchiveService). Колонки повторяют tickets,
+# ticket_history и ticket_ratings: при изменении исходных таблиц архивные
+# меняются той же миграцией. Внешних ключей нет, id сохраняются исходные.
+class TicketArchive(Base):
+    __tablename__ = "tickets_archive"
+    __table_args__ = (
+        Index("ix_tickets_archive_taken_by", "taken_by"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    display_id = Column(Integer, unique=True, nullable=False)
+    user_id = Column(BigInteger, nullable=False, index=True)
+    username = Column(String, nullable=True)
+    user_message = Column(Text, nullable=True)
+    category = Column(String, nullable=True)
+    status = Column(TICKET_STATUS_TYPE, nullable=False)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    taken_by = Column(BigInteger, nullable=True)
+    taken_at = Column(DateTime(timezone=True), nullable=True)
+    closed_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    channel_message_id = Column(BigInteger, nullable=True)
+    topic_thread_id = Column(BigInteger, nullable=True)
+    user_message_id = Column(BigInteger, nullable=True)
+
+class TicketHistoryArchive(Base):
+    __tablename__ = "ticket_history_archive"
+    __table_args__ = (
+        Index("ix_ticket_history_archive_ticket_id_id", "ticket_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    ticket_id = Column(Integer, nullable=True)
+    sender_id = Column(BigInteger, nullable=False)
+    message = Column(Text, nullable=True)
+    topic_thread_id = Column(BigInteger, nullable=True)
+    message_id = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime(timezone=True))
+
+class TicketRatingArchive(Base):
+    __tablename__ = "ticket_ratings_archive"
+
+    id = Column(Integer, primary_key=True)
+    ticket_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(BigInteger, nullable=False)
+    rating = Column(Integer, nullable=False)
+    comment = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True))
@@ -1,5 +1,8 @@
+import asyncio
 import logging
-from sqlalchemy import create_engine
+from typing import Optional
+
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session, declarative_base
 
 from App.Infrastructure.Config import config
@@ -12,6 +15,86 @@ engine = create_engine(config.DATABASE_URL, echo=False)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Реплика только для чтения (статистика, выгрузки). Если DB_REPLICA_HOST не
+# задан, все запросы идут в основную базу.
+read_engine = create_engine(
+    config.DATABASE_REPLICA_URL,
+    echo=False,
+    pool_pre_ping=True,
+    connect_args={"connect_timeout": 3},
+    execution_options={"postgresql_readonly": True},
+) if config.DATABASE_REPLICA_URL else None
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if read_engine else None
+
+# Отставание реплики в секундах; 0, если это не реплика или весь полученный WAL уже применен
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaHealth:
+    """Состояние реплики, которое фоновая задача проверяет раз в check_interval секунд.
+
+    is_healthy только читает результат последней проверки, поэтому
+    недоступная реплика не блокирует вызывающий код на connect_timeout. До
+    первой проверки чтение идет в основную БД.
+    """
+
+    def __init__(self, max_lag: float, check_interval: float):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag: float = None
+        self._healthy = False
+        self._task: Optional[asyncio.Task] = None
+
+    def is_healthy(self) -> bool:
+        return read_engine is not None and self._healthy
+
+    def start(self):
+        if read_engine is not None and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._update(await asyncio.to_thread(self._check))
+            await asyncio.sleep(self.check_interval)
+
+    def _check(self) -> bool:
+        try:
+            with read_engine.connect() as connection:
+                self.lag = float(connection.execute(REPLICA_LAG_QUERY).scalar() or 0)
+        except Exception as e:
+            logger.warning(f"Реплика БД недоступна: {e}")
+            self.lag = None
+            return False
+        return self.lag <= self.max_lag
+
+    def _update(self, healthy: bool):
+        if healthy == self._healthy:
+            return
+        self._healthy = healthy
+        if healthy:
+            logger.info(f"Чтение статистики переключено на реплику (отставание {self.lag:.1f} сек)")
+        else:
+            lag = f"{self.lag:.1f} сек" if self.lag is not None else "нет связи"
+            logger.warning(f"Чтение статистики переключено на основную БД (реплика: {lag})")
+
+
+replica_health = ReplicaHealth(config.DB_REPLICA_MAX_LAG, config.DB_REPLICA_CHECK_INTERVAL)
+
+
 def get_db() -> Session:
     """Получить сессию базы данных"""
     db = SessionLocal()
@@ -21,6 +104,13 @@ def get_db() -> Session:
         db.close()
 
 
+def get_read_db() -> Session:
+    """Получить сессию для чтения: реплика, если она доступна и не отстает, иначе основная БД"""
+    if ReadSessionLocal is not None and replica_health.is_healthy():
+        return ReadSessionLocal()
+    return SessionLocal()
+
+
 def create_tables():
     """Создать все таблицы в базе данных"""
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,42 @@
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from App.Infrastructure.Models import AdminDailyStats
+
+
+def utc_today() -> date:
+    """Текущий день по UTC - в нем же считает бэкфилл admin_daily_stats"""
+    return datetime.now(timezone.utc).date()
+
+
+def bump_admin_daily_stats(db: Session, admin_id: Optional[int], day: date = None, closed: int = 0,
+                           rating_sum: int = 0, rating_count: int = 0, earnings: float = 0.0):
+    """Прибавить значения к дневной статистике администратора.
+
+    Выполняется в переданной сессии, чтобы попасть в одну транзакцию с
+    изменением тикета, оценки или баланса; commit делает вызывающий код.
+    """
+    if not admin_id:
+        return
+
+    stmt = insert(AdminDailyStats).values(
+        admin_id=admin_id,
+        day=day or utc_today(),
+        closed_count=closed,
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        earnings=earnings
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AdminDailyStats.admin_id, AdminDailyStats.day],
+        set_={
+            "closed_count": AdminDailyStats.closed_count + stmt.excluded.closed_count,
+            "rating_sum": AdminDailyStats.rating_sum + stmt.excluded.rating_sum,
+            "rating_count": AdminDailyStats.rating_count + stmt.excluded.rating_count,
+            "earnings": AdminDailyStats.earnings + stmt.excluded.earnings
+        }
+    )
+    db.execute(stmt)
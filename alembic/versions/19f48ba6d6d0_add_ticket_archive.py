@@ -0,0 +1,86 @@
+"""add_ticket_archive
+
+Revision ID: 19f48ba6d6d0
+Revises: 3c9417036752
+Create Date: 2026-10-19 15:40:48.388970
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '19f48ba6d6d0'
+down_revision: Union[str, Sequence[str], None] = '3c9417036752'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ARCHIVED_COLUMNS = {
+    'tickets': 'id, display_id, user_id, username, user_message, category, status, created_at, updated_at, '
+               'taken_by, taken_at, closed_at, channel_message_id, topic_thread_id, user_message_id',
+    'ticket_history': 'id, ticket_id, sender_id, message, topic_thread_id, message_id, created_at',
+    'ticket_ratings': 'id, ticket_id, user_id, rating, comment, created_at',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tickets_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('display_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('username', sa.String(), nullable=True),
+    sa.Column('user_message', sa.Text(), nullable=True),
+    sa.Column('category', sa.String(), nullable=True),
+    sa.Column('status', postgresql.ENUM(name='ticket_status', create_type=False), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('taken_by', sa.BigInteger(), nullable=True),
+    sa.Column('taken_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('closed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('channel_message_id', sa.BigInteger(), nullable=True),
+    sa.Column('topic_thread_id', sa.BigInteger(), nullable=True),
+    sa.Column('user_message_id', sa.BigInteger(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('display_id')
+    )
+    op.create_index(op.f('ix_tickets_archive_user_id'), 'tickets_archive', ['user_id'], unique=False)
+    op.create_index(op.f('ix_tickets_archive_closed_at'), 'tickets_archive', ['closed_at'], unique=False)
+    op.create_table('ticket_history_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('ticket_id', sa.Integer(), nullable=True),
+    sa.Column('sender_id', sa.BigInteger(), nullable=False),
+    sa.Column('message', sa.Text(), nullable=True),
+    sa.Column('topic_thread_id', sa.BigInteger(), nullable=True),
+    sa.Column('message_id', sa.BigInteger(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ticket_history_archive_ticket_id_id', 'ticket_history_archive', ['ticket_id', 'id'], unique=False)
+    op.create_table('ticket_ratings_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('ticket_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('rating', sa.Integer(), nullable=False),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ticket_ratings_archive_ticket_id'), 'ticket_ratings_archive', ['ticket_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Возвращаем архив в рабочие таблицы, чтобы не потерять данные
+    for table, columns in ARCHIVED_COLUMNS.items():
+        op.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_archive ON CONFLICT DO NOTHING")
+    op.drop_index(op.f('ix_ticket_ratings_archive_ticket_id'), table_name='ticket_ratings_archive')
+    op.drop_table('ticket_ratings_archive')
+    op.drop_index('ix_ticket_history_archive_ticket_id_id', table_name='ticket_history_archive')
+    op.drop_table('ticket_history_archive')
+    op.drop_index(op.f('ix_tickets_archive_closed_at'), table_name='tickets_archive')
+    op.drop_index(op.f('ix_tickets_archive_user_id'), table_name='tickets_archive')
+    op.drop_table('tickets_archive')
@@ -0,0 +1,65 @@
+"""add_ticket_query_indexes
+
+Revision ID: 1b2a71c396d3
+Revises: 0b9d4e7f1a38
+Create Date: 2026-10-19 15:27:47.981751
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b2a71c396d3'
+down_revision: Union[str, Sequence[str], None] = '0b9d4e7f1a38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_PREDICATE = sa.text("status IN ('pending', 'in_progress', 'taken', 'answered')")
+CLOSED_PREDICATE = sa.text("status = 'closed'")
+
+
+def _drop_invalid_index(name: str) -> None:
+    """Удалить INVALID индекс, оставшийся от прерванного CREATE INDEX CONCURRENTLY.
+
+    Иначе if_not_exists молча пропустит его, и индекс так и не будет построен.
+    """
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace AND NOT i.indisvalid"
+    ), {"name": name}).scalar()
+    if invalid:
+        op.drop_index(name, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name in ('ix_tickets_active_taken_by', 'ix_tickets_closed_taken_by_closed_at', 'ix_tickets_closed_closed_at'):
+            _drop_invalid_index(name)
+        op.create_index('ix_tickets_active_taken_by', 'tickets', ['taken_by'], unique=False,
+                        postgresql_where=ACTIVE_PREDICATE, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_tickets_closed_taken_by_closed_at', 'tickets', ['taken_by', 'closed_at'], unique=False,
+                        postgresql_where=CLOSED_PREDICATE, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_tickets_closed_closed_at', 'tickets', ['closed_at'], unique=False,
+                        postgresql_include=['taken_by'], postgresql_where=CLOSED_PREDICATE,
+                        postgresql_concurrently=True, if_not_exists=True)
+        # Поиск по ticket_id обслуживает uq_ticket_ratings_ticket_id_user_id (ticket_id - первая колонка)
+        op.drop_index('ix_ticket_ratings_ticket_id', table_name='ticket_ratings',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_ticket_ratings_ticket_id', 'ticket_ratings', ['ticket_id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_tickets_closed_closed_at', table_name='tickets',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_tickets_closed_taken_by_closed_at', table_name='tickets',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_tickets_active_taken_by', table_name='tickets',
+                      postgresql_concurrently=True, if_exists=True)
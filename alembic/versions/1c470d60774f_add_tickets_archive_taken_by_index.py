@@ -0,0 +1,47 @@
+"""add_tickets_archive_taken_by_index
+
+Revision ID: 1c470d60774f
+Revises: 8a6c79c0e0f8
+Create Date: 2026-10-19 15:55:04.729970
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c470d60774f'
+down_revision: Union[str, Sequence[str], None] = '8a6c79c0e0f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _drop_invalid_index(name: str) -> None:
+    """Удалить INVALID индекс, оставшийся от прерванного CREATE INDEX CONCURRENTLY.
+
+    Иначе if_not_exists молча пропустит его, и индекс так и не будет построен.
+    """
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace AND NOT i.indisvalid"
+    ), {"name": name}).scalar()
+    if invalid:
+        op.drop_index(name, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Средний рейтинг администратора читает tickets_archive по taken_by
+    with op.get_context().autocommit_block():
+        _drop_invalid_index('ix_tickets_archive_taken_by')
+        op.create_index('ix_tickets_archive_taken_by', 'tickets_archive', ['taken_by'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tickets_archive_taken_by', table_name='tickets_archive',
+                      postgresql_concurrently=True, if_exists=True)
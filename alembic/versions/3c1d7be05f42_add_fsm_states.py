@@ -0,0 +1,36 @@
+"""add_fsm_states
+
+Revision ID: 3c1d7be05f42
+Revises: 90681f43282b
+Create Date: 2026-10-19 11:04:17.208316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1d7be05f42'
+down_revision: Union[str, Sequence[str], None] = '90681f43282b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('fsm_states',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('state', sa.String(), nullable=True),
+    sa.Column('data', sa.JSON(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_fsm_states_updated_at'), 'fsm_states', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_fsm_states_updated_at'), table_name='fsm_states')
+    op.drop_table('fsm_states')
@@ -0,0 +1,46 @@
+"""add_ticket_history_ticket_id_index
+
+Revision ID: 3c9417036752
+Revises: dcb18d174ee4
+Create Date: 2026-10-19 15:39:09.473438
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9417036752'
+down_revision: Union[str, Sequence[str], None] = 'dcb18d174ee4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _drop_invalid_index(name: str) -> None:
+    """Удалить INVALID индекс, оставшийся от прерванного CREATE INDEX CONCURRENTLY.
+
+    Иначе if_not_exists молча пропустит его, и индекс так и не будет построен.
+    """
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace AND NOT i.indisvalid"
+    ), {"name": name}).scalar()
+    if invalid:
+        op.drop_index(name, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        _drop_invalid_index('ix_ticket_history_ticket_id_id')
+        op.create_index('ix_ticket_history_ticket_id_id', 'ticket_history', ['ticket_id', 'id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_ticket_history_ticket_id_id', table_name='ticket_history',
+                      postgresql_concurrently=True, if_exists=True)
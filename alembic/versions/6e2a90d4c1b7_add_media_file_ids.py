@@ -0,0 +1,36 @@
+"""add_media_file_ids
+
+Revision ID: 6e2a90d4c1b7
+Revises: 3c1d7be05f42
+Create Date: 2026-10-19 12:04:17.208331
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2a90d4c1b7'
+down_revision: Union[str, Sequence[str], None] = '3c1d7be05f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('media_file_ids',
+    sa.Column('cache_key', sa.String(), nullable=False),
+    sa.Column('file_id', sa.String(), nullable=False),
+    sa.Column('file_size', sa.BigInteger(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('cache_key')
+    )
+    op.create_index(op.f('ix_media_file_ids_created_at'), 'media_file_ids', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_media_file_ids_created_at'), table_name='media_file_ids')
+    op.drop_table('media_file_ids')
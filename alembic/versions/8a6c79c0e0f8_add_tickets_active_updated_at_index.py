@@ -0,0 +1,50 @@
+"""add_tickets_active_updated_at_index
+
+Revision ID: 8a6c79c0e0f8
+Revises: 19f48ba6d6d0
+Create Date: 2026-10-19 15:45:35.026546
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a6c79c0e0f8'
+down_revision: Union[str, Sequence[str], None] = '19f48ba6d6d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ACTIVE_PREDICATE = sa.text("status IN ('pending', 'in_progress')")
+
+
+def _drop_invalid_index(name: str) -> None:
+    """Удалить INVALID индекс, оставшийся от прерванного CREATE INDEX CONCURRENTLY.
+
+    Иначе if_not_exists молча пропустит его, и индекс так и не будет построен.
+    """
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace AND NOT i.indisvalid"
+    ), {"name": name}).scalar()
+    if invalid:
+        op.drop_index(name, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Поиск зависших тикетов (StaleTicketSweeper)
+    with op.get_context().autocommit_block():
+        _drop_invalid_index('ix_tickets_active_updated_at')
+        op.create_index('ix_tickets_active_updated_at', 'tickets', ['updated_at'], unique=False,
+                        postgresql_where=ACTIVE_PREDICATE, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tickets_active_updated_at', table_name='tickets',
+                      postgresql_concurrently=True, if_exists=True)
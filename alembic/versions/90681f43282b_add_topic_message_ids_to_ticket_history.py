@@ -0,0 +1,32 @@
+"""add_topic_message_ids_to_ticket_history
+
+Revision ID: 90681f43282b
+Revises: a5511fde9993
+Create Date: 2026-10-19 10:12:41.531204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '90681f43282b'
+down_revision: Union[str, Sequence[str], None] = 'a5511fde9993'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ticket_history', sa.Column('topic_thread_id', sa.BigInteger(), nullable=True))
+    op.add_column('ticket_history', sa.Column('message_id', sa.BigInteger(), nullable=True))
+    op.create_index(op.f('ix_ticket_history_topic_thread_id'), 'ticket_history', ['topic_thread_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_ticket_history_topic_thread_id'), table_name='ticket_history')
+    op.drop_column('ticket_history', 'message_id')
+    op.drop_column('ticket_history', 'topic_thread_id')
@@ -0,0 +1,61 @@
+"""add_admin_daily_stats
+
+Revision ID: b8e31f5a2c90
+Revises: 6e2a90d4c1b7
+Create Date: 2026-10-19 13:21:08.417562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e31f5a2c90'
+down_revision: Union[str, Sequence[str], None] = '6e2a90d4c1b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('admin_daily_stats',
+    sa.Column('admin_id', sa.BigInteger(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('closed_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('rating_sum', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('rating_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('earnings', sa.Float(), nullable=False, server_default='0'),
+    sa.PrimaryKeyConstraint('admin_id', 'day')
+    )
+    op.create_index(op.f('ix_admin_daily_stats_day'), 'admin_daily_stats', ['day'], unique=False)
+
+    # Заполнение по истории. Начисления раньше не сохранялись по тикетам,
+    # поэтому восстанавливаются по правилу начисления: 50 ₽ за закрытый тикет
+    # вне категорий hwid и key.
+    op.execute("""
+        INSERT INTO admin_daily_stats (admin_id, day, closed_count, rating_sum, rating_count, earnings)
+        SELECT admin_id, day, SUM(closed_count), SUM(rating_sum), SUM(rating_count), SUM(earnings)
+        FROM (
+            SELECT taken_by AS admin_id, (closed_at AT TIME ZONE 'UTC')::date AS day, COUNT(*) AS closed_count,
+                   0 AS rating_sum, 0 AS rating_count,
+                   SUM(CASE WHEN COALESCE(category, '') IN ('hwid', 'key') THEN 0 ELSE 50 END) AS earnings
+            FROM tickets
+            WHERE status = 'closed' AND taken_by IS NOT NULL AND closed_at IS NOT NULL
+            GROUP BY taken_by, (closed_at AT TIME ZONE 'UTC')::date
+            UNION ALL
+            SELECT t.taken_by, (r.created_at AT TIME ZONE 'UTC')::date, 0, SUM(r.rating), COUNT(*), 0
+            FROM ticket_ratings r
+            JOIN tickets t ON t.id = r.ticket_id
+            WHERE t.taken_by IS NOT NULL AND r.created_at IS NOT NULL
+            GROUP BY t.taken_by, (r.created_at AT TIME ZONE 'UTC')::date
+        ) AS history
+        GROUP BY admin_id, day
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_admin_daily_stats_day'), table_name='admin_daily_stats')
+    op.drop_table('admin_daily_stats')
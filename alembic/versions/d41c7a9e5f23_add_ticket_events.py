@@ -0,0 +1,39 @@
+"""add_ticket_events
+
+Revision ID: d41c7a9e5f23
+Revises: b8e31f5a2c90
+Create Date: 2026-10-19 14:37:52.903118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41c7a9e5f23'
+down_revision: Union[str, Sequence[str], None] = 'b8e31f5a2c90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ticket_events',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('ticket_id', sa.Integer(), nullable=False),
+    sa.Column('event_type', sa.String(), nullable=False),
+    sa.Column('actor_id', sa.BigInteger(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ticket_events_ticket_id_event_type', 'ticket_events', ['ticket_id', 'event_type'], unique=False)
+    op.create_index('ix_ticket_events_event_type_created_at', 'ticket_events', ['event_type', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ticket_events_event_type_created_at', table_name='ticket_events')
+    op.drop_index('ix_ticket_events_ticket_id_event_type', table_name='ticket_events')
+    op.drop_table('ticket_events')
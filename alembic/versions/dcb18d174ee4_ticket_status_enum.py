@@ -0,0 +1,70 @@
+"""ticket_status_enum
+
+Revision ID: dcb18d174ee4
+Revises: 1b2a71c396d3
+Create Date: 2026-10-19 15:34:17.997258
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dcb18d174ee4'
+down_revision: Union[str, Sequence[str], None] = '1b2a71c396d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ticket_status = postgresql.ENUM('pending', 'in_progress', 'closed', 'cancelled', name='ticket_status')
+
+CLOSED_PREDICATE = sa.text("status = 'closed'")
+
+
+def create_status_indexes(active_predicate):
+    op.create_index('ix_tickets_active_taken_by', 'tickets', ['taken_by'], unique=False,
+                    postgresql_where=active_predicate)
+    op.create_index('ix_tickets_closed_taken_by_closed_at', 'tickets', ['taken_by', 'closed_at'], unique=False,
+                    postgresql_where=CLOSED_PREDICATE)
+    op.create_index('ix_tickets_closed_closed_at', 'tickets', ['closed_at'], unique=False,
+                    postgresql_include=['taken_by'], postgresql_where=CLOSED_PREDICATE)
+
+
+def drop_status_indexes():
+    op.drop_index('ix_tickets_closed_closed_at', table_name='tickets')
+    op.drop_index('ix_tickets_closed_taken_by_closed_at', table_name='tickets')
+    op.drop_index('ix_tickets_active_taken_by', table_name='tickets')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Старые значения из разных частей кода приводим к единому набору статусов
+    op.execute("""
+        UPDATE tickets SET status = CASE
+            WHEN status IS NULL OR status = 'open' THEN 'pending'
+            WHEN status IN ('taken', 'answered') THEN 'in_progress'
+            WHEN status = 'canceled' THEN 'cancelled'
+            ELSE status
+        END
+        WHERE status IS NULL OR status NOT IN ('pending', 'in_progress', 'closed', 'cancelled')
+    """)
+
+    # Предикаты частичных индексов зависят от типа колонки, поэтому индексы пересоздаются
+    drop_status_indexes()
+    ticket_status.create(op.get_bind())
+    op.alter_column('tickets', 'status', server_default=None)
+    op.alter_column('tickets', 'status', type_=ticket_status, postgresql_using='status::ticket_status',
+                    existing_type=sa.String(), nullable=False, server_default='pending')
+    create_status_indexes(sa.text("status IN ('pending', 'in_progress')"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_status_indexes()
+    op.alter_column('tickets', 'status', server_default=None)
+    op.alter_column('tickets', 'status', type_=sa.String(), postgresql_using='status::text',
+                    existing_type=ticket_status, nullable=True)
+    ticket_status.drop(op.get_bind())
+    create_status_indexes(sa.text("status IN ('pending', 'in_progress', 'taken', 'answered')"))
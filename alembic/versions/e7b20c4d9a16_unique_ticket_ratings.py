@@ -0,0 +1,55 @@
+"""unique_ticket_ratings
+
+Revision ID: e7b20c4d9a16
+Revises: d41c7a9e5f23
+Create Date: 2026-10-19 15:42:11.208734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b20c4d9a16'
+down_revision: Union[str, Sequence[str], None] = 'd41c7a9e5f23'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Дубли оценок от двойных нажатий: оставляем последнюю запись и
+    # вычитаем удаленные из admin_daily_stats, куда они попали при заполнении.
+    op.execute("""
+        WITH duplicates AS (
+            DELETE FROM ticket_ratings r
+            USING ticket_ratings newer
+            WHERE newer.ticket_id = r.ticket_id
+              AND newer.user_id = r.user_id
+              AND newer.id > r.id
+            RETURNING r.ticket_id, r.rating, r.created_at
+        ),
+        removed AS (
+            SELECT t.taken_by AS admin_id, (d.created_at AT TIME ZONE 'UTC')::date AS day, d.rating
+            FROM duplicates d
+            JOIN tickets t ON t.id = d.ticket_id
+            WHERE t.taken_by IS NOT NULL AND d.created_at IS NOT NULL
+        )
+        UPDATE admin_daily_stats s
+        SET rating_sum = s.rating_sum - agg.rating_sum,
+            rating_count = s.rating_count - agg.rating_count
+        FROM (
+            SELECT admin_id, day, SUM(rating) AS rating_sum, COUNT(*) AS rating_count
+            FROM removed
+            GROUP BY admin_id, day
+        ) AS agg
+        WHERE s.admin_id = agg.admin_id AND s.day = agg.day
+    """)
+    op.create_unique_constraint('uq_ticket_ratings_ticket_id_user_id', 'ticket_ratings', ['ticket_id', 'user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_ticket_ratings_ticket_id_user_id', 'ticket_ratings', type_='unique')
@@ -0,0 +1,48 @@
+"""add_balance_ledger
+
+Revision ID: f3a8c61e2b45
+Revises: e7b20c4d9a16
+Create Date: 2026-10-19 16:18:37.550912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c61e2b45'
+down_revision: Union[str, Sequence[str], None] = 'e7b20c4d9a16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('balance_ledger',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('admin_id', sa.BigInteger(), nullable=False),
+    sa.Column('ticket_id', sa.Integer(), nullable=True),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('reason', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('ticket_id')
+    )
+    op.create_index(op.f('ix_balance_ledger_admin_id'), 'balance_ledger', ['admin_id'], unique=False)
+
+    # Начисления раньше не сохранялись по тикетам, поэтому текущий баланс
+    # переносится в журнал одной начальной записью на администратора.
+    op.execute("""
+        INSERT INTO balance_ledger (admin_id, ticket_id, amount, reason)
+        SELECT admin_id, NULL, balance, 'opening_balance'
+        FROM admin_balances
+        WHERE COALESCE(balance, 0) <> 0
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_balance_ledger_admin_id'), table_name='balance_ledger')
+    op.drop_table('balance_ledger')
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: admin statistics snapshot (one query over admin_daily_stats)
+vs the old five queries over the tickets table
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from App.Domain.Enums.TicketStatus.TicketStatus import TicketStatus, ACTIVE_TICKET_STATUSES
+from App.Infrastructure.Models.database import get_db
+from App.Infrastructure.Models import Ticket, TicketRating, AdminDailyStats
+from App.Infrastructure.Models.rollups import bump_admin_daily_stats
+from App.Domain.Services.StatisticsService.statistics_service import StatisticsService
+
+BENCH_ADMIN_ID = 999000001
+BENCH_DISPLAY_ID_BASE = 900000000
+
+
+def five_queries(service: StatisticsService, admin_id: int):
+    """Previous implementation of generate_stats_text data loading (tickets table)"""
+    return (
+        service.get_active_tickets_count(admin_id),
+        service.get_closed_tickets_count("today", admin_id),
+        service.get_closed_tickets_count("week", admin_id),
+        service.get_closed_tickets_count("month", admin_id),
+        service._get_admin_average_rating(admin_id),
+    )
+
+
+def one_query(service: StatisticsService, admin_id: int):
+    snapshot = service.get_admin_snapshot(admin_id)
+    return snapshot.active, snapshot.today, snapshot.week, snapshot.month, snapshot.rating
+
+
+def seed(count: int):
+    db = get_db()
+    try:
+        now = datetime.now(timezone.utc)
+        for i in range(count):
+            closed = random.random() < 0.8
+            ticket = Ticket(
+                display_id=BENCH_DISPLAY_ID_BASE + i,
+                user_id=random.randint(1, 10000),
+                username="bench",
+                status=TicketStatus.CLOSED if closed else random.choice(ACTIVE_TICKET_STATUSES),
+                taken_by=BENCH_ADMIN_ID,
+                closed_at=now - timedelta(days=random.uniform(0, 60)) if closed else None,
+            )
+            db.add(ticket)
+            db.flush()
+            if closed:
+                bump_admin_daily_stats(db, BENCH_ADMIN_ID, ticket.closed_at.date(), closed=1)
+            if closed and random.random() < 0.5:
+                rating = random.randint(1, 5)
+                db.add(TicketRating(ticket_id=ticket.id, user_id=ticket.user_id, rating=rating))
+                bump_admin_daily_stats(db, BENCH_ADMIN_ID, rating_sum=rating, rating_count=1)
+        db.commit()
+    finally:
+        db.close()
+
+
+def cleanup():
+    db = get_db()
+    try:
+        db.query(Ticket).filter(Ticket.display_id >= BENCH_DISPLAY_ID_BASE, Ticket.taken_by == BENCH_ADMIN_ID).delete(synchronize_session=False)
+        db.query(AdminDailyStats).filter(AdminDailyStats.admin_id == BENCH_ADMIN_ID).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def measure(name: str, func, service: StatisticsService, admin_id: int, iterations: int):
+    func(service, admin_id)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = func(service, admin_id)
+    elapsed = (time.perf_counter() - start) / iterations * 1000
+    print(f"{name:<14} {elapsed:8.2f} ms/call  -> {result}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--admin-id", type=int, default=None, help="admin to benchmark (default: synthetic admin)")
+    parser.add_argument("--seed", type=int, default=0, help="insert N synthetic tickets for the synthetic admin")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    admin_id = args.admin_id or BENCH_ADMIN_ID
+    if args.seed:
+        print(f"Seeding {args.seed} tickets for admin {BENCH_ADMIN_ID}...")
+        seed(args.seed)
+
+    try:
+        service = StatisticsService()
+        old = measure("five queries", five_queries, service, admin_id, args.iterations)
+        new = measure("one query", one_query, service, admin_id, args.iterations)
+        print(f"Speedup: {old / new:.1f}x")
+    finally:
+        if args.seed:
+            cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Query plan regression check for the hot StatisticsService/TicketService queries.
+
+Loads a synthetic dataset into the tickets/ticket_ratings tables, runs each
+service method, captures the SQL it issues and re-runs it under
+EXPLAIN (ANALYZE, FORMAT JSON). A check fails when the plan uses none of the
+accepted indexes, falls back to a sequential scan on a large table, or exceeds
+the time budget. Exits with a non-zero status on any failure.
+"""
+import argparse
+import sys
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from App.Infrastructure.Models.database import engine, get_db
+from App.Domain.Enums.TicketStatus.TicketStatus import ACTIVE_TICKET_STATUSES
+from App.Domain.Services.StatisticsService.statistics_service import StatisticsService
+from App.Domain.Services.RatingService.rating_service import RatingService
+from App.Domain.Services.TicketService.ticket_service import TicketService
+
+BENCH_ADMIN_BASE = 999100000
+BENCH_ADMINS = 50
+BENCH_DISPLAY_ID_BASE = 800000000
+
+SEED_TICKETS_SQL = text("""
+    INSERT INTO tickets (display_id, user_id, username, category, status, taken_by, created_at, closed_at)
+    SELECT :display_base + n,
+           1000000 + n % 200000,
+           'bench',
+           (ARRAY['general', 'payment', 'hwid', 'key'])[1 + n % 4],
+           (CASE WHEN n % 100 < :active_percent THEN (:active_statuses)[1 + n % cardinality(:active_statuses)]
+                 ELSE 'closed' END)::ticket_status,
+           CASE WHEN n % 100 = 0 THEN NULL ELSE :admin_base + n % :admins END,
+           now() - make_interval(secs => n % (180 * 86400)),
+           CASE WHEN n % 100 < :active_percent THEN NULL
+                ELSE now() - make_interval(secs => n % (180 * 86400)) + interval '1 hour' END
+    FROM generate_series(1, :count) AS n
+""")
+
+SEED_RATINGS_SQL = text("""
+    INSERT INTO ticket_ratings (ticket_id, user_id, rating)
+    SELECT id, user_id, 1 + id % 5
+    FROM tickets
+    WHERE display_id > :display_base AND status = 'closed' AND id % 3 = 0
+""")
+
+
+@contextmanager
+def capture_statements():
+    """Collect (statement, parameters) of every query issued inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+def explain(statement: str, parameters) -> dict:
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + statement, parameters)
+        return cursor.fetchone()[0][0]
+    finally:
+        raw.close()
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def check(name: str, func, accepted_indexes: set[str], budget_ms: float) -> bool:
+    with capture_statements() as statements:
+        func()
+
+    if not statements:
+        print(f"FAIL {name:<28} no query captured")
+        return False
+
+    used, seq_scans, elapsed = set(), set(), 0.0
+    for statement, parameters in statements:
+        plan = explain(statement, parameters)
+        elapsed += plan["Execution Time"]
+        for node in plan_nodes(plan["Plan"]):
+            if "Index Name" in node:
+                used.add(node["Index Name"])
+            if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in ("tickets", "ticket_ratings"):
+                seq_scans.add(node["Relation Name"])
+
+    problems = []
+    if not used & accepted_indexes:
+        problems.append(f"none of the indexes used: {', '.join(sorted(accepted_indexes))}")
+    if seq_scans:
+        problems.append(f"seq scan on: {', '.join(sorted(seq_scans))}")
+    if elapsed > budget_ms:
+        problems.append(f"{elapsed:.1f} ms > budget {budget_ms:.0f} ms")
+
+    status = "FAIL" if problems else "ok"
+    print(f"{status:<4} {name:<28} {elapsed:8.2f} ms  indexes: {', '.join(sorted(used)) or '-'}")
+    for problem in problems:
+        print(f"     {problem}")
+    return not problems
+
+
+def seed(count: int, active_percent: int):
+    started = time.perf_counter()
+    db = get_db()
+    try:
+        db.execute(SEED_TICKETS_SQL, {
+            "display_base": BENCH_DISPLAY_ID_BASE,
+            "active_percent": active_percent,
+            "active_statuses": [status.value for status in ACTIVE_TICKET_STATUSES],
+            "admin_base": BENCH_ADMIN_BASE,
+            "admins": BENCH_ADMINS,
+            "count": count,
+        })
+        db.execute(SEED_RATINGS_SQL, {"display_base": BENCH_DISPLAY_ID_BASE})
+        db.commit()
+    finally:
+        db.close()
+
+    with engine.connect() as conn:
+        # VACUUM fills the visibility map so index-only scans behave as on a settled table
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM ANALYZE tickets, ticket_ratings"))
+    print(f"Seeded {count} tickets in {time.perf_counter() - started:.1f} s")
+
+
+def cleanup():
+    db = get_db()
+    try:
+        db.execute(text("""
+            DELETE FROM ticket_ratings WHERE ticket_id IN (SELECT id FROM tickets WHERE display_id > :display_base)
+        """), {"display_base": BENCH_DISPLAY_ID_BASE})
+        db.execute(text("DELETE FROM tickets WHERE display_id > :display_base"), {"display_base": BENCH_DISPLAY_ID_BASE})
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=2_000_000, help="synthetic tickets to insert (0 = use existing data)")
+    parser.add_argument("--active-percent", type=int, default=2, help="share of synthetic tickets that are still open")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="time budget per check")
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic data after the run")
+    args = parser.parse_args()
+
+    if args.seed:
+        print(f"Seeding {args.seed} tickets for {BENCH_ADMINS} synthetic admins...")
+        seed(args.seed, args.active_percent)
+
+    admin_id = BENCH_ADMIN_BASE + 7
+    statistics = StatisticsService()
+    ratings = RatingService()
+    budget = args.budget_ms
+
+    try:
+        checks = [
+            ("active count (admin)", lambda: statistics.get_active_tickets_count(admin_id),
+             {"ix_tickets_active_taken_by"}, budget),
+            ("active count (all)", lambda: statistics.get_active_tickets_count(),
+             {"ix_tickets_active_taken_by"}, budget),
+            ("admin snapshot", lambda: statistics.get_admin_snapshot(admin_id),
+             {"ix_tickets_active_taken_by"}, budget),
+            ("closed today (admin)", lambda: statistics.get_closed_tickets_count("today", admin_id),
+             {"ix_tickets_closed_taken_by_closed_at", "ix_tickets_closed_closed_at"}, budget),
+            ("closed month (admin)", lambda: statistics.get_closed_tickets_count("month", admin_id),
+             {"ix_tickets_closed_taken_by_closed_at"}, budget),
+            ("closed today (all)", lambda: statistics.get_closed_tickets_count("today"),
+             {"ix_tickets_closed_closed_at"}, budget),
+            ("ticket rating lookup", lambda: ratings.get_ticket_rating(BENCH_DISPLAY_ID_BASE + 300, 1000300),
+             {"uq_ticket_ratings_ticket_id_user_id"}, budget),
+            ("load active tickets", lambda: TicketService(None),
+             {"ix_tickets_active_taken_by", "ix_tickets_status"}, budget * 4),
+        ]
+        results = [check(*case) for case in checks]
+    finally:
+        if args.seed and not args.keep:
+            cleanup()
+
+    failed = results.count(False)
+    print(f"{len(results) - failed} passed, {failed} failed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,28 +9,43 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'App'))
 from App.Infrastructure.Config import config
 from App.Infrastructure.Components.TelegramBot.telegram_bot import TelegramBotClient
 from App.Infrastructure.Components.TelegramBot.ChannelManager.channel_manager import ChannelManager
+from App.Infrastructure.Components.Charts.render_pool import ChartRenderPool
+from App.Infrastructure.Components.Charts.stats_image_cache import StatsImageCache
+from App.Infrastructure.Components.Outbox.outbox_dispatcher import OutboxDispatcher
+from App.Infrastructure.Components.TelegramBot.AdminDirectory.admin_directory import AdminDirectory, AdminDirectoryMiddleware
 from App.Infrastructure.Components.TelegramBot.processors.message_processor import MessageProcessor
 from App.Infrastructure.Components.TelegramBot.processors.support_processor import SupportProcessor
+from App.Domain.Services.ArchiveService.archive_service import ArchiveService
 from App.Domain.Services.BalanceService.balance_service import BalanceService
 from App.Domain.Services.StatisticsService.statistics_service import StatisticsService
+from App.Domain.Services.StatisticsService.admin_leaderboard import AdminLeaderboard
 from App.Domain.Services.RatingService.rating_service import RatingService
 from App.Domain.Services.MessageService.message_service import MessageService
 from App.Domain.Services.TicketService.ticket_service import TicketService
+from App.Domain.Services.TicketService.stale_ticket_sweeper import StaleTicketSweeper
+from App.Domain.Services.TicketHistoryService.ticket_history_service import TicketHistoryService
 from App.Domain.Services.CallbackService.callback_service import CallbackService
+from App.Domain.Services.AdminMenuService.admin_menu_service import AdminMenuService
 from App.Infrastructure.Components.Http.websocket_manager import WebSocketManager
 from App.Domain.Services.TicketApplicationService.ticket_application_service import TicketApplicationService
 from App.Infrastructure.Components.Http.controllers.ticket_controller import TicketController
 from App.Infrastructure.Components.Http.controllers.rating_controller import RatingController
+from App.Infrastructure.Components.Http.controllers.export_controller import ExportController
+from App.Domain.Services.ExportService.export_service import ExportService, ExportFilters
+from App.Domain.Enums.TicketStatus.TicketStatus import TicketStatus
 from App.Domain.Models.TicketResponse.TicketResponse import TicketResponse
 from App.Domain.Models.RatingRequest.RatingRequest import RatingRequest
 from App.Domain.Models.RatingResponse.RatingResponse import RatingResponse
 from App.Domain.Models.TicketStatusResponse.TicketStatusResponse import TicketStatusResponse
+from App.Domain.Models.TicketMessagesResponse.TicketMessagesResponse import TicketMessagesResponse
 from App.Domain.Models.MessageRequest.MessageRequest import MessageRequest
 from App.Domain.Models.MessageResponse.MessageResponse import MessageResponse
 from App.Domain.Models.CreateTicketRequest.CreateTicketRequest import CreateTicketRequest
 from App.Domain.Models.UpdateResponse.UpdateResponse import UpdateResponse
-from fastapi import Query, Path, WebSocket
-from App.Infrastructure.Models.database import init_db
+from datetime import date
+from typing import Optional
+from fastapi import Query, Path, WebSocket, Header
+from App.Infrastructure.Models.database import init_db, replica_health
 from fastapi import FastAPI
 import uvicorn
 
@@ -50,13 +65,21 @@ telegram_bot = None
 ticket_service = None
 rating_service = None
 longpoll_manager = None
+admin_directory = None
+render_pool = None
+leaderboard = None
+balance_service = None
+outbox_dispatcher = None
+ticket_history_service = None
+archive_service = None
+stale_ticket_sweeper = None
 bot_task = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Управление жизненным циклом приложения"""
-    global telegram_bot, ticket_service, rating_service, websocket_manager, bot_task
+    global telegram_bot, ticket_service, rating_service, websocket_manager, admin_directory, render_pool, leaderboard, balance_service, outbox_dispatcher, ticket_history_service, archive_service, stale_ticket_sweeper, bot_task
     
     try:
         logger.info("Инициализация сервисов...")
@@ -66,29 +89,41 @@ async def lifespan(app: FastAPI):
         telegram_bot = TelegramBotClient()
         logger.info("Бот создан")
 
-        channel_manager = ChannelManager(telegram_bot.bot)
+        admin_directory = AdminDirectory(telegram_bot.bot, config.SUPPORT_CHANNEL_ID, config.ADMIN_DIRECTORY_TTL)
+        telegram_bot.register_middleware(AdminDirectoryMiddleware(admin_directory))
+
+        ticket_history_service = TicketHistoryService(config.HISTORY_BATCH_SIZE, config.HISTORY_FLUSH_INTERVAL)
+        channel_manager = ChannelManager(telegram_bot.bot, ticket_history_service)
         logger.info("ChannelManager создан")
 
         websocket_manager = WebSocketManager(channel_manager)
         logger.info("WebSocketManager создан")
         
-        balance_service = BalanceService()
-        statistics_service = StatisticsService(telegram_bot.bot)
-        rating_service = RatingService()
-        ticket_service = TicketService(channel_manager, websocket_manager)
+        balance_service = BalanceService(config.BALANCE_RECONCILE_INTERVAL)
+        render_pool = ChartRenderPool(config.CHART_WORKERS, config.CHART_RENDER_TIMEOUT, renderer=config.CHART_RENDERER)
+        leaderboard = AdminLeaderboard(reconcile_interval=config.LEADERBOARD_RECONCILE_INTERVAL)
+        leaderboard.seed()
+        statistics_service = StatisticsService(telegram_bot.bot, admin_directory, render_pool, StatsImageCache(config.STATS_CACHE_TTL), leaderboard)
+        rating_service = RatingService(statistics_service)
+        admin_menu_service = AdminMenuService(statistics_service, balance_service)
+        outbox_dispatcher = OutboxDispatcher(config.OUTBOX_BATCH_SIZE, config.OUTBOX_POLL_INTERVAL)
+        ticket_service = TicketService(channel_manager, websocket_manager, statistics_service,
+                                       admin_menu_service=admin_menu_service, balance_service=balance_service,
+                                       outbox=outbox_dispatcher)
         logger.info("TicketService создан")
         
-        message_service = MessageService(ticket_service, statistics_service, rating_service, balance_service, telegram_bot.bot)
-        callback_service = CallbackService(ticket_service, balance_service, statistics_service, rating_service)
+        message_service = MessageService(ticket_service, statistics_service, rating_service, balance_service, telegram_bot.bot, ticket_history_service, admin_directory, admin_menu_service)
+        callback_service = CallbackService(ticket_service, balance_service, statistics_service, rating_service, admin_menu_service)
         message_processor = MessageProcessor(message_service, callback_service)
         support_processor = SupportProcessor(ticket_service)
         
         telegram_bot.register_router(support_processor.router)
         telegram_bot.register_router(message_processor.router)
         
-        ticket_application_service = TicketApplicationService(ticket_service, rating_service)
+        ticket_application_service = TicketApplicationService(ticket_service, rating_service, ticket_history_service)
         ticket_controller = TicketController(ticket_application_service)
         rating_controller = RatingController(ticket_application_service)
+        export_controller = ExportController(ExportService())
         
         @app.post(
             "/api/ticket/create",
@@ -259,6 +294,23 @@ async def lifespan(app: FastAPI):
         ):
             return await ticket_controller.get_ticket_status(ticket_id)
 
+        @app.get(
+            "/api/ticket/{ticket_id}/messages",
+            response_model=TicketMessagesResponse,
+            tags=["Тикеты"],
+            summary="Получить сообщения тикета",
+            description="Возвращает переписку тикета страницами от новых к старым. "
+                        "Для следующей страницы передайте next_before из ответа в before. "
+                        "Поддерживается If-None-Match (ответ 304, если страница не изменилась)."
+        )
+        async def get_ticket_messages(
+            ticket_id: int = Path(..., description="ID тикета", examples=[1]),
+            before: Optional[int] = Query(None, ge=1, description="Вернуть сообщения с id меньше этого"),
+            limit: int = Query(50, ge=1, le=200, description="Количество сообщений на странице"),
+            if_none_match: Optional[str] = Header(None)
+        ):
+            return await ticket_controller.get_ticket_messages(ticket_id, before, limit, if_none_match)
+
         @app.post(
             "/api/ticket/{ticket_id}/close",
             response_model=UpdateResponse,
@@ -271,8 +323,65 @@ async def lifespan(app: FastAPI):
         ):
             return await ticket_controller.close_ticket(ticket_id)
 
+        export_description = """
+            Потоковая выгрузка для администраторов. Требуется заголовок `X-Admin-Token`
+            со значением EXPORT_API_TOKEN.
+
+            - `format`: `csv` (по умолчанию) или `ndjson`
+            - `gzip=true`: сжатие на лету, файл `.gz`
+            """
+
+        @app.get("/api/export/tickets", tags=["Выгрузка"], summary="Выгрузка тикетов", description=export_description)
+        async def export_tickets(
+            date_from: Optional[date] = Query(None, description="Начало периода по дате создания (включительно)"),
+            date_to: Optional[date] = Query(None, description="Конец периода по дате создания (включительно)"),
+            status: Optional[TicketStatus] = Query(None, description="Статус тикета"),
+            admin_id: Optional[int] = Query(None, description="ID администратора"),
+            format: str = Query("csv", description="csv или ndjson"),
+            gzip: bool = Query(False, description="Сжать ответ gzip"),
+            x_admin_token: Optional[str] = Header(None)
+        ):
+            return export_controller.export("tickets", x_admin_token, ExportFilters(date_from, date_to, status, admin_id), format, gzip)
+
+        @app.get("/api/export/ratings", tags=["Выгрузка"], summary="Выгрузка оценок", description=export_description)
+        async def export_ratings(
+            date_from: Optional[date] = Query(None, description="Начало периода по дате оценки (включительно)"),
+            date_to: Optional[date] = Query(None, description="Конец периода по дате оценки (включительно)"),
+            status: Optional[TicketStatus] = Query(None, description="Статус тикета"),
+            admin_id: Optional[int] = Query(None, description="ID администратора"),
+            format: str = Query("csv", description="csv или ndjson"),
+            gzip: bool = Query(False, description="Сжать ответ gzip"),
+            x_admin_token: Optional[str] = Header(None)
+        ):
+            return export_controller.export("ratings", x_admin_token, ExportFilters(date_from, date_to, status, admin_id), format, gzip)
+
+        @app.get("/api/export/earnings", tags=["Выгрузка"], summary="Выгрузка начислений по дням", description=export_description)
+        async def export_earnings(
+            date_from: Optional[date] = Query(None, description="Начало периода (включительно)"),
+            date_to: Optional[date] = Query(None, description="Конец периода (включительно)"),
+            admin_id: Optional[int] = Query(None, description="ID администратора"),
+            format: str = Query("csv", description="csv или ndjson"),
+            gzip: bool = Query(False, description="Сжать ответ gzip"),
+            x_admin_token: Optional[str] = Header(None)
+        ):
+            return export_controller.export("earnings", x_admin_token, ExportFilters(date_from, date_to, admin_id=admin_id), format, gzip)
+
         logger.info("HTTP API endpoints настроены")
         
+        replica_health.start()
+        admin_directory.start()
+        await render_pool.start()
+        leaderboard.start()
+        balance_service.start(admin_menu_service.invalidate)
+        outbox_dispatcher.start()
+        ticket_history_service.start()
+        archive_service = ArchiveService(config.ARCHIVE_AFTER_DAYS, config.ARCHIVE_RETENTION_DAYS,
+                                         config.ARCHIVE_BATCH_SIZE, config.ARCHIVE_INTERVAL)
+        archive_service.start()
+        stale_ticket_sweeper = StaleTicketSweeper(ticket_service, config.STALE_TICKET_HOURS,
+                                                  config.STALE_TICKET_HOURS_BY_CATEGORY,
+                                                  config.STALE_SWEEP_BATCH_SIZE, config.STALE_SWEEP_INTERVAL)
+        stale_ticket_sweeper.start()
         bot_task = asyncio.create_task(telegram_bot.start())
         logger.info("Бот запущен в фоновом режиме")
         
@@ -280,12 +389,22 @@ async def lifespan(app: FastAPI):
         yield
         
         logger.info("Остановка сервисов...")
+        await admin_directory.stop()
+        await replica_health.stop()
+        render_pool.stop()
+        await leaderboard.stop()
+        await balance_service.stop()
+        await stale_ticket_sweeper.stop()
+        await outbox_dispatcher.stop()
+        await archive_service.stop()
         if bot_task:
             bot_task.cancel()
             try:
                 await bot_task
             except asyncio.CancelledError:
                 pass
+        # После остановки бота, чтобы в историю попали последние сообщения
+        await ticket_history_service.stop()
         
     except Exception as e:
         logger.error(f"Ошибка при инициализации: {e}", exc_info=True)